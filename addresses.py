@@ -0,0 +1,312 @@
+# imports
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+
+# number of distinct raw addresses kept in memory and in the cache file
+_MAX_SIZE = 50000
+
+# words of a street expanded to one spelling, '100 W. 4TH ST' and '100 WEST 4TH STREET'
+# get the same key. Suffixes are expanded in the last position only ('ST CLAIR ST')
+_SUFFIXES = {'ST': 'STREET', 'STR': 'STREET', 'AVE': 'AVENUE', 'AV': 'AVENUE', 'AVN': 'AVENUE',
+             'RD': 'ROAD', 'DR': 'DRIVE', 'LN': 'LANE', 'CT': 'COURT', 'BLVD': 'BOULEVARD',
+             'PL': 'PLACE', 'PKWY': 'PARKWAY', 'HWY': 'HIGHWAY', 'TER': 'TERRACE', 'TERR': 'TERRACE',
+             'CIR': 'CIRCLE', 'SQ': 'SQUARE', 'PIKE': 'PIKE', 'WAY': 'WAY', 'TRL': 'TRAIL', 'ALY': 'ALLEY'}
+_DIRECTIONS = {'N': 'NORTH', 'S': 'SOUTH', 'E': 'EAST', 'W': 'WEST', 'NE': 'NORTHEAST',
+               'NW': 'NORTHWEST', 'SE': 'SOUTHEAST', 'SW': 'SOUTHWEST'}
+_WORDS = {'MT': 'MOUNT', 'FT': 'FORT'}
+# most words are none of the above and are skipped with one lookup
+_ABBREVIATIONS = set(_SUFFIXES) | set(_DIRECTIONS) | set(_WORDS)
+_PUNCTUATION = str.maketrans('.,', '  ')
+
+# party table glues address lines together ('100 MAIN STCINCINNATI OH 45202'),
+# so the street ends where a known city begins
+_CITIES = ['CINCINNATI', 'NORWOOD', 'CHEVIOT', 'SHARONVILLE', 'SPRINGDALE', 'FOREST PARK',
+           'BLUE ASH', 'MONTGOMERY', 'MADEIRA', 'READING', 'HARRISON', 'LOVELAND', 'MILFORD',
+           'NORTH COLLEGE HILL', 'MOUNT HEALTHY', 'MT HEALTHY', 'MT. HEALTHY', 'DEER PARK',
+           'ST BERNARD', 'ST. BERNARD', 'SAINT BERNARD', 'ELMWOOD PLACE', 'LOCKLAND', 'WYOMING',
+           'ARLINGTON HEIGHTS', 'GOLF MANOR', 'SILVERTON', 'FAIRFAX', 'MARIEMONT', 'NEWTOWN',
+           'ADDYSTON', 'CLEVES', 'NORTH BEND', 'GREENHILLS', 'WOODLAWN', 'EVENDALE', 'GLENDALE',
+           'LINCOLN HEIGHTS', 'AMBERLEY', 'INDIAN HILL', 'TERRACE PARK', 'COLERAIN TOWNSHIP']
+_CITY_ALTERNATIVES = '|'.join(re.escape(city) for city in sorted(_CITIES, key=len, reverse=True))
+
+_UNIT_PATTERN = re.compile(r'\s*(?:,\s*)?(?:\b(?:APT|APARTMENT|UNIT|STE|SUITE|RM|ROOM|FL|FLOOR|LOT|BLDG)\b\.?'
+                           r'\s*#?|#)\s*([A-Z0-9][A-Z0-9-]*)\s*$')
+_CITY_STATE_ZIP_PATTERN = re.compile(
+    rf'^(.*?)\s*,?\s*({_CITY_ALTERNATIVES})\s*,?\s*([A-Z]{{2}})\s+(\d{{5}})(?:-\d{{4}})?\s*$')
+# addresses outside the county usually keep a comma between street and city
+_COMMA_CITY_STATE_ZIP_PATTERN = re.compile(r'^(.*?)\s*,\s*([A-Z .]+?)\s*,?\s*([A-Z]{2})\s+(\d{5})(?:-\d{4})?\s*$')
+_ZIP_PATTERN = re.compile(r'\s*(\d{5})(?:-\d{4})?\s*$')
+# _CITY_STATE_ZIP_PATTERN in parts: the state and ZIP code end the address, the city
+# ends right before them, so cities are compared with one string end instead of
+# being tried at every position. With single spaces the state and ZIP code take
+# at most the last _STATE_ZIP_LENGTH characters (' , OH 45202-1234')
+_STATE_ZIP_LENGTH = 20
+_STATE_ZIP_PATTERN = re.compile(r'\s*,?\s*([A-Z]{2})\s+(\d{5})(?:-\d{4})?\s*$')
+_STREET_END_PATTERN = re.compile(r'\s*,?\s*$')
+_CITY_SET = set(_CITIES)
+_CITY_LENGTHS = sorted({len(city) for city in _CITIES}, reverse=True)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS address_cache (
+    raw TEXT PRIMARY KEY,
+    street TEXT,
+    unit TEXT,
+    city TEXT,
+    state TEXT,
+    zip TEXT,
+    key TEXT,
+    used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS address_cache_used ON address_cache (used);
+"""
+
+
+def _expand_street(street):
+    """
+    Expands abbreviations of a street, drops punctuation and repeated spaces.
+    """
+    words = street.translate(_PUNCTUATION).split()
+    for i, word in enumerate(words):
+        if word not in _ABBREVIATIONS:
+            continue
+        if i == len(words) - 1 and word in _SUFFIXES:
+            words[i] = _SUFFIXES[word]
+        elif word in _DIRECTIONS and (i == len(words) - 1 or (i > 0 and words[i - 1].isdigit())):
+            # '100 W 4TH ST', 'MAIN ST N'
+            words[i] = _DIRECTIONS[word]
+        elif word in _WORDS:
+            words[i] = _WORDS[word]
+    return ' '.join(words)
+
+
+def _match_city_state_zip(address):
+    """
+    Returns a tuple (street, city, state, zip) same as the groups of
+    _CITY_STATE_ZIP_PATTERN.match(address), or None if it does not match.
+    Spaces of address are single ones.
+    """
+    tail = _STATE_ZIP_PATTERN.search(address, max(0, len(address) - _STATE_ZIP_LENGTH))
+    if tail is None:
+        return None
+    head = address[:tail.start()]
+    # the longest city wins, as the leftmost match of the pattern
+    for length in _CITY_LENGTHS:
+        city = head[-length:]
+        if city in _CITY_SET:
+            street = head[:-length]
+            return street[:_STREET_END_PATTERN.search(street).start()], city, *tail.groups()
+    return None
+
+
+def parse_address(raw):
+    """
+    Offline parse of one raw party address into its parts and a canonical key.
+
+    Inputs:
+      raw (str): address as scraped, e.g. '910 PLUM ST APT 2CINCINNATI OH 45202'
+
+    Returns a tuple (street, unit, city, state, zip, key), missing parts are None
+    """
+    address = ' '.join(raw.upper().split())
+    street, city, state, zip_code = address, None, None, None
+
+    groups = _match_city_state_zip(address)
+    if groups is None:
+        match = _COMMA_CITY_STATE_ZIP_PATTERN.match(address)
+        groups = match.groups() if match else None
+    if groups is not None:
+        street, city, state, zip_code = groups
+        city = ' '.join(city.replace('.', ' ').split()) or None
+    else:
+        match = _ZIP_PATTERN.search(address)
+        if match:
+            street, zip_code = address[:match.start()], match.group(1)
+
+    unit = None
+    match = _UNIT_PATTERN.search(street)
+    if match:
+        street, unit = street[:match.start()], match.group(1)
+
+    street = _expand_street(street) or None
+    key = '|'.join(part or '' for part in (street, unit, zip_code)) if street else None
+    return street, unit, city, state, zip_code, key
+
+
+class Address_Normalizer:
+    """
+    Memoized parse_address(): results are kept in a bounded LRU cache, so the
+    addresses of big landlords, repeated on most filings, are parsed once.
+    With a cache_path the cache is saved to a SQLite file by save() and loaded
+    by the next run.
+
+    Example:
+        normalizer = Address_Normalizer('addresses.sqlite')
+        keys = normalizer.keys(df['DEFENDANT ADDRESS'])
+        normalizer.save()
+        print(normalizer.stats())
+    """
+
+    def __init__(self, cache_path = None, max_size = _MAX_SIZE):
+        """
+        Inputs:
+          cache_path (str): location of the SQLite cache file, None to keep the cache in memory only
+          max_size (int): number of distinct raw addresses kept
+        """
+        self.cache_path = cache_path
+        self.max_size = max_size
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # time spent parsing addresses missing from the cache or bypassing it
+        self.parse_seconds = 0.0
+        # addresses parsed by parse_many() without the cache
+        self.bypassed = 0
+        # addresses parsed or looked up since the last save(), least recently used first
+        self.touched = OrderedDict()
+        # last `used` value written to the cache file
+        self.used = 0
+
+        self.conn = None
+        if cache_path is not None:
+            self.conn = sqlite3.connect(cache_path, timeout=60)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(_SCHEMA)
+            self.used = self.conn.execute("SELECT COALESCE(MAX(used), 0) FROM address_cache").fetchone()[0]
+            # least recently used first, same order as the LRU
+            rows = self.conn.execute("SELECT raw, street, unit, city, state, zip, key FROM address_cache "
+                                     "ORDER BY used DESC LIMIT ?", (max_size,)).fetchall()
+            for raw, *parts in reversed(rows):
+                self.cache[raw] = tuple(parts)
+
+
+    def close(self):
+        self.save()
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+    def parse(self, raw):
+        """
+        Returns parse_address(raw) from the cache, parsing it on a miss.
+        Missing and blank addresses give None.
+        """
+        if not isinstance(raw, str) or not raw.strip():
+            return None
+        parts = self.cache.get(raw)
+        if parts is not None:
+            self.hits += 1
+            self.cache.move_to_end(raw)
+            self.__touch(raw)
+            return parts
+
+        self.misses += 1
+        start = time.perf_counter()
+        parts = parse_address(raw)
+        self.parse_seconds += time.perf_counter() - start
+        self.cache[raw] = parts
+        self.__touch(raw)
+        if len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+        return parts
+
+
+    def parse_many(self, addresses):
+        """
+        Returns a list of parse() of distinct raw addresses. With more of them than
+        the cache holds (e.g. all addresses of a full archive) the cache is bypassed:
+        it would evict every address before it is seen again, and each distinct one
+        is parsed once anyway.
+        """
+        if len(addresses) <= self.max_size:
+            return [self.parse(raw) for raw in addresses]
+
+        start = time.perf_counter()
+        parsed = [parse_address(raw) if isinstance(raw, str) and raw.strip() else None for raw in addresses]
+        self.parse_seconds += time.perf_counter() - start
+        self.bypassed += len(addresses)
+        return parsed
+
+
+    def keys(self, addresses):
+        """
+        Returns a list of canonical address keys (None where an address is missing).
+
+        Inputs:
+          addresses (iterable): raw addresses, e.g. a pandas Series
+        """
+        return [parts[-1] if parts is not None else None for parts in map(self.parse, addresses)]
+
+
+    def save(self):
+        """
+        Writes addresses parsed or looked up since the last save to the cache file,
+        and trims the file to the max_size most recently used addresses.
+        """
+        if self.conn is None or not self.touched:
+            return
+        # addresses evicted from the LRU meanwhile are left out
+        rows = [(raw, *self.cache[raw], self.used + i)
+                for i, raw in enumerate(self.touched, start=1) if raw in self.cache]
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO address_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.conn.execute("DELETE FROM address_cache WHERE used < (SELECT used FROM address_cache "
+                              "ORDER BY used DESC LIMIT 1 OFFSET ?)", (self.max_size - 1,))
+        self.used += len(self.touched)
+        self.touched.clear()
+
+
+    def stats(self):
+        """
+        Returns a dict with cache hits, misses, hit rate, size, addresses parsed without the
+        cache and seconds spent parsing.
+        """
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': len(self.cache), 'max_size': self.max_size, 'bypassed': self.bypassed,
+                'parse_seconds': self.parse_seconds}
+
+###############################################################################################
+################################ UTILITY METHODS ##############################################
+###############################################################################################
+
+    def __touch(self, raw):
+        """
+        Marks an address to be written by the next save().
+        """
+        if self.conn is None:
+            return
+        self.touched[raw] = None
+        self.touched.move_to_end(raw)
+
+
+# normalizer used by normalize_cases(), see get_address_normalizer()
+_NORMALIZER = None
+
+
+def get_address_normalizer():
+    """
+    Returns the address normalizer of this process, an in-memory one unless
+    use_address_cache() set a persisted one.
+    """
+    global _NORMALIZER
+    if _NORMALIZER is None:
+        _NORMALIZER = Address_Normalizer()
+    return _NORMALIZER
+
+
+def use_address_cache(cache_path, max_size = _MAX_SIZE):
+    """
+    Makes normalize_cases() of this process use an address cache persisted in
+    cache_path. The caller saves it with get_address_normalizer().close().
+
+    Returns the normalizer
+    """
+    global _NORMALIZER
+    if _NORMALIZER is not None:
+        _NORMALIZER.close()
+    _NORMALIZER = Address_Normalizer(cache_path, max_size)
+    return _NORMALIZER
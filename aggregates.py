@@ -0,0 +1,172 @@
+# imports
+import pandas as pd
+
+from postprocess import split_address
+
+# dimension of the aggregates: column it is grouped by ('all' is one total per week)
+DIMENSIONS = {'all': None, 'court': 'COURT', 'judge': 'JUDGE', 'plaintiff': 'PLAINTIFF NAME',
+              # the defendant's address is the rented unit
+              'zip': 'DEFENDANT_ZIP'}
+# columns of a case the aggregates are computed from
+COLUMNS = ['FILED DATE', 'DISPOSITION'] + [col for col in DIMENSIONS.values() if col is not None]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS weekly_aggregates (
+    dimension TEXT NOT NULL,
+    week TEXT NOT NULL,
+    key TEXT NOT NULL,
+    filings INTEGER NOT NULL,
+    open INTEGER NOT NULL,
+    disposed INTEGER NOT NULL,
+    PRIMARY KEY (dimension, week, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_weekly_aggregates_key ON weekly_aggregates (dimension, key, week);
+"""
+
+
+def _contributions(df, sign):
+    """
+    Counts of a batch of cases by dimension, filing week and key.
+
+    Inputs:
+      df (pandas df): eviction cases with COLUMNS, missing ones count as unknown
+      sign (int): 1 to add the cases, -1 to take them away
+
+    Returns a df with columns dimension, week, key, filings, open and disposed
+    """
+    filed = pd.to_datetime(df['FILED DATE'], errors='coerce') if 'FILED DATE' in df.columns \
+        else pd.Series(pd.NaT, index=df.index)
+    keep = filed.notna()
+    if not keep.any():
+        return pd.DataFrame(columns=['dimension', 'week', 'key', 'filings', 'open', 'disposed'])
+
+    df, filed = df[keep], filed[keep]
+    # monday of the filing week
+    week = (filed - pd.to_timedelta(filed.dt.weekday, unit='D')).dt.strftime('%Y-%m-%d')
+    is_open = df['DISPOSITION'].isna() if 'DISPOSITION' in df.columns else pd.Series(True, index=df.index)
+
+    parts = []
+    for dimension, col in DIMENSIONS.items():
+        if col is None:
+            key = pd.Series('', index=df.index)
+        elif col in df.columns:
+            key = df[col].astype(object).where(df[col].notna(), '').astype(str).str.strip()
+        else:
+            key = pd.Series('', index=df.index)
+        parts.append(pd.DataFrame({'dimension': dimension, 'week': week, 'key': key,
+                                   'filings': sign, 'open': sign * is_open, 'disposed': sign * ~is_open}))
+
+    counts = pd.concat(parts, ignore_index=True)
+    return counts.groupby(['dimension', 'week', 'key'], as_index=False, sort=False)[
+        ['filings', 'open', 'disposed']].sum()
+
+
+class Case_Aggregates:
+    """
+    Materialized weekly counts of filings, open and disposed cases in total and by
+    court, judge, plaintiff and ZIP code, kept in the eviction store's database.
+    The store updates them from every batch of new and changed rows (a changed
+    row's old counts are taken away and its new ones added), so reading them
+    costs the size of the aggregates, not of the archive.
+    """
+
+    def __init__(self, conn):
+        """
+        Inputs:
+          conn (sqlite3 connection): connection of the eviction store
+        """
+        self.conn = conn
+        with self.conn:
+            self.conn.executescript(_SCHEMA)
+
+
+    def update(self, old_df, new_df):
+        """
+        Applies one batch of writes within the current transaction.
+
+        Inputs:
+          old_df (pandas df): stored rows of the batch's cases before the write, with COLUMNS
+          new_df (pandas df): rows written
+
+        Returns number of aggregate rows changed
+        """
+        if 'DEFENDANT_ZIP' not in new_df.columns and 'DEFENDANT ADDRESS' in new_df.columns:
+            new_df = new_df.assign(DEFENDANT_ZIP=split_address(new_df['DEFENDANT ADDRESS'])['ZIP'])
+        delta = pd.concat([_contributions(old_df, -1), _contributions(new_df, 1)], ignore_index=True)
+        delta = delta.groupby(['dimension', 'week', 'key'], as_index=False, sort=False)[
+            ['filings', 'open', 'disposed']].sum()
+        delta = delta[(delta[['filings', 'open', 'disposed']] != 0).any(axis=1)]
+        if delta.empty:
+            return 0
+
+        self.conn.executemany(
+            "INSERT INTO weekly_aggregates VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (dimension, week, key) "
+            "DO UPDATE SET filings = filings + excluded.filings, open = open + excluded.open, "
+            "disposed = disposed + excluded.disposed",
+            [(dimension, week, key, int(filings), int(is_open), int(disposed))
+             for dimension, week, key, filings, is_open, disposed in delta.itertuples(index=False, name=None)])
+        self.conn.execute("DELETE FROM weekly_aggregates WHERE filings <= 0")
+        return len(delta)
+
+
+    def clear(self):
+        self.conn.execute("DELETE FROM weekly_aggregates")
+
+
+    def weekly(self, dimension = 'all', key = None, start = None, end = None):
+        """
+        Returns a df with weekly filings, open and disposed cases and disposition rate.
+
+        Inputs:
+          dimension (str): 'all', 'court', 'judge', 'plaintiff' or 'zip'
+          key (str): one court, judge, plaintiff or ZIP code, None for all of them
+          start (str), end (str): first and last filing week (yyyy-mm-dd), None for no limit
+        """
+        sql, params = self.__where(dimension, key, start, end)
+        df = pd.read_sql_query(f"SELECT week, key, filings, open, disposed FROM weekly_aggregates {sql} "
+                               f"ORDER BY week, filings DESC", self.conn, params=params)
+        df['week'] = pd.to_datetime(df['week'])
+        df['disposition_rate'] = df['disposed'] / df['filings']
+        return df.drop(columns='key') if dimension == 'all' else df
+
+
+    def totals(self, dimension = 'plaintiff', start = None, end = None, n = None):
+        """
+        Returns a df with filings, open and disposed cases and disposition rate per key
+        over the time period, most filings first, e.g. the landlords filing most evictions.
+
+        Inputs:
+          dimension (str): 'all', 'court', 'judge', 'plaintiff' or 'zip'
+          start (str), end (str): first and last filing week (yyyy-mm-dd), None for no limit
+          n (int): number of keys, None for all of them
+        """
+        sql, params = self.__where(dimension, None, start, end)
+        df = pd.read_sql_query(
+            f"SELECT key, SUM(filings) AS filings, SUM(open) AS open, SUM(disposed) AS disposed "
+            f"FROM weekly_aggregates {sql} GROUP BY key ORDER BY filings DESC LIMIT ?",
+            self.conn, params=params + (-1 if n is None else n,))
+        df['disposition_rate'] = df['disposed'] / df['filings']
+        return df
+
+###############################################################################################
+################################ UTILITY METHODS ##############################################
+###############################################################################################
+
+    def __where(self, dimension, key, start, end):
+        """
+        Returns a tuple (WHERE clause, parameters) selecting a dimension, key and weeks.
+        """
+        if dimension not in DIMENSIONS:
+            raise ValueError(f'Unknown dimension: {dimension}')
+        sql = "WHERE dimension = ?"
+        params = (dimension,)
+        if key is not None:
+            sql += " AND key = ?"
+            params += (key,)
+        if start is not None:
+            sql += " AND week >= ?"
+            params += (start,)
+        if end is not None:
+            sql += " AND week <= ?"
+            params += (end,)
+        return sql, params
@@ -0,0 +1,267 @@
+# imports
+import asyncio
+import random
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+import parsers
+
+_DEFAULT_RATE = 2           # requests per second per host
+_DEFAULT_CONCURRENCY = 4    # case pages in flight at once
+
+
+class Token_Bucket:
+    """
+    Asyncio token bucket. Allows on average `rate` requests per second
+    with bursts of up to `capacity` requests.
+    """
+
+    def __init__(self, rate = _DEFAULT_RATE, capacity = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+
+    async def acquire(self):
+        """
+        Waits until a token is available and takes it.
+        """
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Async_Case_Fetcher:
+    """
+    Fetches case summary and parties pages with up to `concurrency` cases in flight.
+    All requests to one host share a token bucket of `rate` requests per second,
+    and with a rate_limiter every case also waits for its slot of the limit shared
+    by all worker processes.
+    """
+
+    def __init__(self, concurrency = _DEFAULT_CONCURRENCY, rate = _DEFAULT_RATE, timeout = 30,
+        max_retries = 3, backoff = 1, cookies = None, headers = None):
+
+        self.concurrency = concurrency
+        self.rate = rate
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.cookies = cookies
+        self.headers = headers
+        self.buckets = dict()
+        # optional cache of raw case pages, see page_cache.py
+        self.page_cache = None
+        # optional stage timings and counters, see metrics.py
+        self.metrics = None
+        # optional limit of case pages per second shared with other worker processes,
+        # see parallel.Shared_Rate_Limiter
+        self.rate_limiter = None
+
+
+    def fetch_cases(self, records):
+        """
+        Fetches and parses all cases from a listing page.
+
+        Inputs:
+          records (lst): list of tuples (case_number, case summary form)
+
+        Returns a list of tuples (summary_case_dict, party_info_dict) or exceptions,
+          in the same order as records
+        """
+        return asyncio.run(self.__fetch_all(self.fetch_case, [(form, case_number) for case_number, form in records]))
+
+
+    def fetch_case_summaries(self, search_form, case_numbers):
+        """
+        Looks up cases on the search-by-case-number page and parses their case summary.
+
+        Inputs:
+          search_form (lxml FormElement): search form with 'casenumber' field
+          case_numbers (lst): case numbers to look up
+
+        Returns a list of summary_case_dict or exceptions, in the same order as case_numbers
+        """
+        return asyncio.run(self.__fetch_all(self.fetch_case_summary,
+                                            [(search_form, case_number) for case_number in case_numbers]))
+
+
+    def fetch_cases_by_number(self, search_form, case_numbers):
+        """
+        Looks up cases on the search-by-case-number page and parses their case summary
+        and parties tables, e.g. to retry cases that failed on the listing.
+
+        Inputs:
+          search_form (lxml FormElement): search form with 'casenumber' field
+          case_numbers (lst): case numbers to look up
+
+        Returns a list of tuples (summary_case_dict, party_info_dict) or exceptions,
+          in the same order as case_numbers
+        """
+        return asyncio.run(self.__fetch_all(self.fetch_case_by_number,
+                                            [(search_form, case_number) for case_number in case_numbers]))
+
+
+    async def fetch_case(self, session, case_summary_form, case_number = None):
+        """
+        Submits case summary form, opens parties table and parses both tables.
+        With a page cache both pages are saved under case_number.
+
+        Returns a tuple (summary_case_dict, party_info_dict)
+        """
+        start = time.perf_counter()
+        case_doc = await self.__submit(session, case_summary_form, cache_page=('summary', case_number))
+        summary_case_dict, party_info_dict = await self.__fetch_parties(session, case_doc, case_number, start)
+        if not summary_case_dict:
+            raise ValueError(f'Case summary table not found for case {case_number}')
+        return summary_case_dict, party_info_dict
+
+
+    async def fetch_case_by_number(self, session, search_form, case_number):
+        """
+        Searches one case by its number, opens parties table and parses both tables.
+
+        Returns a tuple (summary_case_dict, party_info_dict)
+        """
+        start = time.perf_counter()
+        case_doc = await self.__submit(session, search_form, {'casenumber': case_number},
+                                       cache_page=('summary', case_number))
+        summary_case_dict, party_info_dict = await self.__fetch_parties(session, case_doc, case_number, start)
+        if not summary_case_dict:
+            raise ValueError(f'Case summary table not found for case {case_number}')
+        return summary_case_dict, party_info_dict
+
+
+    async def fetch_case_summary(self, session, search_form, case_number):
+        """
+        Searches one case by its number and parses case summary table.
+
+        Returns summary_case_dict
+        """
+        start = time.perf_counter()
+        case_doc = await self.__submit(session, search_form, {'casenumber': case_number})
+        start = self.__observe('case_fetch', start)
+        summary_case_dict = parsers.extract_summary_case_data(case_doc)
+        self.__observe('extraction', start)
+        if not summary_case_dict:
+            raise ValueError(f'Case summary table not found for case {case_number}')
+
+        return summary_case_dict
+
+###############################################################################################
+################################ UTILITY METHODS ##############################################
+###############################################################################################
+
+    async def __fetch_parties(self, session, case_doc, case_number, start):
+        """
+        Opens parties table from a case summary page and parses both tables.
+
+        Returns a tuple (summary_case_dict, party_info_dict)
+        """
+        # open parties table with plaintiff and defendant info
+        party_form = parsers.find_party_form(case_doc)
+        if party_form is None:
+            raise ValueError('Parties table form not found on case page')
+        party_doc = await self.__submit(session, party_form, cache_page=('parties', case_number))
+        start = self.__observe('case_fetch', start)
+
+        # parties page repeats case summary table, fall back on the first page otherwise
+        summary_case_dict = parsers.extract_summary_case_data(party_doc) or \
+            parsers.extract_summary_case_data(case_doc)
+        party_info_dict = parsers.extract_party_info_data(party_doc)
+        self.__observe('extraction', start)
+
+        return summary_case_dict, party_info_dict
+
+
+    def __observe(self, stage, start):
+        """
+        Records time since start as one timing of the stage, if metrics are collected.
+
+        Returns current perf_counter(), the start of the next stage
+        """
+        now = time.perf_counter()
+        if self.metrics is not None:
+            self.metrics.observe(stage, now - start)
+        return now
+
+
+    async def __fetch_all(self, fetch, args_list):
+        """
+        Runs fetch(session, *args) for every args tuple with up to `concurrency` in flight.
+
+        Returns a list of results or exceptions in the same order as args_list
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+
+        async with aiohttp.ClientSession(connector=connector, timeout=self.timeout,
+                                         cookies=self.cookies, headers=self.headers) as session:
+
+            async def fetch_one(args):
+                async with semaphore:
+                    if self.rate_limiter is not None:
+                        # the shared limiter blocks, its wait runs in a thread
+                        await asyncio.get_running_loop().run_in_executor(None, self.rate_limiter.wait)
+                    return await fetch(session, *args)
+
+            return await asyncio.gather(*[fetch_one(args) for args in args_list],
+                                        return_exceptions=True)
+
+
+    def __bucket(self, url):
+        """
+        Returns token bucket of the url's host, creating it on first use.
+        """
+        host = urlsplit(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = Token_Bucket(self.rate)
+        return self.buckets[host]
+
+
+    async def __submit(self, session, form, extra_values = None, cache_page = None):
+        """
+        Submits a form under the host's rate budget, retrying with jittered
+        exponential backoff on connection errors, timeouts and 5xx responses.
+        cache_page is a tuple (kind, key) to save the raw response in the page cache.
+        """
+        method, url, data = parsers.form_request(form, extra_values=extra_values)
+        bucket = self.__bucket(url)
+
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            try:
+                if method == 'GET':
+                    request = session.get(url, params=data)
+                else:
+                    request = session.post(url, data=data)
+                async with request as response:
+                    if response.status < 500:
+                        response.raise_for_status()
+                        html = await response.read()
+                        if self.page_cache is not None and cache_page is not None and cache_page[1]:
+                            self.page_cache.put(*cache_page, html)
+                        return parsers.to_document(html, base_url=str(response.url))
+                    error = aiohttp.ClientResponseError(response.request_info, response.history,
+                                                        status=response.status)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error = e
+
+            if attempt < self.max_retries:
+                if self.metrics is not None:
+                    self.metrics.inc('retries')
+                # full jitter: sleep a random time up to backoff * 2^attempt
+                await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+        raise error
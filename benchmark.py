@@ -0,0 +1,311 @@
+# imports
+import json
+import multiprocessing as mp
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from court_stub import Court_Stub, _STREETS
+from metrics import Metrics
+
+try:
+    import resource
+except ImportError:
+    # Windows, peak memory is not measured
+    resource = None
+
+# engine name: (scraper engine, extra scraper options)
+_ENGINES = {
+    'selenium': ('selenium', {}),
+    'http': ('http', {'delay': 0, 'concurrency': 1}),
+    'http-async': ('http', {'delay': 0, 'concurrency': 8, 'rate': 1000}),
+    'http-pipeline': ('http', {'delay': 0, 'fetch_workers': 8, 'parse_workers': 2, 'rate': 1000})}
+# a run is a regression if its throughput is this share below the baseline's
+_MAX_REGRESSION = 0.2
+
+
+class Sampled_Metrics(Metrics):
+    """
+    Metrics that also keep every timing of a few stages, so that percentiles
+    can be computed from them.
+    """
+
+    def __init__(self, stages = ('case_fetch',)):
+        super().__init__()
+        self.samples = {stage: [] for stage in stages}
+
+
+    def observe(self, stage, seconds):
+        super().observe(stage, seconds)
+        if stage in self.samples:
+            self.samples[stage].append(seconds)
+
+
+def _run_engine(engine, listing_url, start_date, end_date, webdriver_location):
+    """
+    Runs one engine in a child process, so that peak memory of one engine
+    is not mixed up with another. Per-case latency is the 'case_fetch' timing
+    every engine records for each case (both pages of a case, fetched while other
+    cases are in flight with the async and pipeline engines).
+
+    Returns a dict with number of cases, total time and time per case (s)
+    """
+    # imported in the child process, so its import time is not counted as scraping time
+    from util1 import _WEBDRIVER_LOCATION, make_scraper
+
+    scraper_engine, options = _ENGINES[engine]
+    scraper = make_scraper(start_date, end_date, webdriver_location or _WEBDRIVER_LOCATION,
+                           scraper_engine, listing_url=listing_url, **options)
+    scraper.metrics = Sampled_Metrics()
+
+    start = time.perf_counter()
+    cases = sum(1 for _ in scraper.iter_cases())
+    total_time = time.perf_counter() - start
+
+    return {'cases': cases, 'issues': len(scraper.cases_with_issues),
+            'total_time': total_time, 'case_times': scraper.metrics.samples['case_fetch'],
+            # kilobytes on linux
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            if resource is not None else float('nan')}
+
+
+def run_benchmark(engines = ('http', 'http-async'), start_date = '01022023', end_date = '01082023',
+                  cases_per_day = 20, latency = 0.05, error_rate = 0, webdriver_location = None):
+    """
+    Scrapes the same synthetic cases from the local court stub with every engine
+    and measures throughput, per-case latency and peak memory.
+
+    Inputs:
+      engines (tuple): names of engines, see _ENGINES
+      start_date (str), end_date (str): format mmddyyyy
+      cases_per_day (int): number of cases the stub serves for each day
+      latency (float): average delay of every stub response in seconds
+      error_rate (float): share of stub responses that are 503 errors
+      webdriver_location (str): location of Chrome webdriver for 'selenium' engine
+
+    Returns a list of dicts, one per engine
+    """
+    results = []
+    ctx = mp.get_context('spawn')
+
+    with Court_Stub(cases_per_day=cases_per_day, latency=latency, error_rate=error_rate) as stub:
+        for engine in engines:
+            with ctx.Pool(1) as pool:
+                run = pool.apply(_run_engine, (engine, stub.listing_url, start_date, end_date,
+                                               webdriver_location))
+
+            case_times = np.array(run.pop('case_times')) * 1000
+            if len(case_times):
+                p50, p95, p99 = np.percentile(case_times, [50, 95, 99])
+            else:
+                p50 = p95 = p99 = float('nan')
+            results.append({
+                'engine': engine, 'cases': run['cases'], 'issues': run['issues'],
+                'total_time': run['total_time'],
+                'cases_per_sec': run['cases'] / run['total_time'] if run['total_time'] else 0,
+                'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99, 'peak_rss_mb': run['peak_rss_mb']})
+
+    return results
+
+
+def check_regressions(results, baseline, max_regression = _MAX_REGRESSION):
+    """
+    Compares throughput of every engine with a baseline run of the same engine.
+
+    Inputs:
+      results (lst): dicts from run_benchmark()
+      baseline (lst): dicts from an earlier run_benchmark(), e.g. loaded from --json output
+      max_regression (float): share of the baseline's cases per second a run may lose
+
+    Returns a list of messages, one per engine slower than allowed
+    """
+    baseline_rates = {r['engine']: r['cases_per_sec'] for r in baseline}
+    regressions = []
+    for r in results:
+        baseline_rate = baseline_rates.get(r['engine'])
+        if baseline_rate and r['cases_per_sec'] < baseline_rate * (1 - max_regression):
+            regressions.append(f"{r['engine']}: {r['cases_per_sec']:.1f} cases/s, "
+                               f"baseline {baseline_rate:.1f} cases/s")
+    return regressions
+
+
+def make_archive(num_rows, cases_per_day = 20, seed = 0, distinct_addresses = None):
+    """
+    Builds a df of num_rows scraped cases (raw strings, as parsed from the pages)
+    by repeating synthetic cases of the court stub.
+
+    Inputs:
+      num_rows (int): number of cases
+      cases_per_day (int), seed (int): court stub settings
+      distinct_addresses (int): number of distinct defendant addresses, spread over
+        the rows in random order. None gives every row its own address
+
+    Returns a df
+    """
+    stub = Court_Stub(cases_per_day=cases_per_day, seed=seed)
+    stub.stop()
+    case_numbers = stub.case_numbers('01/01/2022', '12/31/2022')
+    cases = [stub.case(case_number) for case_number in case_numbers]
+
+    # party table cells lose their line breaks when parsed
+    df = pd.DataFrame({
+        'CASE NUMBER': case_numbers, 'COURT': [c['court'] for c in cases],
+        'CASE CAPTION': [c['caption'] for c in cases], 'JUDGE': [c['judge'] for c in cases],
+        'FILED DATE': [c['filed_date'] for c in cases], 'CASE TYPE': [c['case_type'] for c in cases],
+        'AMOUNT': [c['amount'] for c in cases], 'DISPOSITION': [c['disposition'] or '' for c in cases],
+        'PLAINTIFF NAME': [c['plaintiff'] for c in cases],
+        'PLAINTIFF ADDRESS': [c['plaintiff_address'].replace('\n', '') for c in cases],
+        'DEFENDANT_ATTORNEY': [c['defendant_attorney'] or ' ' for c in cases],
+        'DEFENDANT NAME': [c['defendant'] for c in cases],
+        'DEFENDANT ADDRESS': [c['defendant_address'].replace('\n', '') for c in cases],
+        'PLAINTIFF_ATTORNEY': [c['plaintiff_attorney'] or '' for c in cases]})
+
+    df = df.iloc[np.resize(np.arange(len(df)), num_rows)].reset_index(drop=True)
+
+    # a year of stub cases has only a few thousand defendant addresses, far fewer than an archive
+    distinct_addresses = min(distinct_addresses or num_rows, num_rows)
+    numbers = np.arange(distinct_addresses)
+    addresses = pd.Series(numbers // len(_STREETS) + 100).astype(str) + ' ' \
+        + pd.Series(_STREETS).iloc[numbers % len(_STREETS)].to_numpy() \
+        + 'CINCINNATI OH 452' + pd.Series(numbers % 40 + 1).astype(str).str.zfill(2)
+    rows = np.random.default_rng(seed).permutation(np.resize(numbers, num_rows))
+    df['DEFENDANT ADDRESS'] = addresses.to_numpy()[rows]
+
+    return df
+
+
+def run_postprocess_benchmark(num_rows = 1000000, distinct_addresses = None):
+    """
+    Times the vectorized post-processing stage on a num_rows archive against the
+    old whole-df regex blanking followed by schema conversion.
+
+    Inputs:
+      num_rows (int): number of cases
+      distinct_addresses (int): number of distinct defendant addresses, None for one per row
+
+    Returns a dict with seconds taken by each
+    """
+    # imported here, scraping runs import them in their own child processes
+    from postprocess import normalize_cases
+    from records import apply_schema
+
+    df = make_archive(num_rows, distinct_addresses=distinct_addresses)
+
+    start = time.perf_counter()
+    apply_schema(df.copy().replace(r'^\s*$', np.nan, regex=True))
+    old_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    normalize_cases(df.copy())
+    new_time = time.perf_counter() - start
+
+    return {'rows': num_rows, 'addresses': df['DEFENDANT ADDRESS'].nunique(),
+            'regex_replace_s': old_time, 'normalize_cases_s': new_time}
+
+
+def run_import_benchmark(num_rows = 100000, runs = 5, budget_ms = 100):
+    """
+    Times `python cli.py status` on a store with num_rows cases in fresh interpreters,
+    and checks that it does not import selenium, pandas or numpy. Import time of
+    util1 is timed for comparison.
+
+    Returns a dict with median milliseconds of each, heavy modules imported by status
+    and whether status is within budget_ms
+    """
+    # imported here, scraping runs import them in their own child processes
+    from postprocess import normalize_cases
+    from store import Eviction_Store
+
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    cli_path = os.path.join(package_dir, 'cli.py')
+
+    def median_ms(command):
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run(command, check=True, capture_output=True, cwd=package_dir)
+            times.append((time.perf_counter() - start) * 1000)
+        return float(np.median(times))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store_path = os.path.join(tmp_dir, 'evictions.sqlite')
+        store = Eviction_Store(store_path)
+        store.merge(normalize_cases(make_archive(num_rows).assign(
+            **{'CASE NUMBER': [f'BENCH{i:08d}' for i in range(num_rows)]})))
+        store.build_aggregates()
+        store.close()
+
+        # python start-up alone, subtracted from nothing but shown for reference
+        python_ms = median_ms([sys.executable, '-c', 'pass'])
+        status_ms = median_ms([sys.executable, cli_path, 'status', store_path])
+        util1_ms = median_ms([sys.executable, '-c', 'import util1'])
+        loaded = subprocess.run(
+            [sys.executable, '-c', 'import sys, cli; cli.read_status(sys.argv[1]); '
+             'print(",".join(m for m in ("selenium", "pandas", "numpy") if m in sys.modules))', store_path],
+            check=True, capture_output=True, text=True, cwd=package_dir).stdout.strip()
+
+    return {'rows': num_rows, 'python_ms': python_ms, 'status_ms': status_ms, 'import_util1_ms': util1_ms,
+            'heavy_imports': loaded or 'none', 'within_budget': status_ms <= budget_ms and not loaded}
+
+
+def print_results(results):
+    header = f"{'engine':<12}{'cases':>7}{'issues':>8}{'time s':>9}{'cases/s':>9}" \
+             f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'rss MB':>9}"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print(f"{r['engine']:<12}{r['cases']:>7}{r['issues']:>8}{r['total_time']:>9.2f}"
+              f"{r['cases_per_sec']:>9.1f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}"
+              f"{r['peak_rss_mb']:>9.1f}")
+
+
+if __name__ == '__main__':
+    # python benchmark.py [--engines=http,http-async,http-pipeline] [--start=01022023] [--end=01082023]
+    #   [--cases-per-day=20] [--latency=0.05] [--error-rate=0] [--webdriver=path] [--json=results.json]
+    #   [--baseline=baseline.json [--max-regression=0.2]] exits with 1 if an engine's cases/s dropped
+    #   more than max-regression below the baseline (a --json output of an earlier run)
+    # python benchmark.py --postprocess=1000000 [--addresses=N] times post-processing of a million-row
+    #   archive with N distinct defendant addresses (default one per row)
+    # python benchmark.py --import-time[=100000] [--budget-ms=100] times `cli.py status`, exits
+    #   with 1 if it is over budget or imports selenium, pandas or numpy
+    options = dict(arg[2:].partition('=')[::2] for arg in sys.argv[1:] if arg.startswith('--'))
+
+    if 'import-time' in options:
+        result = run_import_benchmark(int(options['import-time'] or 100000),
+                                      budget_ms=float(options.get('budget-ms', 100)))
+        print(', '.join(f'{key}: {val:.1f}' if isinstance(val, float) else f'{key}: {val}'
+                        for key, val in result.items()))
+        sys.exit(0 if result['within_budget'] else 1)
+
+    if 'postprocess' in options:
+        result = run_postprocess_benchmark(int(options['postprocess'] or 1000000),
+                                           int(options['addresses']) if options.get('addresses') else None)
+        print(', '.join(f'{key}: {val:.2f}' if isinstance(val, float) else f'{key}: {val}'
+                        for key, val in result.items()))
+        sys.exit()
+
+    results = run_benchmark(engines=tuple(options.get('engines', 'http,http-async').split(',')),
+                            start_date=options.get('start', '01022023'),
+                            end_date=options.get('end', '01082023'),
+                            cases_per_day=int(options.get('cases-per-day', 20)),
+                            latency=float(options.get('latency', 0.05)),
+                            error_rate=float(options.get('error-rate', 0)),
+                            webdriver_location=options.get('webdriver'))
+    print_results(results)
+
+    if 'json' in options:
+        with open(options['json'], 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if 'baseline' in options:
+        with open(options['baseline']) as f:
+            regressions = check_regressions(results, json.load(f),
+                                            float(options.get('max-regression', _MAX_REGRESSION)))
+        for message in regressions:
+            print(f'Throughput regression: {message}')
+        sys.exit(1 if regressions else 0)
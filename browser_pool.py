@@ -0,0 +1,245 @@
+# imports
+import atexit
+import logging
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import WebDriverException
+
+# a browser is restarted after this many case pages, Chrome memory grows with every
+# tab opened and closed
+_MAX_PAGES = 500
+# or once Chrome with all its renderers uses more memory than this
+_MAX_RSS_MB = 1500
+# health and memory of a browser are checked every this many pages, the check costs
+# a round trip to the driver and a scan of its processes
+_CHECK_EVERY = 50
+# requests the pages do not need to be scraped
+_BLOCKED_URLS = ['*.css', '*.woff', '*.woff2', '*.ttf', '*.otf', '*.png', '*.jpg', '*.jpeg',
+                 '*.gif', '*.svg', '*.ico', '*.mp4', '*.webm']
+
+logger = logging.getLogger(__name__)
+
+# pools of this process by webdriver location, see get_browser_pool()
+_POOLS = dict()
+
+
+def make_chrome_options(headless = True, block_resources = True):
+    """
+    Lightweight Chrome profile for scraping: headless, "eager" page load (returns as soon
+    as the DOM is ready instead of waiting for every resource) and no images. Stylesheets,
+    fonts and media can only be blocked per tab, see Browser_Pool.block_tab_resources().
+
+    Inputs:
+      headless (bool): run without a window
+      block_resources (bool): do not load images
+    """
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.page_load_strategy = 'eager'
+    if block_resources:
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_experimental_option(
+            "prefs", {"profile.managed_default_content_settings.images": 2})
+    return chrome_options
+
+
+def get_browser_pool(webdriver_location, **pool_options):
+    """
+    Returns the browser pool of this process for a webdriver location, so that
+    scrapers and updaters created one after another reuse warm browsers.
+    Pools are closed when the process exits.
+
+    Inputs:
+      webdriver_location (str): location of Chrome webdriver
+      pool_options: extra keyword arguments of Browser_Pool, used when the pool is created
+    """
+    pool = _POOLS.get(webdriver_location)
+    if pool is None:
+        pool = _POOLS[webdriver_location] = Browser_Pool(webdriver_location, **pool_options)
+    return pool
+
+
+@atexit.register
+def close_browser_pools():
+    for pool in _POOLS.values():
+        pool.close()
+    _POOLS.clear()
+
+
+class Browser_Pool:
+    """
+    Keeps Chrome browsers alive between scrapers of one process. A browser is
+    handed out by acquire() and given back by release(). Browsers that fail a
+    health check, opened max_pages pages or grew above max_rss_mb are quit and
+    replaced by fresh ones by refresh() and release().
+
+    Example:
+        driver = pool.acquire()
+        for ...:
+            driver = pool.refresh(driver)
+            ... open a page ...
+            pool.count_page(driver)
+        pool.release(driver)
+    """
+
+    def __init__(self, webdriver_location, max_pages = _MAX_PAGES, max_rss_mb = _MAX_RSS_MB,
+        headless = True, block_resources = True):
+        """
+        Inputs:
+          webdriver_location (str): location of Chrome webdriver
+          max_pages (int): number of pages after which a browser is restarted
+          max_rss_mb (float): memory of a browser and its renderers after which it is
+            restarted, None for no limit (also when psutil is not installed)
+          headless (bool): run browsers without a window
+          block_resources (bool): do not load images in any tab, nor stylesheets, fonts and
+            media in the first tab and tabs passed to block_tab_resources()
+        """
+        self.webdriver_location = webdriver_location
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.headless = headless
+        self.block_resources = block_resources
+        self.idle = []
+        # id of every browser started by the pool: number of pages opened since the last check
+        # and in total
+        self.pages = dict()
+        self.num_started = 0
+        self.num_recycled = 0
+
+
+    def acquire(self):
+        """
+        Returns a healthy idle browser, or starts a new one.
+        """
+        while self.idle:
+            driver = self.idle.pop()
+            if self.__is_healthy(driver):
+                return driver
+            self.__quit(driver)
+        return self.__start()
+
+
+    def release(self, driver):
+        """
+        Gives a browser back to the pool. Worn out browsers are quit instead.
+        """
+        if self.__is_worn_out(driver, force_check=True):
+            self.__quit(driver)
+            self.num_recycled += 1
+        else:
+            self.idle.append(driver)
+
+
+    def refresh(self, driver):
+        """
+        Returns the same browser, or a fresh one if this one is worn out or broken.
+        The caller has to navigate the fresh browser to its starting page.
+        """
+        if not self.__is_worn_out(driver):
+            return driver
+        logger.info(f'Recycling browser after {self.pages[id(driver)][1]} pages')
+        self.__quit(driver)
+        self.num_recycled += 1
+        return self.__start()
+
+
+    def count_page(self, driver, pages = 1):
+        """
+        Counts pages opened by a browser.
+        """
+        counts = self.pages[id(driver)]
+        counts[0] += pages
+        counts[1] += pages
+
+
+    def block_tab_resources(self, driver):
+        """
+        Blocks stylesheets, fonts and media in the current tab of a browser. Chrome
+        applies the blocked urls to one tab only, so it is called again after switching
+        to a newly opened tab; the page the tab opened with is already loading by then,
+        the pages loaded in it afterwards are blocked.
+        """
+        if not self.block_resources:
+            return
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': _BLOCKED_URLS})
+        except WebDriverException as e:
+            logger.debug(f'Unable to block resources: {e!r}')
+
+
+    def close(self):
+        """
+        Quits all idle browsers.
+        """
+        while self.idle:
+            self.__quit(self.idle.pop())
+
+###############################################################################################
+################################ UTILITY METHODS ##############################################
+###############################################################################################
+
+    def __start(self):
+        driver = webdriver.Chrome(service=Service(self.webdriver_location),
+                                  options=make_chrome_options(self.headless, self.block_resources))
+        # the first tab, where listing and search pages are loaded
+        self.block_tab_resources(driver)
+        self.pages[id(driver)] = [0, 0]
+        self.num_started += 1
+        return driver
+
+
+    def __quit(self, driver):
+        self.pages.pop(id(driver), None)
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+
+    def __is_worn_out(self, driver, force_check = False):
+        """
+        Checks page limit on every call, health and memory every _CHECK_EVERY pages.
+        """
+        counts = self.pages[id(driver)]
+        if counts[1] >= self.max_pages:
+            return True
+        if counts[0] < _CHECK_EVERY and not force_check:
+            return False
+
+        counts[0] = 0
+        if not self.__is_healthy(driver):
+            return True
+        rss_mb = self.__rss_mb(driver)
+        return self.max_rss_mb is not None and rss_mb is not None and rss_mb > self.max_rss_mb
+
+
+    def __is_healthy(self, driver):
+        try:
+            driver.execute_script('return 1')
+            return True
+        except WebDriverException as e:
+            logger.warning(f'Browser failed health check: {e!r}')
+            return False
+
+
+    def __rss_mb(self, driver):
+        """
+        Returns memory (MB) of the browser and all its processes, or None if it is unknown.
+        """
+        try:
+            # imported here to keep psutil optional
+            import psutil
+        except ImportError:
+            return None
+        try:
+            process = psutil.Process(driver.service.process.pid)
+            return sum(p.memory_info().rss for p in [process] + process.children(recursive=True)) / 2 ** 20
+        except (AttributeError, psutil.Error):
+            return None
@@ -0,0 +1,308 @@
+# imports
+import json
+import os
+from bisect import bisect_right
+from contextlib import contextmanager
+from datetime import datetime as dt
+
+try:
+    import fcntl
+    msvcrt = None
+except ImportError:
+    # Windows has byte-range locks instead
+    import msvcrt
+
+from metrics import _write_atomic
+
+# a new segment file is started once the current one grows above this size
+_MAX_SEGMENT_BYTES = 16 * 2 ** 20
+_SEGMENT_PREFIX = 'changes-'
+_SEGMENT_SUFFIX = '.jsonl'
+_CURSOR_DIR = 'cursors'
+# held by a writer while it appends, the daemon and a one-off update may share a log
+_LOCK_NAME = '.lock'
+
+
+def make_run_id():
+    """
+    Returns an id of a scraper run, e.g. '20230115T063000-4242'.
+    """
+    return f"{dt.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+
+
+def _segment_name(first_offset):
+    # zero-padded, so names sort in offset order
+    return f'{_SEGMENT_PREFIX}{first_offset:012d}{_SEGMENT_SUFFIX}'
+
+
+@contextmanager
+def _locked(lock_path):
+    """
+    Holds an exclusive lock of a lock file for the body of a with statement,
+    waiting for other processes that hold it.
+    """
+    with open(lock_path, 'a+') as f:
+        if msvcrt is None:
+            # released when the file is closed
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+            return
+        f.seek(0)
+        while True:
+            try:
+                # retries for 10 seconds before it raises
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                break
+            except OSError:
+                continue
+        try:
+            yield
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _segments(log_dir):
+    """
+    Returns a sorted list of (first offset, path) of segment files in a log directory.
+    """
+    if not os.path.isdir(log_dir):
+        return []
+    segments = []
+    for name in os.listdir(log_dir):
+        if name.startswith(_SEGMENT_PREFIX) and name.endswith(_SEGMENT_SUFFIX):
+            first_offset = int(name[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)])
+            segments.append((first_offset, os.path.join(log_dir, name)))
+    return sorted(segments)
+
+
+class Change_Log:
+    """
+    Append-only log of changes made to the eviction store, kept as JSON lines
+    in segment files of a directory. Every entry has an offset (its position in
+    the log, 1 for the first one) and is one of
+      {"offset", "at", "run_id", "case_number", "op": "insert", "field": null, "old": null, "new": {record}}
+      {"offset", "at", "run_id", "case_number", "op": "update", "field", "old", "new"}
+    A segment is named after the offset of its first entry and is never changed
+    once the next one is started, so consumers may copy or ship closed segments.
+    Writers of several processes may share a log, appends take a file lock.
+    """
+
+    def __init__(self, log_dir, run_id = None, max_segment_bytes = _MAX_SEGMENT_BYTES):
+        """
+        Inputs:
+          log_dir (str): directory of the segment files, created if missing
+          run_id (str): id of the run written into every entry, by default make_run_id()
+          max_segment_bytes (int): size after which a new segment is started
+        """
+        self.log_dir = log_dir
+        self.run_id = run_id or make_run_id()
+        self.max_segment_bytes = max_segment_bytes
+        os.makedirs(log_dir, exist_ok=True)
+        self.lock_path = os.path.join(log_dir, _LOCK_NAME)
+
+        self.last_offset = 0
+        self.segment_path = None
+        # size of the segment after this writer's last append, the log is unchanged
+        # by other writers as long as the tail segment and its size are the same
+        self.segment_size = None
+        with _locked(self.lock_path):
+            self.__read_tail()
+
+
+    def append(self, changes):
+        """
+        Appends changes of one write and syncs them to disk.
+
+        Inputs:
+          changes (lst): dicts with case_number, op, field, old and new
+
+        Returns offset of the last entry
+        """
+        if not changes:
+            return self.last_offset
+
+        with _locked(self.lock_path):
+            # another process may have appended since, offsets continue after its entries
+            self.__read_tail()
+            if self.segment_path is None or self.segment_size >= self.max_segment_bytes:
+                self.segment_path = os.path.join(self.log_dir, _segment_name(self.last_offset + 1))
+
+            now = dt.now().isoformat(timespec='seconds')
+            lines = []
+            for change in changes:
+                self.last_offset += 1
+                lines.append(json.dumps({'offset': self.last_offset, 'at': now, 'run_id': self.run_id, **change},
+                                        default=str))
+            with open(self.segment_path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+                self.segment_size = f.tell()
+        return self.last_offset
+
+
+    def committed_offsets(self):
+        """
+        Returns a dict {consumer: offset committed by its Change_Log_Reader}.
+        """
+        cursor_dir = os.path.join(self.log_dir, _CURSOR_DIR)
+        if not os.path.isdir(cursor_dir):
+            return dict()
+        offsets = dict()
+        for name in os.listdir(cursor_dir):
+            if name.endswith('.json'):
+                with open(os.path.join(cursor_dir, name)) as f:
+                    offsets[name[:-len('.json')]] = json.load(f)['offset']
+        return offsets
+
+
+    def prune(self, offset = None):
+        """
+        Removes closed segments whose entries all are at or before offset and at or
+        before the smallest offset committed by the consumers, so that no consumer
+        misses entries. Nothing is removed while no consumer has committed.
+
+        Inputs:
+          offset (int): keep entries after this offset too, None to prune up to the
+            consumers' offset
+
+        Returns number of removed segments
+        """
+        committed = self.committed_offsets()
+        if not committed:
+            return 0
+        offset = min(committed.values()) if offset is None else min(offset, *committed.values())
+
+        segments = _segments(self.log_dir)
+        removed = 0
+        # a segment ends where the next one starts, the current segment is kept
+        for (_, path), (next_first_offset, _) in zip(segments, segments[1:]):
+            if next_first_offset - 1 > offset:
+                break
+            os.remove(path)
+            removed += 1
+        return removed
+
+###############################################################################################
+################################ UTILITY METHODS ##############################################
+###############################################################################################
+
+    def __read_tail(self):
+        """
+        Sets the tail segment and the offset of its last entry, called with the lock held.
+        Segments are only read if another writer changed them since this one's last append.
+        """
+        segments = _segments(self.log_dir)
+        if not segments:
+            self.last_offset, self.segment_path, self.segment_size = 0, None, None
+            return
+        first_offset, segment_path = segments[-1]
+        segment_size = os.path.getsize(segment_path)
+        if segment_path == self.segment_path and segment_size == self.segment_size:
+            return
+        self.segment_path = segment_path
+        self.last_offset = first_offset - 1 + self.__recover(segment_path)
+        self.segment_size = os.path.getsize(segment_path)
+
+
+    def __recover(self, segment_path):
+        """
+        Cuts off a half-written last line left by a crash.
+
+        Returns number of complete entries in the segment
+        """
+        with open(segment_path, 'rb+') as f:
+            data = f.read()
+            end = data.rfind(b'\n') + 1
+            if end < len(data):
+                f.truncate(end)
+        return data[:end].count(b'\n')
+
+
+class Change_Log_Reader:
+    """
+    Cursor-based reader of a change log. A consumer keeps the offset of the last
+    entry it processed and reads only the entries after it; segments before
+    the offset are skipped without being opened. With a consumer name the offset
+    is kept in the log directory between runs.
+
+    Example:
+        reader = Change_Log_Reader('evictions.changes', consumer='dashboard')
+        for change in reader.poll():
+            ... apply change ...
+        reader.commit()
+    """
+
+    def __init__(self, log_dir, consumer = None, offset = None):
+        """
+        Inputs:
+          log_dir (str): directory of the change log
+          consumer (str): name of the consumer whose committed offset is loaded and saved
+          offset (int): offset of the last processed entry, overrides the committed one,
+            0 to read from the start
+        """
+        self.log_dir = log_dir
+        self.consumer = consumer
+        self.cursor_path = os.path.join(log_dir, _CURSOR_DIR, f'{consumer}.json') if consumer else None
+        if offset is None:
+            offset = self.__load_offset()
+        self.offset = offset
+        # offset of the last entry returned by poll(), saved by commit()
+        self.position = offset
+
+
+    def read(self, offset, limit = None):
+        """
+        Returns a list of entries after offset, at most limit of them.
+        """
+        segments = _segments(self.log_dir)
+        # first segment that may hold offset + 1
+        start = max(0, bisect_right([first_offset for first_offset, _ in segments], offset + 1) - 1)
+        entries = []
+        for _, path in segments[start:]:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    if not line.endswith('\n'):
+                        # being written right now
+                        break
+                    entry = json.loads(line)
+                    if entry['offset'] <= offset:
+                        continue
+                    entries.append(entry)
+                    if limit is not None and len(entries) >= limit:
+                        return entries
+        return entries
+
+
+    def poll(self, limit = None):
+        """
+        Returns entries after the last polled one, at most limit of them.
+        """
+        entries = self.read(self.position, limit)
+        if entries:
+            self.position = entries[-1]['offset']
+        return entries
+
+
+    def commit(self, offset = None):
+        """
+        Marks entries up to offset (by default the last polled one) as processed,
+        the next reader of this consumer starts after them.
+        """
+        self.offset = self.position if offset is None else offset
+        self.position = max(self.position, self.offset)
+        if self.cursor_path is not None:
+            os.makedirs(os.path.dirname(self.cursor_path), exist_ok=True)
+            _write_atomic(self.cursor_path, json.dumps({'offset': self.offset,
+                                                        'committed_at': dt.now().isoformat()}))
+
+###############################################################################################
+################################ UTILITY METHODS ##############################################
+###############################################################################################
+
+    def __load_offset(self):
+        if self.cursor_path is None or not os.path.exists(self.cursor_path):
+            return 0
+        with open(self.cursor_path) as f:
+            return json.load(f)['offset']
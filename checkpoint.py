@@ -0,0 +1,142 @@
+# imports
+import json
+import sqlite3
+from datetime import datetime as dt
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS windows (
+    start TEXT NOT NULL,
+    end TEXT NOT NULL,
+    finished_at TEXT NOT NULL,
+    PRIMARY KEY (start, end)
+);
+CREATE TABLE IF NOT EXISTS cases (
+    case_number TEXT PRIMARY KEY,
+    record TEXT NOT NULL,
+    finished_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS issues (
+    case_number TEXT PRIMARY KEY,
+    finished_at TEXT NOT NULL
+);
+"""
+
+
+class Progress_Journal:
+    """
+    Durable journal of a scrape job kept in a SQLite file. Records finished time
+    periods and every finished case (with its scraped fields) as soon as they
+    complete, so that a crashed job can be resumed without losing finished work.
+    """
+
+    def __init__(self, journal_path, resume = True):
+        """
+        Inputs:
+          journal_path (str): location of the SQLite journal file
+          resume (bool): keep progress of a previous run, otherwise start from scratch
+        """
+        self.journal_path = journal_path
+        # the writer thread of a pipeline records cases while the thread that opened
+        # the journal waits for them
+        self.conn = sqlite3.connect(journal_path, timeout=60, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+        if not resume:
+            self.clear()
+
+
+    def clear(self):
+        """
+        Removes all progress from the journal.
+        """
+        with self.conn:
+            for table in ('windows', 'cases', 'issues'):
+                self.conn.execute(f"DELETE FROM {table}")
+
+
+    def close(self):
+        self.conn.close()
+
+
+    def is_window_done(self, start, end):
+        """
+        Checks whether the [start, end] time period was scraped completely.
+        """
+        row = self.conn.execute("SELECT 1 FROM windows WHERE start = ? AND end = ?",
+                                (start, end)).fetchone()
+        return row is not None
+
+
+    def finish_window(self, start, end):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO windows VALUES (?, ?, ?)",
+                              (start, end, dt.now().isoformat()))
+
+
+    def finished_cases(self):
+        """
+        Returns a set of case numbers that were already scraped or failed.
+        """
+        rows = self.conn.execute("SELECT case_number FROM cases UNION SELECT case_number FROM issues")
+        return {case_number for case_number, in rows}
+
+
+    def finish_case(self, case_number, record):
+        """
+        Saves scraped fields of one case.
+
+        Inputs:
+          case_number (str)
+          record (CaseRecord)
+        """
+        self.finish_cases([(case_number, record)])
+
+
+    def finish_cases(self, cases):
+        """
+        Saves scraped fields of many cases in one transaction.
+
+        Inputs:
+          cases (lst): tuples (case_number, record)
+        """
+        finished_at = dt.now().isoformat()
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO cases VALUES (?, ?, ?)",
+                                  [(case_number, json.dumps(record.to_dict()), finished_at)
+                                   for case_number, record in cases])
+
+
+    def add_issue(self, case_number):
+        self.add_issues([case_number])
+
+
+    def add_issues(self, case_numbers):
+        finished_at = dt.now().isoformat()
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO issues VALUES (?, ?)",
+                                  [(case_number, finished_at) for case_number in case_numbers])
+
+
+    def records(self, keys_list):
+        """
+        Returns all finished cases as a dict of lists, in the order they were scraped.
+
+        Inputs:
+          keys_list (lst): column names
+        """
+        eviction_cases = {key: [] for key in keys_list}
+        for record, in self.conn.execute("SELECT record FROM cases ORDER BY rowid"):
+            record = json.loads(record)
+            for key in keys_list:
+                eviction_cases[key].append(record.get(key))
+        return eviction_cases
+
+
+    def issues(self):
+        """
+        Returns a list of case numbers that failed.
+        """
+        return [case_number for case_number, in
+                self.conn.execute("SELECT case_number FROM issues ORDER BY rowid")]
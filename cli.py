@@ -0,0 +1,271 @@
+# imports
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+
+# only the standard library is imported at module load: selenium, pandas and numpy
+# are imported inside the commands that scrape or read whole tables, so that
+# `status` answers in milliseconds
+
+# same name as in store.py, which is not imported here since it loads pandas
+_TABLE = 'eviction_cases'
+
+
+def store_path_of(path):
+    """
+    Returns the SQLite store of an eviction csv file (the store next to it), or the path
+    itself if it already is a store.
+    """
+    root, ext = os.path.splitext(path)
+    return root + '.sqlite' if ext.lower() == '.csv' else path
+
+
+def read_status(store_path):
+    """
+    Reads a summary of the store with a few indexed queries and stored metadata,
+    without loading pandas: number of cases and open cases, latest filed date,
+    last write, daemon watermark and retry queue counts.
+
+    Inputs:
+      store_path (str): location of SQLite store
+
+    Returns a dict
+    """
+    if not os.path.exists(store_path):
+        raise FileNotFoundError(f'No store at {store_path}')
+
+    # read-only, a running scraper or daemon is not disturbed
+    conn = sqlite3.connect(f'file:{store_path}?mode=ro', uri=True, timeout=60)
+    try:
+        tables = {name for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        metadata = dict(conn.execute("SELECT key, value FROM metadata")) if 'metadata' in tables else dict()
+        status = {'store': store_path}
+
+        if 'weekly_aggregates' in tables and metadata.get('aggregates_built'):
+            # totals of the weekly aggregates cost O(weeks), not O(cases)
+            cases, open_cases = conn.execute(
+                "SELECT COALESCE(SUM(filings), 0), COALESCE(SUM(open), 0) FROM weekly_aggregates "
+                "WHERE dimension = 'all'").fetchone()
+            # cases without a filed date have no week, they are counted on the filed date index
+            undated, undated_open = conn.execute(
+                f'SELECT COUNT(*), COALESCE(SUM("DISPOSITION" IS NULL), 0) FROM {_TABLE} '
+                f'WHERE "FILED DATE" IS NULL').fetchone()
+            cases += undated
+            open_cases += undated_open
+        elif _TABLE in tables:
+            cases, = conn.execute(f"SELECT COUNT(*) FROM {_TABLE}").fetchone()
+            # counted on the partial index of open cases
+            open_cases, = conn.execute(f'SELECT COUNT(*) FROM {_TABLE} WHERE "DISPOSITION" IS NULL').fetchone()
+        else:
+            cases = open_cases = 0
+        status['cases'] = cases
+        status['open_cases'] = open_cases
+        status['latest_filed_date'] = conn.execute(
+            f'SELECT MAX("FILED DATE") FROM {_TABLE}').fetchone()[0] if _TABLE in tables else None
+
+        status['last_write'] = metadata.get('last_write')
+        status['migrated_from'] = metadata.get('migrated_from')
+        status['daemon_watermark'] = metadata.get('daemon_watermark')
+        if 'retry_queue' in tables:
+            status['retry_queue'], = conn.execute("SELECT COUNT(*) FROM retry_queue").fetchone()
+            status['dead_letters'], = conn.execute("SELECT COUNT(*) FROM dead_letters").fetchone()
+    finally:
+        conn.close()
+    return status
+
+
+def _scraper_options(args):
+    """
+    Returns a dict of keyword arguments of run_eviction_scraper / scrape_period from parsed flags.
+    """
+    run_options = {'engine': args.engine, 'workers': args.workers, 'resume': args.resume}
+    for name in ('cases_per_second', 'concurrency', 'rate', 'fetch_workers', 'parse_workers',
+                 'page_cache_path', 'page_cache_max_mb', 'page_cache_max_age_days', 'window_stats_path',
+                 'target_window_rows'):
+        if getattr(args, name) is not None:
+            run_options[name] = getattr(args, name)
+    if args.webdriver is not None:
+        run_options['webdriver_location'] = args.webdriver
+    return run_options
+
+
+def cmd_status(args):
+    status = read_status(store_path_of(args.path))
+    if args.json:
+        print(json.dumps(status, indent=2))
+    else:
+        for key, value in status.items():
+            print(f'{key}: {value}')
+
+
+def cmd_update(args):
+    from util1 import run_eviction_scraper
+
+    message = run_eviction_scraper(args.csv_path, start_date=args.start, end_date=args.end,
+                                   journal_path=f'{args.csv_path}.journal', store_path=args.store,
+                                   update_open_cases=not args.no_recheck, recheck_budget=args.recheck_budget,
+                                   metrics_path=args.metrics, address_cache_path=args.address_cache,
+                                   change_log_dir=args.change_log, **_scraper_options(args))
+    if message:
+        print(message)
+
+
+def cmd_scrape(args):
+    from addresses import get_address_normalizer, use_address_cache
+    from metrics import Metrics
+    from records import PARTIES
+    from util1 import scrape_period
+
+    if args.address_cache is not None:
+        use_address_cache(args.address_cache)
+    metrics = Metrics()
+    new_df, df_cases_w_issues = scrape_period(args.start, args.end, journal_path=f'{args.csv_path}.journal',
+                                              metrics=metrics, **_scraper_options(args))
+    with metrics.timer('storage_write'):
+        new_df.drop(columns=PARTIES).to_csv(args.csv_path, index=False)
+    df_cases_w_issues.to_csv(os.path.join(os.path.dirname(args.csv_path),
+                                          f'cases_w_issues_{args.start}-{args.end}.csv'))
+    get_address_normalizer().close()
+    logging.getLogger(__name__).info(metrics.summary())
+    if args.metrics is not None:
+        metrics.write(args.metrics)
+
+
+def cmd_reparse(args):
+    from records import PARTIES
+    from util1 import reparse_cache
+
+    new_df, df_cases_w_issues = reparse_cache(args.page_cache)
+    new_df.drop(columns=PARTIES).to_csv(args.csv_path, index=False)
+    if not df_cases_w_issues.empty:
+        logging.getLogger(__name__).warning(f'Cases that failed to parse: {len(df_cases_w_issues)}')
+
+
+def cmd_daemon(args):
+    from daemon import Scraper_Daemon
+    from store import Eviction_Store
+
+    store_path = args.store or store_path_of(args.csv_path)
+    if os.path.exists(args.csv_path) and args.csv_path != store_path:
+        store = Eviction_Store(store_path)
+        try:
+            store.migrate_csv(args.csv_path)
+        finally:
+            store.close()
+
+    options = _scraper_options(args)
+    Scraper_Daemon(store_path, engine=options.pop('engine'), start_date=args.start,
+                   poll_interval=args.poll_interval, recheck_batch=args.recheck_batch,
+                   recheck_pause=args.recheck_pause, status_path=args.status, metrics_path=args.metrics,
+                   address_cache_path=args.address_cache, change_log_dir=args.change_log, **options).run()
+
+
+def cmd_export(args):
+    from store import Eviction_Store
+
+    store = Eviction_Store(store_path_of(args.path))
+    try:
+        store.export_csv(args.out_path)
+    finally:
+        store.close()
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(prog='cli.py', description='Hamilton County eviction cases scraper')
+    parser.add_argument('--quiet', action='store_true', help='print warnings only')
+    parser.add_argument('--verbose', action='store_true', help='print every case')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    # flags of the commands that scrape
+    scraping = argparse.ArgumentParser(add_help=False)
+    scraping.add_argument('--engine', default='selenium', choices=['selenium', 'http'])
+    scraping.add_argument('--webdriver', help='location of Chrome webdriver')
+    scraping.add_argument('--workers', type=int, default=1, help='scrape time periods in N processes')
+    scraping.add_argument('--cases-per-second', type=float, help='rate limit shared by all workers')
+    scraping.add_argument('--concurrency', type=int, help='parallel case fetching of http engine')
+    scraping.add_argument('--rate', type=float, help='requests per second of http engine')
+    scraping.add_argument('--fetch-workers', type=int, help='run http engine as a fetch / parse / write pipeline')
+    scraping.add_argument('--parse-workers', type=int, help='parse processes of the pipeline')
+    scraping.add_argument('--page-cache', dest='page_cache_path', help='keep raw pages in a SQLite cache')
+    scraping.add_argument('--page-cache-max-mb', type=float, help='evict oldest cached pages above N MB')
+    scraping.add_argument('--page-cache-max-age', dest='page_cache_max_age_days', type=float,
+                          help='evict cached pages older than N days')
+    scraping.add_argument('--window-stats', dest='window_stats_path', help='size search windows by result counts')
+    scraping.add_argument('--window-rows', dest='target_window_rows', type=int,
+                          help='number of cases a search window should return')
+    scraping.add_argument('--address-cache', help='keep parsed addresses in a SQLite file between runs')
+    scraping.add_argument('--resume', action='store_true', help='continue a crashed run from its journal')
+    scraping.add_argument('--metrics', help='write stage timings and counters to PATH.json and PATH.prom')
+
+    update = commands.add_parser('update', parents=[scraping],
+                                 help='scrape new cases into the store and re-check open cases')
+    update.add_argument('csv_path', help='eviction csv file, imported into the store next to it the first time')
+    update.add_argument('--start', help='first filed date (mmddyyyy), by default the day after the latest one')
+    update.add_argument('--end', help='last filed date (mmddyyyy), by default today')
+    update.add_argument('--store', help='location of SQLite store, by default next to the csv file')
+    update.add_argument('--recheck-budget', type=int, help='re-check at most N open cases')
+    update.add_argument('--no-recheck', action='store_true', help='do not re-check open cases')
+    update.add_argument('--change-log', help='append new cases and changed fields to a change log in DIR')
+    update.set_defaults(func=cmd_update)
+
+    scrape = commands.add_parser('scrape', parents=[scraping],
+                                 help='scrape cases filed between two dates into a new csv file')
+    scrape.add_argument('csv_path')
+    scrape.add_argument('start', help='mmddyyyy')
+    scrape.add_argument('end', help='mmddyyyy')
+    scrape.set_defaults(func=cmd_scrape)
+
+    reparse = commands.add_parser('reparse', help='rebuild a csv file from cached pages without scraping')
+    reparse.add_argument('csv_path')
+    reparse.add_argument('page_cache', help='SQLite page cache written with --page-cache')
+    reparse.set_defaults(func=cmd_reparse)
+
+    daemon = commands.add_parser('daemon', parents=[scraping],
+                                 help='keep polling for new cases and re-checking open ones until stopped')
+    daemon.add_argument('csv_path', help='eviction csv file, imported into the store next to it the first time')
+    daemon.add_argument('--start', help='first filed date (mmddyyyy) when the store is empty')
+    daemon.add_argument('--store', help='location of SQLite store, by default next to the csv file')
+    daemon.add_argument('--poll-interval', type=float, default=900, help='seconds between polls for new cases')
+    daemon.add_argument('--recheck-batch', type=int, default=50,
+                        help='open cases re-checked at once between polls, 0 to skip re-checks')
+    daemon.add_argument('--recheck-pause', type=float, default=60, help='seconds between re-check batches')
+    daemon.add_argument('--status', help='write the daemon state to a JSON file after every step')
+    daemon.add_argument('--change-log', help='append new cases and changed fields to a change log in DIR')
+    daemon.set_defaults(func=cmd_daemon)
+
+    status = commands.add_parser('status', help='print a summary of the store')
+    status.add_argument('path', help='SQLite store or the csv file next to it')
+    status.add_argument('--json', action='store_true')
+    status.set_defaults(func=cmd_status)
+
+    export = commands.add_parser('export', help='write all cases of the store into a csv file')
+    export.add_argument('path', help='SQLite store or the csv file next to it')
+    export.add_argument('out_path')
+    export.set_defaults(func=cmd_export)
+
+    return parser
+
+
+def main(argv = None):
+    args = make_parser().parse_args(argv)
+    log_level = logging.WARNING if args.quiet else logging.DEBUG if args.verbose else logging.INFO
+    logging.basicConfig(level=log_level, format='%(asctime)s %(message)s')
+    try:
+        args.func(args)
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+# python cli.py update evictions.csv [--engine=http] [--recheck-budget=N] ...
+# python cli.py scrape new.csv 01012023 01312023 [--engine=http] ...
+# python cli.py reparse rebuilt.csv pages.sqlite
+# python cli.py daemon evictions.csv [--engine=http] [--poll-interval=900] [--status=daemon.json] ...
+# python cli.py status evictions.csv [--json]
+# python cli.py export evictions.csv out.csv
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,301 @@
+# imports
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime as dt, timedelta as tdelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from string import Template
+from urllib.parse import parse_qs, urlsplit
+
+_FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'court_site')
+
+_LISTING_PATH = '/records-search/municipal-civil-listing-by-classification/'
+_CASE_PATH = '/records-search/case-summary/'
+_CASE_SEARCH_PATH = '/records-search/search-by-case-number/'
+
+# pools of values for synthetic cases, a few landlords and attorneys file most cases
+_JUDGES = ['JUDGE A. MILLER', 'JUDGE B. JOHNSON', 'JUDGE C. DAVIS', 'JUDGE D. WILSON',
+           'JUDGE E. MOORE', 'JUDGE F. TAYLOR', 'JUDGE G. ANDERSON', 'JUDGE H. THOMAS']
+_PLAINTIFFS = [
+    ('QUEEN CITY APARTMENTS LLC', '100 MAIN ST\nCINCINNATI OH 45202'),
+    ('RIVERVIEW PROPERTY MANAGEMENT', '2500 VINE STREET SUITE 4\nCINCINNATI OH 45219'),
+    ('HILLTOP HOUSING PARTNERS LP', '77 W. FOURTH ST\nCINCINNATI OH 45202'),
+    ('PLUM STREET HOLDINGS LLC', '910 PLUM ST APT 2\nCINCINNATI OH 45202'),
+    ('WESTWOOD RENTALS INC', '3100 HARRISON AVE\nCINCINNATI OH 45211'),
+    ('NORWOOD HOMES LLC', '4600 MONTGOMERY RD\nNORWOOD OH 45212'),
+    ('PRICE HILL REALTY', '3700 WARSAW AVENUE\nCINCINNATI OH 45205'),
+    ('AVONDALE COMMONS LP', '600 RECKINGER AVE\nCINCINNATI OH 45229')]
+_ATTORNEYS = ['SMITH & SMITH LLP', 'JONES LEGAL GROUP', 'BROWN LAW OFFICE', 'LEGAL AID SOCIETY']
+_FIRST_NAMES = ['JOHN', 'MARY', 'JAMES', 'PATRICIA', 'ROBERT', 'JENNIFER', 'MICHAEL', 'LINDA']
+_LAST_NAMES = ['DOE', 'ROE', 'GREEN', 'WHITE', 'HARRIS', 'CLARK', 'LEWIS', 'WALKER', 'HALL']
+_STREETS = ['ELM ST', 'RACE STREET', 'W. MCMICKEN AVE', 'GLENWAY AVENUE', 'READING RD', 'QUEEN CITY AVE']
+_DISPOSITIONS = ['JUDGMENT FOR PLAINTIFF', 'DISMISSED', 'DISMISSED - SETTLED', 'DEFAULT JUDGMENT']
+
+
+def _load_fixture(fixtures_dir, name):
+    with open(os.path.join(fixtures_dir, name), encoding='utf-8') as f:
+        return Template(f.read())
+
+
+class Court_Stub:
+    """
+    Local stand-in of the court clerk website. Serves the classification search
+    page, listing of eviction cases, case summary / parties pages and search by
+    case number from the page templates in fixtures/court_site, filled with
+    synthetic cases. Latency and server errors can be injected to test
+    scrapers offline and to benchmark them (see benchmark.py).
+    """
+
+    def __init__(self, host = '127.0.0.1', port = 0, cases_per_day = 20, latency = 0,
+        error_rate = 0, seed = 0, fixtures_dir = _FIXTURES_DIR):
+        """
+        Inputs:
+          host (str), port (int): address to listen on, port 0 picks a free port
+          cases_per_day (int): number of eviction cases filed on each day
+          latency (float): average delay of every response in seconds
+          error_rate (float): share of requests answered with 503 error
+          seed (int): seed of synthetic case data and injected errors
+          fixtures_dir (str): directory with page templates
+        """
+        self.cases_per_day = cases_per_day
+        self.latency = latency
+        self.error_rate = error_rate
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.num_requests = 0
+        self.num_errors = 0
+        self.lock = threading.Lock()
+
+        self.templates = {name: _load_fixture(fixtures_dir, name + '.html') for name in
+                          ('search', 'listing', 'listing_row', 'case', 'party_table', 'case_search')}
+
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.stub = self
+        self.thread = None
+
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+
+    @property
+    def listing_url(self):
+        return self.base_url + _LISTING_PATH
+
+
+    @property
+    def case_search_url(self):
+        return self.base_url + _CASE_SEARCH_PATH
+
+
+    def start(self):
+        """
+        Starts serving in a background thread.
+        """
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+
+    def stop(self):
+        # shutdown() waits for serve_forever(), which never runs if the stub was not started
+        if self.thread is not None:
+            self.server.shutdown()
+            self.thread = None
+        self.server.server_close()
+
+
+    def __enter__(self):
+        return self.start()
+
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+    def case(self, case_number):
+        """
+        Returns synthetic fields of a case (dict) or None if the case number does not exist.
+        Case number encodes its filed date and position: yyCVdddnnn.
+        """
+        try:
+            year, day, position = int(case_number[:2]), int(case_number[4:7]), int(case_number[7:])
+            filed = dt(2000 + year, 1, 1).date() + tdelta(days=day - 1)
+        except ValueError:
+            return None
+        if case_number[2:4] != 'CV' or position >= self.cases_per_day:
+            return None
+
+        rng = random.Random(f'{self.seed}-{case_number}')
+        plaintiff, plaintiff_address = rng.choice(_PLAINTIFFS)
+        defendant = f'{rng.choice(_LAST_NAMES)} {rng.choice(_FIRST_NAMES)}'
+        defendant_address = f'{rng.randint(100, 4999)} {rng.choice(_STREETS)}\nCINCINNATI OH 452{rng.randint(1, 40):02d}'
+
+        disposition = None
+        disposition_date = filed + tdelta(days=rng.randint(14, 120))
+        if disposition_date < dt.today().date() and rng.random() < 0.8:
+            disposition = f'{disposition_date:%m/%d/%Y} - {rng.choice(_DISPOSITIONS)}'
+
+        return {
+            'case_number': case_number, 'court': 'HAMILTON COUNTY MUNICIPAL COURT',
+            'caption': f'{plaintiff} VS. {defendant}', 'judge': rng.choice(_JUDGES),
+            'filed_date': f'{filed:%m/%d/%Y}', 'case_type': 'G - FORCIBLE ENTRY AND DETAINER',
+            'amount': f'${rng.randint(300, 9000):,}.00', 'disposition': disposition,
+            'plaintiff': plaintiff, 'plaintiff_address': plaintiff_address,
+            'plaintiff_attorney': rng.choice(_ATTORNEYS) if rng.random() < 0.9 else None,
+            'defendant': defendant, 'defendant_address': defendant_address,
+            'defendant_attorney': rng.choice(_ATTORNEYS) if rng.random() < 0.1 else None}
+
+
+    def case_numbers(self, begdate, enddate):
+        """
+        Returns case numbers of all cases filed between begdate and enddate (mm/dd/yyyy).
+        """
+        start = dt.strptime(begdate, '%m/%d/%Y').date()
+        end = dt.strptime(enddate, '%m/%d/%Y').date()
+
+        case_numbers = []
+        while start <= end:
+            day = start.timetuple().tm_yday
+            case_numbers += [f'{start:%y}CV{day:03d}{i:03d}' for i in range(self.cases_per_day)]
+            start += tdelta(days=1)
+        return case_numbers
+
+###############################################################################################
+################################ PAGE RENDERING ###############################################
+###############################################################################################
+
+    def render_search(self):
+        return self.templates['search'].substitute(action=_LISTING_PATH)
+
+
+    def render_case_search(self):
+        return self.templates['case_search'].substitute(case_action=_CASE_PATH)
+
+
+    def render_listing(self, begdate, enddate):
+        rows = []
+        for case_number in self.case_numbers(begdate, enddate):
+            case = self.case(case_number)
+            rows.append(self.templates['listing_row'].substitute(
+                case_number=case_number, filed_date=case['filed_date'],
+                caption=case['caption'], case_action=_CASE_PATH))
+        return self.templates['listing'].substitute(
+            begdate=begdate, enddate=enddate, count=len(rows), rows=''.join(rows))
+
+
+    def render_case(self, case, parties = False):
+        disposition_row = ''
+        if case['disposition']:
+            disposition_row = f'                <tr><td>Disposition:</td><td>{case["disposition"]}</td></tr>'
+
+        party_table = ''
+        if parties:
+            rows = [self.__party_row(case['plaintiff'], case['plaintiff_address'], 'P 1', case['plaintiff_attorney']),
+                    self.__party_row(case['defendant'], case['defendant_address'], 'D 1', case['defendant_attorney'])]
+            party_table = self.templates['party_table'].substitute(rows=''.join(rows))
+
+        return self.templates['case'].substitute(
+            case_action=_CASE_PATH, disposition_row=disposition_row, party_table=party_table, **case)
+
+
+    def __party_row(self, name, address, party, attorney):
+        cells = [name, address.replace('\n', '<br>\n'), party]
+        if attorney:
+            cells.append(attorney)
+        return '      <tr>' + ''.join(f'<td>{cell}</td>' for cell in cells) + '</tr>\n'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    Routes requests of the court stub.
+    """
+
+    def log_message(self, format, *args):
+        pass
+
+
+    def do_GET(self):
+        if not self.__before_response():
+            return
+        path = urlsplit(self.path).path
+        stub = self.server.stub
+
+        if path == _LISTING_PATH:
+            self.__send(stub.render_search())
+        elif path == _CASE_SEARCH_PATH:
+            self.__send(stub.render_case_search())
+        else:
+            self.__send('Not found', 404)
+
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        data = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+        if not self.__before_response():
+            return
+        path = urlsplit(self.path).path
+        stub = self.server.stub
+
+        if path == _LISTING_PATH:
+            try:
+                if data.get('ccode') != 'G':
+                    raise ValueError('only G classification is served')
+                self.__send(stub.render_listing(data['begdate'], data['enddate']))
+            except (KeyError, ValueError) as e:
+                self.__send(f'Bad search: {e}', 400)
+        elif path == _CASE_PATH:
+            case = stub.case(data.get('casenumber', '').strip().upper())
+            if case is None:
+                self.__send('Case not found', 404)
+            else:
+                self.__send(stub.render_case(case, parties=data.get('view') == 'parties'))
+        else:
+            self.__send('Not found', 404)
+
+
+    def __before_response(self):
+        """
+        Applies injected latency and errors. Returns False if an error was sent.
+        """
+        stub = self.server.stub
+        with stub.lock:
+            stub.num_requests += 1
+            delay = stub.random.uniform(0.5, 1.5) * stub.latency
+            failed = stub.random.random() < stub.error_rate
+            if failed:
+                stub.num_errors += 1
+
+        time.sleep(delay)
+        if failed:
+            self.__send('Service unavailable', 503)
+            return False
+        return True
+
+
+    def __send(self, body, status = 200):
+        body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+# python court_stub.py [port] [latency] [error_rate]
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) >= 2 else 8000
+    latency = float(sys.argv[2]) if len(sys.argv) >= 3 else 0
+    error_rate = float(sys.argv[3]) if len(sys.argv) >= 4 else 0
+
+    stub = Court_Stub(port=port, latency=latency, error_rate=error_rate)
+    print(f'Serving court stub at {stub.listing_url}')
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
@@ -0,0 +1,310 @@
+# imports
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from datetime import datetime as dt
+
+from addresses import get_address_normalizer, use_address_cache
+from changelog import Change_Log, make_run_id
+from metrics import Metrics, _write_atomic
+from retry_queue import Retry_Queue
+from scheduler import Recheck_Scheduler
+from store import Eviction_Store
+from util1 import _CASE_SEARCH_URL, _WEBDRIVER_LOCATION, Update_Eviction_Cases, retry_failed_cases, scrape_period
+
+# metadata key of the last day polled completely
+_WATERMARK_KEY = 'daemon_watermark'
+
+logger = logging.getLogger(__name__)
+
+
+class Scraper_Daemon:
+    """
+    Long-running service mode of the scraper. Keeps the eviction store, the
+    http session (or warm browsers of the browser pool) and the re-check
+    scheduler open, and:
+      - every poll_interval seconds scrapes cases filed since the watermark
+        (the last day polled completely, kept in the store) up to today;
+      - between polls retries failed cases due in the retry queue, then re-checks
+        open cases in small batches, most promising first;
+      - writes its state to a JSON status file after every step, so a monitor
+        can tell a stuck daemon from a working one;
+      - on SIGTERM or SIGINT finishes its current step, saves and exits.
+
+    The store and the session are opened by the thread that calls run() (or open(),
+    to call poll(), retry() and recheck() one by one), SQLite connections can only be
+    used by the thread that opened them.
+
+    Example:
+        Scraper_Daemon('evictions.sqlite', engine='http', status_path='daemon.json').run()
+    """
+
+    def __init__(self, store_path, webdriver_location = _WEBDRIVER_LOCATION, engine = 'selenium',
+        start_date = None, poll_interval = 900, recheck_batch = 50, recheck_pause = 60,
+        status_path = None, metrics_path = None, address_cache_path = None, change_log_dir = None,
+        case_search_url = _CASE_SEARCH_URL, **scraper_options):
+        """
+        Inputs:
+          store_path (str): location of SQLite store
+          webdriver_location (str): location of Chrome webdriver on the local machine.
+          engine (str): 'selenium' or 'http'
+          start_date (str): format mmddyyyy, first day to scrape when the store is empty
+            and has no watermark
+          poll_interval (float): seconds between polls for new filings
+          recheck_batch (int): number of open cases re-checked (and failed cases retried)
+            at once between polls, 0 to skip re-checks
+          recheck_pause (float): seconds between re-check batches
+          status_path (str): location of JSON status file, None to skip
+          metrics_path (str): stage timings and counters are written to
+            <metrics_path>.json and <metrics_path>.prom after every step, None to skip
+          address_cache_path (str): location of SQLite file where parsed addresses are
+            kept between runs, None to keep them in memory only
+          change_log_dir (str): directory of the change log of new cases and changed
+            fields, every poll is a run of its own. None to skip
+          case_search_url (str): search-by-case-number page that failed cases are retried
+            and open cases re-checked on
+          scraper_options: extra keyword arguments of the engine's scraper class
+        """
+        self.webdriver_location = webdriver_location
+        self.engine = engine
+        self.start_date = start_date
+        self.poll_interval = poll_interval
+        self.recheck_batch = recheck_batch
+        self.recheck_pause = recheck_pause
+        self.status_path = status_path
+        self.metrics_path = metrics_path
+        self.store_path = store_path
+        self.address_cache_path = address_cache_path
+        self.change_log_dir = change_log_dir
+        self.case_search_url = case_search_url
+        self.scraper_options = scraper_options
+        # opened by open()
+        self.store = None
+        self.scheduler = None
+        self.retry_queue = None
+        self.metrics = Metrics()
+        self.stopping = threading.Event()
+
+        self.status = {'pid': os.getpid(), 'state': 'starting', 'started_at': dt.now().isoformat(),
+                       'watermark': None, 'polls': 0, 'failed_polls': 0, 'last_poll_at': None,
+                       'next_poll_at': None, 'rechecks': 0, 'retries': 0, 'last_error': None}
+
+
+    def open(self):
+        """
+        Opens the store, the re-check scheduler, the retry queue and the http session
+        in the calling thread. Called by run().
+        """
+        if self.address_cache_path is not None:
+            use_address_cache(self.address_cache_path)
+
+        self.store = Eviction_Store(self.store_path)
+        self.store.index_parties()
+        self.store.build_aggregates()
+        if self.change_log_dir is not None:
+            self.store.change_log = Change_Log(self.change_log_dir)
+        self.scheduler = Recheck_Scheduler(self.store)
+        self.retry_queue = Retry_Queue(self.store)
+
+        if self.engine == 'http' and 'session' not in self.scraper_options:
+            # imported here since http_scraper module depends on util1
+            from http_scraper import make_session
+            # one keep-alive session for all polls
+            self.scraper_options['session'] = make_session()
+
+        self.status['watermark'] = self.store.get_metadata(_WATERMARK_KEY)
+
+
+    def run(self):
+        """
+        Opens the daemon in the calling thread, then polls and re-checks until stop()
+        is called or the process gets SIGTERM / SIGINT.
+        """
+        self.open()
+        # signal handlers can only be set in the main thread
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, self.__on_signal)
+
+        try:
+            while not self.stopping.is_set():
+                next_poll = time.time() + self.poll_interval
+                self.poll()
+                self.__set_state('idle', next_poll_at=dt.fromtimestamp(next_poll).isoformat())
+
+                # retries and re-checks fill the time until the next poll
+                while not self.stopping.is_set() and time.time() < next_poll:
+                    if not self.retry() and not (self.recheck_batch and self.recheck()):
+                        self.stopping.wait(next_poll - time.time())
+                        break
+                    self.stopping.wait(min(self.recheck_pause, max(0, next_poll - time.time())))
+        finally:
+            self.close()
+
+
+    def stop(self):
+        """
+        Asks the daemon to exit after its current step. Safe to call from a signal handler.
+        """
+        self.status['state'] = 'stopping'
+        self.stopping.set()
+
+
+    def close(self):
+        session = self.scraper_options.get('session')
+        if session is not None:
+            session.close()
+        get_address_normalizer().close()
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+        self.__set_state('stopped')
+
+
+    def poll(self):
+        """
+        Scrapes cases filed from the watermark day to today and merges them into the store.
+        The watermark day is searched again, cases filed on it after the last poll are picked up;
+        cases already in the store are not fetched again, re-checks keep them up to date.
+
+        Returns a dict with number of inserted, updated and skipped rows, or None if the poll failed
+        """
+        today = dt.today().date()
+        start_date = self.__poll_start()
+        if start_date is None:
+            raise ValueError('Store is empty, provide a start date for the first poll')
+
+        self.__set_state('polling')
+        if self.store.change_log is not None:
+            # retries and re-checks until the next poll share its run id
+            self.store.change_log.run_id = make_run_id()
+        try:
+            new_df, df_cases_issues = scrape_period(start_date.strftime('%m%d%Y'), today.strftime('%m%d%Y'),
+                                                    self.webdriver_location, self.engine, metrics=self.metrics,
+                                                    skip_cases=self.store.filed_cases(start_date),
+                                                    **self.scraper_options)
+            with self.metrics.timer('storage_write'):
+                counts = self.store.merge(new_df)
+                self.retry_queue.succeed(new_df['CASE NUMBER'])
+                self.retry_queue.add_issues(df_cases_issues)
+                with self.store.conn:
+                    self.store.set_metadata(_WATERMARK_KEY, today.isoformat())
+        except Exception as e:
+            # the website being down must not stop the daemon, the next poll tries again
+            logger.exception(f'Poll from {start_date} failed')
+            self.metrics.inc('failed_polls')
+            self.status['failed_polls'] += 1
+            self.status['last_error'] = f'{dt.now().isoformat()} poll: {e!r}'
+            return None
+
+        for key, value in counts.items():
+            self.metrics.inc(f'rows_{key}', value)
+        self.metrics.inc('polls')
+        # the cache is saved after every poll, a killed daemon keeps most of it
+        get_address_normalizer().save()
+        self.status['polls'] += 1
+        self.status['last_poll_at'] = dt.now().isoformat()
+        self.status['watermark'] = today.isoformat()
+        logger.info(f'Polled cases filed since {start_date}: {counts}')
+        return counts
+
+
+    def retry(self):
+        """
+        Retries the next batch of failed cases due in the retry queue.
+
+        Returns number of cases retried, 0 when none is due
+        """
+        if not self.retry_queue.due(1):
+            return 0
+
+        self.__set_state('retrying')
+        try:
+            report = retry_failed_cases(self.store, self.retry_queue, self.webdriver_location, self.engine,
+                                        self.scraper_options.get('concurrency', 4),
+                                        self.scraper_options.get('rate', 2),
+                                        limit=self.recheck_batch or None, metrics=self.metrics,
+                                        session=self.scraper_options.get('session'),
+                                        case_search_url=self.case_search_url)
+        except Exception as e:
+            logger.exception('Retry of failed cases failed')
+            self.metrics.inc('failed_retries')
+            self.status['last_error'] = f'{dt.now().isoformat()} retry: {e!r}'
+            return 0
+
+        retried = sum(report.values())
+        self.status['retries'] += retried
+        return retried
+
+
+    def recheck(self):
+        """
+        Re-checks the next batch of open cases and writes changed ones into the store.
+
+        Returns number of cases checked, 0 when no open case is due
+        """
+        cases_to_check = self.scheduler.select(self.recheck_batch)
+        if not cases_to_check:
+            return 0
+
+        self.__set_state('rechecking')
+        try:
+            updater = Update_Eviction_Cases(cases_to_check, self.store.read_df(cases_to_check),
+                                            self.webdriver_location, self.engine,
+                                            self.scraper_options.get('concurrency', 4),
+                                            self.scraper_options.get('rate', 2), self.case_search_url,
+                                            self.scraper_options.get('session'))
+            updated_df = updater.update_cases()
+            with self.metrics.timer('storage_write'):
+                counts = self.store.merge(updated_df)
+            self.scheduler.record_checks(updater.changed_cases, updater.unchanged_cases)
+        except Exception as e:
+            logger.exception('Re-check failed')
+            self.metrics.inc('failed_rechecks')
+            self.status['last_error'] = f'{dt.now().isoformat()} recheck: {e!r}'
+            # cases are not marked as checked, skip to the next poll instead of retrying at once
+            return 0
+
+        self.metrics.merge(updater.metrics)
+        for key, value in counts.items():
+            self.metrics.inc(f'rows_{key}', value)
+        self.status['rechecks'] += len(cases_to_check)
+        return len(cases_to_check)
+
+###############################################################################################
+################################ UTILITY METHODS ##############################################
+###############################################################################################
+
+    def __poll_start(self):
+        """
+        Returns the first day of the next poll (date): the watermark, else the latest
+        filed date in the store, else start_date.
+        """
+        watermark = self.store.get_metadata(_WATERMARK_KEY)
+        if watermark is not None:
+            return dt.fromisoformat(watermark).date()
+        latest = self.store.latest_filed_date()
+        if latest is not None:
+            return latest
+        if self.start_date is not None:
+            return dt.strptime(self.start_date, '%m%d%Y').date()
+        return None
+
+
+    def __on_signal(self, signum, frame):
+        logger.info(f'Received signal {signum}, stopping after the current step')
+        self.stop()
+
+
+    def __set_state(self, state, **fields):
+        """
+        Updates the status file (and metrics files) with the current state and a heartbeat.
+        """
+        self.status.update(fields, state=state, updated_at=dt.now().isoformat())
+        if self.status_path is not None:
+            _write_atomic(self.status_path, json.dumps(self.status, indent=2))
+        if self.metrics_path is not None:
+            self.metrics.write(self.metrics_path)
@@ -0,0 +1,469 @@
+# imports
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import parsers
+from metrics import Metrics
+from page_cache import Page_Cache
+from util1 import _KEYS_LIST, add_record, date_converter, issues_to_df, make_record, records_to_df
+from window_planner import Window_Planner
+
+_LISTING_URL = "https://www.courtclerk.org/records-search/municipal-civil-listing-by-classification/"
+_USER_AGENT = "Mozilla/5.0 (hamilton_evictions_scraper)"
+
+logger = logging.getLogger(__name__)
+
+
+def make_session(pool_size = 4, max_retries = 3):
+    """
+    Creates a requests session with a pool of keep-alive connections.
+
+    Inputs:
+      pool_size (int): number of connections kept open per host
+      max_retries (int): number of retries on connection errors and 5xx responses
+    """
+    session = requests.Session()
+    session.headers.update({"User-Agent": _USER_AGENT})
+
+    retries = Retry(total=max_retries, backoff_factor=1,
+                    status_forcelist=(500, 502, 503, 504),
+                    allowed_methods=None)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return session
+
+
+################ HTTP EVICTION SCRAPER CLASS ##############################
+
+class Http_Eviction_Scraper:
+    """
+    Browser-free version of Eviction_Scraper. Submits the same listing and case summary
+    forms directly over http and parses the tables from raw html.
+    Returns the same columns as Eviction_Scraper.
+    """
+
+    def __init__(self, start_date = None, end_date = None, listing_url = _LISTING_URL,
+        session = None, delay = 1, timeout = 30, concurrency = 1, rate = 2, page_cache_path = None,
+        window_stats_path = None, target_window_rows = None, fetch_workers = 0, parse_workers = 2,
+        queue_size = 64, page_cache_max_mb = None, page_cache_max_age_days = None, skip_cases = None):
+
+        self.start_date = start_date
+        self.end_date = end_date
+        self.lst_time_periods = date_converter(start_date, end_date)
+        self.eviction_cases = {key: [] for key in _KEYS_LIST}
+        self.cases_with_issues = []
+        # {case number: error} of cases with issues, see retry_queue.py
+        self.issue_reasons = dict()
+
+        self.listing_url = listing_url
+        # a session passed in (e.g. by the daemon) is kept open for its owner
+        self.owns_session = session is None
+        self.session = session if session is not None else make_session()
+        self.delay = delay
+        self.timeout = timeout
+        # with concurrency > 1 case pages are fetched by asyncio fetcher,
+        # limited by `rate` requests per second instead of `delay` between cases
+        self.concurrency = concurrency
+        self.rate = rate
+        # with fetch_workers > 0 case pages go through a staged pipeline instead (see pipeline.py):
+        # fetch threads, parse_workers parse processes and a writer thread saving the results
+        # to the page cache and journal in batches
+        self.fetch_workers = fetch_workers
+        self.parse_workers = parse_workers
+        self.queue_size = queue_size
+        self.pipeline = None
+        self.thread_sessions = threading.local()
+        self.sessions = []
+        # seconds of case fetches and batch writes finished by pipeline threads,
+        # observed by the caller's thread
+        self.fetch_times = []
+        self.write_times = []
+        # optional limiter shared between parallel workers, see parallel.py
+        self.rate_limiter = None
+        # optional progress journal to resume crashed runs, see checkpoint.py
+        self.journal = None
+        # case numbers listed but not fetched, e.g. cases the daemon has stored already
+        self.skip_cases = set(skip_cases or ())
+        # optional cache of raw listing and case pages, see page_cache.py
+        self.page_cache = Page_Cache(page_cache_path, page_cache_max_mb, page_cache_max_age_days) \
+            if page_cache_path is not None else None
+        # optional planner sizing windows by their result counts, see window_planner.py
+        self.planner = None
+        if window_stats_path is not None:
+            self.planner = Window_Planner(window_stats_path, target_window_rows)
+        # number of rows on the last listing page
+        self.listing_size = 0
+        # stage timings and counters of this scraper, see metrics.py
+        self.metrics = Metrics()
+
+
+    def run_scraper(self):
+        """
+        Scrapes eviction court cases from the Hamilton County Clerk of Courts website
+        without a browser.
+
+        Returns a tuple (df with eviction cases, df with case numbers that failed)
+        """
+        for record in self.iter_cases():
+            add_record(self.eviction_cases, record)
+
+        if self.journal is not None:
+            # journal also holds cases finished by previous (crashed) runs
+            self.eviction_cases = self.journal.records(_KEYS_LIST)
+            self.cases_with_issues = self.journal.issues()
+
+        df = records_to_df(self.eviction_cases)
+        logger.info(f'Cases with issues: {self.cases_with_issues}')
+        df_cases_issues = issues_to_df(self.cases_with_issues, self.issue_reasons)
+
+        return df, df_cases_issues
+
+
+    def iter_cases(self):
+        """
+        Scrapes all time periods and yields one record (dict {column name: value})
+        per scraped case, without keeping them in memory. Closes its own session when
+        all periods are scraped. With a window planner, each period is sized after
+        the previous one is scraped.
+        """
+        windows = self.lst_time_periods
+        if self.planner is not None:
+            windows = self.planner.iter_windows(self.start_date, self.end_date)
+        for start, end in windows:
+            yield from self.iter_window(start, end)
+
+        if self.owns_session:
+            self.session.close()
+        for session in self.sessions:
+            session.close()
+        if self.pipeline is not None:
+            self.pipeline.close()
+            logger.info(self.pipeline.summary())
+        if self.page_cache is not None:
+            self.page_cache.close()
+        if self.planner is not None:
+            self.planner.close()
+
+
+    def scrape_window(self, start, end):
+        """
+        Searches and scrapes all records filed within one time period
+        and adds them to self.eviction_cases.
+
+        Inputs:
+          start (str): start date following format 'mm/dd/yyyy'
+          end (str): end date following format 'mm/dd/yyyy'
+        """
+        for record in self.iter_window(start, end):
+            add_record(self.eviction_cases, record)
+
+
+    def iter_window(self, start, end):
+        """
+        Searches all records filed within one time period and yields them one by one.
+
+        Inputs:
+          start (str): start date following format 'mm/dd/yyyy'
+          end (str): end date following format 'mm/dd/yyyy'
+        """
+        if self.journal is not None and self.journal.is_window_done(start, end):
+            logger.info(f'Skipping period between {start}-{end}, already scraped')
+            return
+
+        window_start = time.perf_counter()
+        with self.metrics.timer('search_submit'):
+            listing_doc = self.__process_search_webpage(start, end)
+        yield from self.iter_one_period(listing_doc)
+        logger.info(f'Finished scraping period between {start}-{end} ({self.listing_size} cases)')
+
+        if self.planner is not None:
+            self.planner.record(start, end, self.listing_size, time.perf_counter() - window_start)
+
+        if self.journal is not None:
+            self.journal.finish_window(start, end)
+
+
+    def iter_one_period(self, listing_doc):
+        """
+        Fetches and parses case summary of every record on the listing page and
+        yields scraped records. Cases that fail are added to self.cases_with_issues.
+
+        Inputs:
+          listing_doc (lxml document): listing page with search results
+        """
+        records = parsers.extract_listing_records(listing_doc)
+        self.listing_size = len(records)
+
+        # with a journal, skip cases finished by a previous run of this job
+        skipped = self.skip_cases
+        if self.journal is not None:
+            skipped = skipped | self.journal.finished_cases()
+        if skipped:
+            records = [record for record in records if record[0] not in skipped]
+
+        # the pipeline's writer thread makes records and journals them
+        written = self.fetch_workers > 0
+        if written:
+            pairs = self.__fetch_cases_pipeline(records)
+        elif self.concurrency > 1:
+            pairs = zip(records, self.__fetch_cases_async(records))
+        else:
+            pairs = zip(records, self.__fetch_cases(records))
+
+        for (case_number, _), result in pairs:
+            if isinstance(result, Exception):
+                logger.warning(f'Unable to scrape case {case_number}: {result!r}')
+                self.cases_with_issues.append(case_number)
+                self.issue_reasons[case_number] = repr(result)
+                self.metrics.inc('issue_cases')
+                if self.journal is not None and not written:
+                    with self.metrics.timer('storage_write'):
+                        self.journal.add_issue(case_number)
+                continue
+
+            if written:
+                record = result
+            else:
+                record = make_record(*result)
+                if self.journal is not None:
+                    with self.metrics.timer('storage_write'):
+                        self.journal.finish_case(case_number, record)
+            self.metrics.inc('cases_scraped')
+
+            yield record
+
+
+    def scrape_case(self, case_summary_form, case_number = None):
+        """
+        Submits case summary form, opens parties table and parses both tables.
+
+        Inputs:
+          case_summary_form (lxml FormElement): td[5] form from the listing page
+          case_number (str): key of the pages in the page cache, pages are not cached without it
+
+        Returns a tuple (summary_case_dict, party_info_dict)
+        """
+        with self.metrics.timer('case_fetch'):
+            case_doc = self.__submit(case_summary_form, cache_page=('summary', case_number))
+
+            # open parties table with plaintiff and defendant info
+            party_form = parsers.find_party_form(case_doc)
+            if party_form is None:
+                raise ValueError('Parties table form not found on case page')
+            party_doc = self.__submit(party_form, cache_page=('parties', case_number))
+
+        with self.metrics.timer('extraction'):
+            # parties page repeats case summary table, fall back on the first page otherwise
+            summary_case_dict = parsers.extract_summary_case_data(party_doc) or \
+                parsers.extract_summary_case_data(case_doc)
+            if not summary_case_dict:
+                raise ValueError(f'Case summary table not found for case {case_number}')
+            party_info_dict = parsers.extract_party_info_data(party_doc)
+
+        return summary_case_dict, party_info_dict
+
+###############################################################################################
+################################ UTILITY METHODS ##############################################
+###############################################################################################
+
+    def __fetch_cases(self, records):
+        """
+        Fetches cases one at a time with `delay` seconds between them.
+
+        Yields tuples (summary_case_dict, party_info_dict) or exceptions
+        """
+        for case_number, form in records:
+            if self.rate_limiter is not None:
+                self.rate_limiter.wait()
+            try:
+                yield self.scrape_case(form, case_number)
+            except (requests.RequestException, ValueError) as e:
+                yield e
+            time.sleep(self.delay)
+
+
+    def __fetch_cases_pipeline(self, records):
+        """
+        Fetches cases in fetch threads under `rate` requests per second budget, parses
+        them in parse processes and writes them in batches in the writer thread.
+
+        Yields tuples ((case_number, form), CaseRecord or exception) in the order cases
+          finish, already saved to the page cache and journal
+        """
+        # imported here, parallel module depends on util1 as this one
+        from parallel import Shared_Rate_Limiter
+        from pipeline import Case_Pipeline
+
+        if self.pipeline is None:
+            self.pipeline = Case_Pipeline(self.__fetch_case_pages, fetch_workers=self.fetch_workers,
+                                          parse_workers=self.parse_workers, queue_size=self.queue_size,
+                                          write=self.__write_cases)
+            self.request_limiter = Shared_Rate_Limiter(self.rate)
+
+        for record, pages, result in self.pipeline.run(records):
+            # Metrics are not shared with the pipeline threads, their timings are observed here
+            while self.fetch_times:
+                self.metrics.observe('case_fetch', self.fetch_times.pop())
+            while self.write_times:
+                self.metrics.observe('storage_write', self.write_times.pop())
+            yield record, pages if isinstance(pages, Exception) else result
+
+        while self.write_times:
+            self.metrics.observe('storage_write', self.write_times.pop())
+        stats = self.pipeline.stats()
+        for stage in ('fetch', 'parse', 'write'):
+            self.metrics.inc(f'pipeline_{stage}_seconds', stats[stage]['busy_s'])
+
+
+    def __write_cases(self, batch):
+        """
+        Write stage of the pipeline, runs in the writer thread. Makes records of parsed
+        cases and saves a batch of them with their raw pages in one transaction of the
+        page cache and one of the journal.
+
+        Inputs:
+          batch (lst): tuples ((case_number, form), pages or exception,
+            (summary_case_dict, party_info_dict) or exception)
+
+        Returns a list of CaseRecords or exceptions, one per case of the batch
+        """
+        start = time.perf_counter()
+        results = []
+        pages_to_cache = []
+        finished = []
+        issues = []
+        for (case_number, _), pages, result in batch:
+            if isinstance(pages, Exception) or isinstance(result, Exception):
+                issues.append(case_number)
+                results.append(pages if isinstance(pages, Exception) else result)
+                continue
+            record = make_record(*result)
+            pages_to_cache += [('summary', case_number, pages[0]), ('parties', case_number, pages[1])]
+            finished.append((case_number, record))
+            results.append(record)
+
+        if self.page_cache is not None and pages_to_cache:
+            self.page_cache.put_many(pages_to_cache)
+        if self.journal is not None:
+            if finished:
+                self.journal.finish_cases(finished)
+            if issues:
+                self.journal.add_issues(issues)
+        self.write_times.append(time.perf_counter() - start)
+        return results
+
+
+    def __fetch_case_pages(self, record):
+        """
+        Fetch stage of the pipeline, runs in a fetch thread with its own session.
+
+        Returns a tuple (case summary page, parties page) as bytes
+        """
+        session = getattr(self.thread_sessions, 'session', None)
+        if session is None:
+            # cookies and headers of the listing session, like the asyncio fetcher
+            session = self.thread_sessions.session = make_session(pool_size=1)
+            session.headers.update(self.session.headers)
+            session.cookies.update(self.session.cookies)
+            self.sessions.append(session)
+
+        if self.rate_limiter is not None:
+            self.rate_limiter.wait()
+        start = time.perf_counter()
+        case_doc, summary_html = self.__fetch_page(session, record[1])
+        party_form = parsers.find_party_form(case_doc)
+        if party_form is None:
+            raise ValueError('Parties table form not found on case page')
+        _, party_html = self.__fetch_page(session, party_form)
+        self.fetch_times.append(time.perf_counter() - start)
+        return summary_html, party_html
+
+
+    def __fetch_page(self, session, form):
+        """
+        Submits a form under the pipeline's request budget.
+
+        Returns a tuple (lxml document, raw page)
+        """
+        self.request_limiter.wait()
+        method, url, data = parsers.form_request(form)
+        if method == 'GET':
+            response = session.get(url, params=data, timeout=self.timeout)
+        else:
+            response = session.post(url, data=data, timeout=self.timeout)
+        response.raise_for_status()
+        return parsers.to_document(response.content, base_url=response.url), response.content
+
+
+    def __fetch_cases_async(self, records):
+        """
+        Fetches up to `concurrency` cases at once under `rate` requests per second budget
+        and the workers' shared rate limiter. Reuses cookies and headers of the listing session.
+
+        Returns a list of tuples (summary_case_dict, party_info_dict) or exceptions
+        """
+        # imported here to keep aiohttp optional for the sequential mode
+        from async_fetch import Async_Case_Fetcher
+
+        fetcher = Async_Case_Fetcher(concurrency=self.concurrency, rate=self.rate,
+                                     timeout=self.timeout,
+                                     cookies=self.session.cookies.get_dict(),
+                                     headers=dict(self.session.headers))
+        fetcher.page_cache = self.page_cache
+        fetcher.metrics = self.metrics
+        fetcher.rate_limiter = self.rate_limiter
+        return fetcher.fetch_cases(records)
+
+
+    def __process_search_webpage(self, start, end):
+        """
+        Submits classification search form with eviction code and start & end dates.
+
+        Inputs:
+          start (str): start date following format 'mm/dd/yyyy'
+          end (str): end date following format 'mm/dd/yyyy'
+
+        Returns lxml document of the listing page
+        """
+        search_doc = self.__request('GET', self.listing_url)
+        search_form = parsers.find_search_form(search_doc)
+
+        return self.__submit(search_form, {"ccode": "G", "begdate": start, "enddate": end},
+                             cache_page=('listing', f'{start}-{end}'))
+
+
+    def __submit(self, form, extra_values = None, cache_page = None):
+        """
+        Submits a form the same way a browser would and returns lxml document of the response.
+        """
+        method, url, data = parsers.form_request(form, extra_values=extra_values)
+        return self.__request(method, url, data, cache_page)
+
+
+    def __request(self, method, url, data = None, cache_page = None):
+        """
+        Sends a request over the pooled session and parses the response.
+        cache_page is a tuple (kind, key) to save the raw response in the page cache.
+        """
+        if method == 'GET':
+            response = self.session.get(url, params=data, timeout=self.timeout)
+        else:
+            response = self.session.post(url, data=data, timeout=self.timeout)
+        response.raise_for_status()
+
+        # retries done by urllib3 on connection errors and 5xx responses
+        retries = getattr(response.raw, 'retries', None)
+        if retries is not None and retries.history:
+            self.metrics.inc('retries', len(retries.history))
+
+        if self.page_cache is not None and cache_page is not None and cache_page[1]:
+            self.page_cache.put(*cache_page, response.content)
+
+        return parsers.to_document(response.content, base_url=response.url)
@@ -0,0 +1,153 @@
+# imports
+import json
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# upper bounds (seconds) of histogram buckets, the last bucket is +Inf
+_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+_PREFIX = 'eviction_scraper'
+
+
+def _write_atomic(path, text):
+    """
+    Writes a file through a temporary one, so that a monitoring agent never
+    reads a half-written file.
+    """
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class Metrics:
+    """
+    Per-run timings of scraper stages and counters. A stage timing costs two
+    perf_counter() calls and one bucket increment, samples are not kept.
+
+    Example:
+        with metrics.timer('search_submit'):
+            ...
+        metrics.inc('cases_scraped')
+    """
+
+    def __init__(self):
+        self.counters = dict()
+        # stage name: [count per bucket (last one is +Inf), sum of seconds, min, max]
+        self.histograms = dict()
+        self.started_at = time.time()
+
+
+    def inc(self, counter, value = 1):
+        self.counters[counter] = self.counters.get(counter, 0) + value
+
+
+    def observe(self, stage, seconds):
+        """
+        Adds one timing (seconds) of a stage.
+        """
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = [[0] * (len(_BUCKETS) + 1), 0.0, seconds, seconds]
+        histogram[0][bisect_left(_BUCKETS, seconds)] += 1
+        histogram[1] += seconds
+        histogram[2] = min(histogram[2], seconds)
+        histogram[3] = max(histogram[3], seconds)
+
+
+    @contextmanager
+    def timer(self, stage):
+        """
+        Times the body of a with statement as one observation of the stage,
+        also when it raises.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+
+    def merge(self, other):
+        """
+        Adds counters and timings of another run, e.g. of a parallel worker.
+
+        Inputs:
+          other (Metrics or dict from to_dict())
+        """
+        if isinstance(other, Metrics):
+            other = other.to_dict()
+        for counter, value in other['counters'].items():
+            self.inc(counter, value)
+        for stage, histogram in other['stages'].items():
+            own = self.histograms.get(stage)
+            if own is None:
+                self.histograms[stage] = [list(histogram['buckets']), histogram['sum'],
+                                          histogram['min'], histogram['max']]
+                continue
+            own[0] = [a + b for a, b in zip(own[0], histogram['buckets'])]
+            own[1] += histogram['sum']
+            own[2] = min(own[2], histogram['min'])
+            own[3] = max(own[3], histogram['max'])
+
+
+    def reset(self):
+        self.counters = dict()
+        self.histograms = dict()
+
+
+    def to_dict(self):
+        """
+        Returns counters and stage timings as a JSON-serializable dict.
+        """
+        stages = dict()
+        for stage, (buckets, total, low, high) in self.histograms.items():
+            count = sum(buckets)
+            stages[stage] = {'count': count, 'sum': total, 'mean': total / count if count else 0,
+                             'min': low, 'max': high, 'buckets': list(buckets)}
+        return {'started_at': self.started_at, 'duration': time.time() - self.started_at,
+                'bucket_bounds': list(_BUCKETS), 'counters': dict(self.counters), 'stages': stages}
+
+
+    def summary(self):
+        """
+        Returns a short human-readable report of counters and mean stage timings.
+        """
+        lines = [f'{counter}: {value:g}' for counter, value in sorted(self.counters.items())]
+        for stage, histogram in self.to_dict()['stages'].items():
+            lines.append(f"{stage}: {histogram['count']} x {histogram['mean'] * 1000:.1f} ms "
+                         f"(max {histogram['max'] * 1000:.1f} ms)")
+        return '\n'.join(lines)
+
+
+    def to_prometheus(self):
+        """
+        Returns metrics in Prometheus text exposition format: one counter per
+        counter name and one histogram of stage timings labelled by stage.
+        """
+        lines = []
+        for counter, value in sorted(self.counters.items()):
+            name = f'{_PREFIX}_{counter}_total'
+            lines += [f'# TYPE {name} counter', f'{name} {value:g}']
+
+        name = f'{_PREFIX}_stage_seconds'
+        lines.append(f'# TYPE {name} histogram')
+        for stage, (buckets, total, _, _) in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, count in zip(_BUCKETS + ('+Inf',), buckets):
+                cumulative += count
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {cumulative}')
+
+        return '\n'.join(lines) + '\n'
+
+
+    def write(self, metrics_path):
+        """
+        Writes metrics into <metrics_path>.json and <metrics_path>.prom, the latter
+        can be picked up by node_exporter's textfile collector.
+        """
+        _write_atomic(f'{metrics_path}.json', json.dumps(self.to_dict(), indent=2))
+        _write_atomic(f'{metrics_path}.prom', self.to_prometheus())
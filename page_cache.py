@@ -0,0 +1,229 @@
+# imports
+import hashlib
+import sqlite3
+import zlib
+from datetime import datetime as dt, timedelta as tdelta
+
+import parsers
+from records import CaseRecord
+
+# pages are kept as zlib-compressed html, scraped pages shrink several times
+_COMPRESSION_LEVEL = 6
+# size and age limits are enforced every this many stored pages and on close()
+_EVICT_EVERY = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    raw_size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    fetched_at TEXT NOT NULL,
+    PRIMARY KEY (kind, key, digest)
+);
+CREATE INDEX IF NOT EXISTS pages_fetched_at ON pages (fetched_at);
+"""
+
+
+class Page_Cache:
+    """
+    On-disk cache of raw scraped pages kept in a SQLite file. Pages are indexed
+    by kind ('listing', 'summary' or 'parties') and key (case number or search
+    window) and stored compressed under the sha256 hash of their content, so an
+    unchanged page re-fetched many times is stored once. Every version of a page
+    is kept until it is evicted by size or age.
+
+    Cached pages let the dataset be re-derived with a fixed parser without
+    going back to the website, see iter_cached_cases().
+    """
+
+    def __init__(self, cache_path, max_size_mb = None, max_age_days = None):
+        """
+        Inputs:
+          cache_path (str): location of the SQLite cache file
+          max_size_mb (float): limit of compressed pages size, oldest pages are evicted
+            first. None for no limit
+          max_age_days (float): pages fetched longer ago are evicted, None for no limit
+        """
+        self.cache_path = cache_path
+        self.max_size_mb = max_size_mb
+        self.max_age_days = max_age_days
+        self.num_puts = 0
+
+        # the writer thread of a pipeline stores pages while the thread that opened
+        # the cache waits for them
+        self.conn = sqlite3.connect(cache_path, timeout=60, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+
+    def close(self):
+        self.evict()
+        self.conn.close()
+
+
+    def put(self, kind, key, html):
+        """
+        Stores one page. Storing the same content again only refreshes its fetched time.
+
+        Inputs:
+          kind (str): 'listing', 'summary' or 'parties'
+          key (str): case number, or 'start-end' dates of a listing
+          html (str or bytes): page source
+
+        Returns sha256 hex digest of the page
+        """
+        return self.put_many([(kind, key, html)])[0]
+
+
+    def put_many(self, pages):
+        """
+        Stores pages in one transaction, see put().
+
+        Inputs:
+          pages (lst): tuples (kind, key, html)
+
+        Returns a list of sha256 hex digests of the pages
+        """
+        digests = []
+        fetched_at = dt.now().isoformat()
+        with self.conn:
+            for kind, key, html in pages:
+                if isinstance(html, str):
+                    html = html.encode('utf-8')
+                digest = hashlib.sha256(html).hexdigest()
+                if self.conn.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone() is None:
+                    data = zlib.compress(html, _COMPRESSION_LEVEL)
+                    self.conn.execute("INSERT INTO blobs VALUES (?, ?, ?, ?)",
+                                      (digest, data, len(html), len(data)))
+                self.conn.execute(
+                    "INSERT INTO pages VALUES (?, ?, ?, ?) ON CONFLICT (kind, key, digest) "
+                    "DO UPDATE SET fetched_at = excluded.fetched_at",
+                    (kind, key, digest, fetched_at))
+                digests.append(digest)
+
+        # evicts once every _EVICT_EVERY pages, whatever the batch sizes
+        if (self.num_puts + len(pages)) // _EVICT_EVERY > self.num_puts // _EVICT_EVERY:
+            self.evict()
+        self.num_puts += len(pages)
+
+        return digests
+
+
+    def get(self, kind, key):
+        """
+        Returns the latest version of a page as bytes, or None if it is not cached.
+        """
+        row = self.conn.execute(
+            "SELECT b.data FROM pages p JOIN blobs b ON b.digest = p.digest "
+            "WHERE p.kind = ? AND p.key = ? ORDER BY p.fetched_at DESC LIMIT 1",
+            (kind, key)).fetchone()
+        return zlib.decompress(row[0]) if row is not None else None
+
+
+    def keys(self, kind):
+        """
+        Returns a sorted list of keys with at least one cached page of this kind.
+        """
+        return [key for key, in self.conn.execute(
+            "SELECT DISTINCT key FROM pages WHERE kind = ? ORDER BY key", (kind,))]
+
+
+    def iter_pages(self, kind):
+        """
+        Yields tuples (key, page bytes) with the latest version of every page of this kind.
+        """
+        rows = self.conn.execute(
+            "SELECT p.key, b.data FROM (SELECT key, digest, MAX(fetched_at) FROM pages "
+            "WHERE kind = ? GROUP BY key) p JOIN blobs b ON b.digest = p.digest ORDER BY p.key",
+            (kind,))
+        for key, data in rows:
+            yield key, zlib.decompress(data)
+
+
+    def stats(self):
+        """
+        Returns a dict with number of pages, unique blobs, raw and compressed size in bytes.
+        """
+        num_pages, = self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()
+        num_blobs, raw_size, stored_size = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(stored_size), 0) FROM blobs").fetchone()
+        return {'pages': num_pages, 'blobs': num_blobs, 'raw_size': raw_size, 'stored_size': stored_size}
+
+
+    def evict(self, max_size_mb = None, max_age_days = None):
+        """
+        Removes pages older than max_age_days, then the oldest pages until compressed
+        size fits into max_size_mb. Limits of the cache are used by default.
+
+        Returns number of removed pages
+        """
+        max_size_mb = self.max_size_mb if max_size_mb is None else max_size_mb
+        max_age_days = self.max_age_days if max_age_days is None else max_age_days
+        if max_size_mb is None and max_age_days is None:
+            return 0
+
+        removed = 0
+        with self.conn:
+            if max_age_days is not None:
+                cutoff = (dt.now() - tdelta(days=max_age_days)).isoformat()
+                removed += self.conn.execute("DELETE FROM pages WHERE fetched_at < ?", (cutoff,)).rowcount
+                self.__delete_orphan_blobs()
+
+            if max_size_mb is not None:
+                excess = self.stats()['stored_size'] - max_size_mb * 1024 * 1024
+                if excess > 0:
+                    # a blob is freed once the last page version pointing to it is removed
+                    rows = self.conn.execute(
+                        "SELECT p.rowid, p.digest, b.stored_size FROM pages p JOIN blobs b "
+                        "ON b.digest = p.digest ORDER BY p.fetched_at").fetchall()
+                    references = dict(self.conn.execute("SELECT digest, COUNT(*) FROM pages GROUP BY digest"))
+                    to_delete = []
+                    for rowid, digest, stored_size in rows:
+                        if excess <= 0:
+                            break
+                        to_delete.append((rowid,))
+                        references[digest] -= 1
+                        if references[digest] == 0:
+                            excess -= stored_size
+                    self.conn.executemany("DELETE FROM pages WHERE rowid = ?", to_delete)
+                    removed += len(to_delete)
+                    self.__delete_orphan_blobs()
+
+        return removed
+
+
+    def __delete_orphan_blobs(self):
+        self.conn.execute("DELETE FROM blobs WHERE digest NOT IN (SELECT digest FROM pages)")
+
+
+def iter_cached_cases(page_cache):
+    """
+    Re-parses cached case pages instead of scraping them again, e.g. after a parser fix.
+    Parties page of a case repeats its case summary table, summary page is used only
+    if the parties page lacks it.
+
+    Inputs:
+      page_cache (Page_Cache)
+
+    Yields tuples (case number, CaseRecord or exception)
+    """
+    for case_number, party_html in page_cache.iter_pages('parties'):
+        try:
+            party_doc = parsers.to_document(party_html)
+            summary_case_dict = parsers.extract_summary_case_data(party_doc)
+            if not summary_case_dict:
+                summary_html = page_cache.get('summary', case_number)
+                if summary_html is not None:
+                    summary_case_dict = parsers.extract_summary_case_data(parsers.to_document(summary_html))
+            if not summary_case_dict:
+                raise ValueError(f'Case summary table not found for case {case_number}')
+            yield case_number, CaseRecord.from_tables(summary_case_dict, parsers.extract_party_info_data(party_doc))
+        except ValueError as e:
+            yield case_number, e
@@ -0,0 +1,163 @@
+# imports
+import logging
+import multiprocessing as mp
+from multiprocessing.util import Finalize
+import time
+
+import pandas as pd
+
+from checkpoint import Progress_Journal
+from util1 import _KEYS_LIST, _WEBDRIVER_LOCATION, date_converter, issues_to_df, make_scraper, records_to_df
+from window_planner import Window_Planner
+
+# scraper of the current worker process, created once by _init_worker
+_worker_scraper = None
+
+logger = logging.getLogger(__name__)
+
+
+class Shared_Rate_Limiter:
+    """
+    Limits the total number of case pages opened per second across all worker
+    processes. Workers reserve evenly spaced time slots in shared memory.
+    """
+
+    def __init__(self, cases_per_second):
+        self.interval = 1 / cases_per_second
+        self.next_slot = mp.Value('d', 0.0)
+
+
+    def wait(self):
+        """
+        Blocks until this process's next time slot.
+        """
+        with self.next_slot.get_lock():
+            now = time.time()
+            slot = max(now, self.next_slot.value)
+            self.next_slot.value = slot + self.interval
+        time.sleep(max(0, slot - now))
+
+
+def run_parallel_scraper(start_date, end_date, webdriver_location = _WEBDRIVER_LOCATION,
+                         engine = 'selenium', workers = 4, cases_per_second = None,
+                         journal_path = None, resume = False, metrics = None, **scraper_options):
+    """
+    Splits the time period into 7-day windows (or windows sized from stats of previous
+    runs, if scraper_options has window_stats_path) and scrapes them in a pool of
+    worker processes, each with its own headless driver (or http session).
+
+    Inputs:
+      start_date (str): format mmddyyyy
+      end_date (str): format mmddyyyy
+      webdriver_location (str): location of Chrome webdriver on the local machine.
+      engine (str): 'selenium' or 'http'
+      workers (int): number of worker processes
+      cases_per_second (float): total rate limit of case pages for all workers,
+        None for no limit
+      journal_path (str): location of SQLite progress journal shared by all workers,
+        None to run without one
+      resume (bool): skip time periods and cases finished by a previous run in the journal
+      metrics (Metrics): collects stage timings and counters of all workers, optional
+      scraper_options: extra keyword arguments of the engine's scraper class
+
+    Returns a tuple (df with eviction cases sorted by filed date,
+      df with case numbers that failed in any worker)
+    """
+    if scraper_options.get('window_stats_path') is not None:
+        # windows are handed out up front, workers record their result counts for later runs
+        planner = Window_Planner(scraper_options['window_stats_path'], scraper_options.get('target_window_rows'))
+        windows = planner.plan(start_date, end_date)
+        planner.close()
+    else:
+        windows = date_converter(start_date, end_date)
+
+    journal = None
+    if journal_path is not None:
+        journal = Progress_Journal(journal_path, resume)
+        windows = [window for window in windows if not journal.is_window_done(*window)]
+
+    rate_limiter = Shared_Rate_Limiter(cases_per_second) if cases_per_second else None
+    workers = max(1, min(workers, len(windows)))
+
+    eviction_cases = {key: [] for key in _KEYS_LIST}
+    cases_with_issues = []
+    issue_reasons = dict()
+
+    if windows:
+        with mp.Pool(workers, initializer=_init_worker,
+                     initargs=(start_date, end_date, webdriver_location, engine,
+                               scraper_options, rate_limiter, journal_path)) as pool:
+            # imap keeps results in the same (chronological) order as windows
+            for window_records, window_issues, window_reasons, window_metrics in pool.imap(_scrape_window, windows):
+                for key, value in window_records.items():
+                    eviction_cases[key] += value
+                cases_with_issues += window_issues
+                issue_reasons.update(window_reasons)
+                if metrics is not None:
+                    metrics.merge(window_metrics)
+            pool.close()
+            pool.join()
+
+    if journal is not None:
+        # journal also holds cases finished by previous (crashed) runs
+        eviction_cases = journal.records(_KEYS_LIST)
+        cases_with_issues = journal.issues()
+        journal.close()
+
+    df = records_to_df(eviction_cases)
+    df = df.sort_values('FILED DATE', key=pd.to_datetime, kind='stable', ignore_index=True)
+    logger.info(f'Cases with issues: {cases_with_issues}')
+    df_cases_issues = issues_to_df(cases_with_issues, issue_reasons)
+
+    return df, df_cases_issues
+
+###############################################################################################
+################################ WORKER FUNCTIONS #############################################
+###############################################################################################
+
+def _init_worker(start_date, end_date, webdriver_location, engine, scraper_options, rate_limiter,
+                 journal_path):
+    """
+    Starts a scraper (and its driver) once per worker process. The driver is
+    closed when the pool shuts the worker down.
+    """
+    global _worker_scraper
+
+    _worker_scraper = make_scraper(start_date, end_date, webdriver_location, engine, **scraper_options)
+    _worker_scraper.rate_limiter = rate_limiter
+    if journal_path is not None:
+        _worker_scraper.journal = Progress_Journal(journal_path)
+
+    if hasattr(_worker_scraper, 'driver'):
+        Finalize(_worker_scraper, _close_browser, exitpriority=10)
+    else:
+        Finalize(_worker_scraper, _worker_scraper.session.close, exitpriority=10)
+
+
+def _close_browser():
+    """
+    Quits the worker's browser, pool workers exit without running atexit handlers.
+    """
+    _worker_scraper.browser_pool.release(_worker_scraper.driver)
+    _worker_scraper.browser_pool.close()
+
+
+def _scrape_window(window):
+    """
+    Scrapes one [start, end] window in the worker process.
+
+    Returns a tuple (dict of lists with window's records, list of cases with issues,
+      dict with their errors, dict with window's stage timings and counters)
+    """
+    start, end = window
+    _worker_scraper.scrape_window(start, end)
+
+    window_records, window_issues = _worker_scraper.eviction_cases, _worker_scraper.cases_with_issues
+    window_reasons = _worker_scraper.issue_reasons
+    window_metrics = _worker_scraper.metrics.to_dict()
+    _worker_scraper.eviction_cases = {key: [] for key in _KEYS_LIST}
+    _worker_scraper.cases_with_issues = []
+    _worker_scraper.issue_reasons = dict()
+    _worker_scraper.metrics.reset()
+
+    return window_records, window_issues, window_reasons, window_metrics
@@ -0,0 +1,197 @@
+# imports
+from urllib.parse import urljoin
+
+import lxml.html
+
+# xpaths used on raw (server-rendered) html. Unlike the browser DOM, raw html
+# may not contain <tbody> tags, so table rows are matched with '//tr'
+_LISTING_ROWS_XPATH = '//*[@id="munciv_classlist_table"]//tr[td]'
+_CASE_SUMMARY_ROWS_XPATH = '//*[@id="case_summary_table"]//tr'
+_PARTY_INFO_ROWS_XPATH = '//*[@id="party_info_table"]//tr[td]'
+# 4th form in the case page menu opens the parties table
+_PARTY_FORM_XPATH = '(/html/body/div[1]/table//tr[1]/td[2]/form)[4]'
+
+
+def to_document(html, base_url=None):
+    """
+    Parses raw html into an lxml document.
+
+    Inputs:
+      html (str or bytes): page source
+      base_url (str): url of the page, used to resolve relative form actions
+    """
+    return lxml.html.fromstring(html, base_url=base_url)
+
+
+def form_request(form, base_url=None, extra_values=None):
+    """
+    Builds the request a browser would send when submitting a form.
+
+    Inputs:
+      form (lxml FormElement): form to submit
+      base_url (str): url of the page containing the form
+      extra_values (dict): field values to set on top of the form defaults
+
+    Returns a tuple (method, url, data)
+    """
+    data = dict(form.form_values())
+
+    # form_values() skips submit buttons, browsers send the one that was clicked
+    for submit in form.xpath('.//input[@type="submit"][@name]')[:1]:
+        data[submit.get('name')] = submit.get('value', '')
+
+    if extra_values:
+        data.update(extra_values)
+
+    url = urljoin(base_url or form.base_url or '', form.get('action') or '')
+    method = (form.get('method') or 'GET').upper()
+
+    return method, url, data
+
+
+def find_search_form(doc):
+    """
+    Returns the classification search form (the one with 'ccode' drop-down menu).
+    """
+    forms = doc.xpath('//form[.//select[@name="ccode"]]')
+    if not forms:
+        raise ValueError('Classification search form not found on the page')
+    return forms[0]
+
+
+def find_case_search_form(doc):
+    """
+    Returns the search-by-case-number form (the one with 'casenumber' field).
+    """
+    forms = doc.xpath('//form[.//input[@name="casenumber"]]')
+    if not forms:
+        raise ValueError('Case number search form not found on the page')
+    return forms[0]
+
+
+def extract_listing_records(doc):
+    """
+    Collects case numbers and case summary forms from the listing page.
+    The listing page already contains all records, "show all records" button
+    only changes how they are displayed in the browser.
+
+    Returns a list of tuples (case_number, case summary form)
+    """
+    records = []
+    for row in doc.xpath(_LISTING_ROWS_XPATH):
+        cells = row.xpath('./td')
+        # td[5] specifies to use case summary, not case documents link
+        if len(cells) < 5:
+            continue
+        forms = cells[4].xpath('.//form')
+        if forms:
+            records.append((cells[0].text_content().strip(), forms[0]))
+    return records
+
+
+def find_party_form(doc):
+    """
+    Returns the form that opens parties table on a case page or None.
+    """
+    forms = doc.xpath(_PARTY_FORM_XPATH)
+    return forms[0] if forms else None
+
+
+def _cell_text(cell):
+    """
+    Mimics webdriver's element.text with new lines removed: every line of the
+    cell is stripped and the lines are glued together.
+    """
+    return ''.join(line.strip() for line in cell.text_content().splitlines())
+
+
+def _row_text(row):
+    """
+    Mimics webdriver's element.text for a table row: cell texts joined by a space.
+    """
+    return ' '.join(cell.text_content().strip() for cell in row.xpath('./td|./th'))
+
+
+def extract_summary_case_data(doc):
+    """
+    Unpacks case summary table rows into a dictionary of court record fields.
+
+    Inputs:
+      doc (lxml document): case page
+
+    Returns a dict {field name: field value}
+    """
+    case_summary_dict = dict()
+
+    for row in doc.xpath(_CASE_SUMMARY_ROWS_XPATH):
+        # apply upper case, and split string by the first ":"
+        # example of row variable below: 'CASE NUMBER', 'A1111111'
+        field_name, field_value = _row_text(row).upper().split(":", 1)
+        case_summary_dict[field_name.strip()] = field_value.strip()
+
+    return case_summary_dict
+
+
+def _split_party_label(label, role_counts):
+    """
+    Splits a party label like 'P 1' or 'D 2' into its role and ordinal. A label
+    without a number gets the next ordinal of its role.
+
+    Inputs:
+      label (str)
+      role_counts (dict): {role: number of parties seen so far}, updated in place
+
+    Returns a tuple (role, ordinal)
+    """
+    role, _, ordinal = label.partition(' ')
+    role_counts[role] = role_counts.get(role, 0) + 1
+    ordinal = ordinal.strip()
+    return role, int(ordinal) if ordinal.isdigit() else role_counts[role]
+
+
+def extract_party_info_data(doc):
+    """
+    Unpacks party contact info table rows into a dictionary with the first
+    plaintiff's and the first defendant's names, addresses and attorneys, and
+    every party of the case under "PARTIES" (see parties.py).
+
+    Inputs:
+      doc (lxml document): case page with parties table open
+
+    Returns a dict {field name: field value}
+    """
+    num_parties = 0
+    party_info_dict = dict()
+    parties = []
+    role_counts = dict()
+
+    for row in doc.xpath(_PARTY_INFO_ROWS_XPATH):
+        # put row fields in a list row_fields
+        row_fields = [_cell_text(cell) for cell in row.xpath('./*')]
+        if len(row_fields) < 3:
+            continue
+        party = row_fields[2].strip()
+        if party:
+            role, ordinal = _split_party_label(party, role_counts)
+            parties.append((role, ordinal, row_fields[0], row_fields[1],
+                            row_fields[3] if len(row_fields) > 3 else None))
+
+        if party == 'P 1':
+            party_info_dict["PLAINTIFF NAME"] = row_fields[0]
+            party_info_dict["PLAINTIFF ADDRESS"] = row_fields[1]
+
+            # check whether plaintiff has attorney
+            if len(row_fields) > 3:
+                party_info_dict["PLAINTIFF_ATTORNEY"] = row_fields[3]
+
+        elif party == 'D 1' or ('D' in party and num_parties < 1):
+            num_parties += 1
+            party_info_dict["DEFENDANT NAME"] = row_fields[0]
+            party_info_dict["DEFENDANT ADDRESS"] = row_fields[1]
+
+            # check whether defendant has an attorney
+            if len(row_fields) > 3:
+                party_info_dict["DEFENDANT_ATTORNEY"] = row_fields[3]
+
+    party_info_dict["PARTIES"] = parties
+    return party_info_dict
@@ -0,0 +1,228 @@
+# imports
+import pandas as pd
+
+# interned values: every distinct name, address and attorney is stored once and
+# cases refer to it by an integer id
+_LOOKUP_TABLES = {'name': 'party_names', 'address': 'party_addresses', 'attorney': 'attorneys'}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS party_names (id INTEGER PRIMARY KEY, value TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS party_addresses (id INTEGER PRIMARY KEY, value TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS attorneys (id INTEGER PRIMARY KEY, value TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS case_parties (
+    case_number TEXT NOT NULL,
+    role TEXT NOT NULL,
+    ordinal INTEGER NOT NULL,
+    name_id INTEGER REFERENCES party_names (id),
+    address_id INTEGER REFERENCES party_addresses (id),
+    attorney_id INTEGER REFERENCES attorneys (id),
+    PRIMARY KEY (case_number, role, ordinal)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_case_parties_name ON case_parties (name_id, role);
+CREATE INDEX IF NOT EXISTS idx_case_parties_attorney ON case_parties (attorney_id);
+CREATE INDEX IF NOT EXISTS idx_case_parties_address ON case_parties (address_id);
+"""
+
+# a case without its full party list is indexed from the first plaintiff and
+# defendant of the wide columns
+_WIDE_COLUMNS = {'P': ('PLAINTIFF NAME', 'PLAINTIFF ADDRESS', 'PLAINTIFF_ATTORNEY'),
+                 'D': ('DEFENDANT NAME', 'DEFENDANT ADDRESS', 'DEFENDANT_ATTORNEY')}
+
+
+def _clean(val):
+    """
+    Returns a stripped string, or None for missing and blank values.
+    """
+    if val is None or (not isinstance(val, str) and pd.isna(val)):
+        return None
+    val = str(val).strip()
+    return val or None
+
+
+def wide_parties(row):
+    """
+    Builds the party list of a case from its wide columns (first plaintiff and
+    first defendant only), e.g. for cases imported from a csv file.
+
+    Inputs:
+      row (dict): eviction case
+
+    Returns a list of (role, ordinal, name, address, attorney) tuples
+    """
+    parties = []
+    for role, columns in _WIDE_COLUMNS.items():
+        name, address, attorney = (_clean(row.get(col)) for col in columns)
+        if name or address or attorney:
+            parties.append((role, 1, name, address, attorney))
+    return parties
+
+
+class Party_Index:
+    """
+    Long-format table of the parties of every case, one row per party
+    (case number, role, ordinal, name id, address id, attorney id), next to the
+    wide cases table in the eviction store's database. Names, addresses and
+    attorneys are interned in lookup tables, so "all filings by plaintiff X" is
+    an indexed integer lookup instead of a scan of repeated strings.
+    """
+
+    def __init__(self, conn):
+        """
+        Inputs:
+          conn (sqlite3 connection): connection of the eviction store
+        """
+        self.conn = conn
+        with self.conn:
+            self.conn.executescript(_SCHEMA)
+
+
+    def write(self, case_numbers, party_lists):
+        """
+        Replaces the parties of cases within the current transaction.
+
+        Inputs:
+          case_numbers (iterable): case numbers
+          party_lists (iterable): a list of (role, ordinal, name, address, attorney)
+            tuples per case, None to keep the stored parties of a case
+        """
+        rows = []
+        replaced = []
+        for case_number, parties in zip(case_numbers, party_lists):
+            if parties is None:
+                continue
+            replaced.append((case_number,))
+            rows.extend((case_number, role, ordinal, _clean(name), _clean(address), _clean(attorney))
+                        for role, ordinal, name, address, attorney in parties)
+
+        names, addresses, attorneys = (self.__intern(kind, {row[position] for row in rows})
+                                       for position, kind in enumerate(_LOOKUP_TABLES, start=3))
+
+        self.conn.executemany("DELETE FROM case_parties WHERE case_number = ?", replaced)
+        self.conn.executemany("INSERT OR REPLACE INTO case_parties VALUES (?, ?, ?, ?, ?, ?)",
+                              [(case_number, role, ordinal, names.get(name), addresses.get(address),
+                                attorneys.get(attorney))
+                               for case_number, role, ordinal, name, address, attorney in rows])
+        return len(rows)
+
+
+    def write_missing(self, df):
+        """
+        Indexes parties of cases that have none yet from their wide columns,
+        within the current transaction. Cases already indexed keep their full party list.
+
+        Inputs:
+          df (pandas df): eviction cases
+
+        Returns number of cases indexed
+        """
+        indexed = self.indexed_cases(df['CASE NUMBER'])
+        missing = df[~df['CASE NUMBER'].isin(indexed)]
+        self.write(missing['CASE NUMBER'], [wide_parties(row) for row in missing.to_dict('records')])
+        return len(missing)
+
+
+    def indexed_cases(self, case_numbers):
+        """
+        Returns a set of the given case numbers that have parties in the index.
+        """
+        rows = self.conn.execute(
+            "SELECT DISTINCT case_number FROM case_parties WHERE case_number IN (SELECT value FROM json_each(?))",
+            (pd.Series(list(case_numbers), dtype=object).to_json(orient='values'),))
+        return {case_number for case_number, in rows}
+
+
+    def lookup(self, kind, value):
+        """
+        Returns the id of an interned name, address or attorney, or None if it was never seen.
+
+        Inputs:
+          kind (str): 'name', 'address' or 'attorney'
+          value (str)
+        """
+        row = self.conn.execute(f"SELECT id FROM {_LOOKUP_TABLES[kind]} WHERE value = ?",
+                                (_clean(value),)).fetchone()
+        return row[0] if row else None
+
+
+    def cases_by_party(self, name, role = None):
+        """
+        Returns a list of case numbers where a party with this exact name appears.
+
+        Inputs:
+          name (str): party name, e.g. a landlord
+          role (str): 'P' for plaintiffs, 'D' for defendants, None for any role
+        """
+        name_id = self.lookup('name', name)
+        if name_id is None:
+            return []
+        sql = "SELECT DISTINCT case_number FROM case_parties WHERE name_id = ?"
+        params = (name_id,)
+        if role is not None:
+            sql += " AND role = ?"
+            params += (role,)
+        return [case_number for case_number, in self.conn.execute(sql + " ORDER BY case_number", params)]
+
+
+    def cases_by_attorney(self, attorney):
+        """
+        Returns a list of case numbers where this attorney represents a party.
+        """
+        attorney_id = self.lookup('attorney', attorney)
+        if attorney_id is None:
+            return []
+        rows = self.conn.execute("SELECT DISTINCT case_number FROM case_parties WHERE attorney_id = ? "
+                                 "ORDER BY case_number", (attorney_id,))
+        return [case_number for case_number, in rows]
+
+
+    def read_df(self, case_numbers = None):
+        """
+        Reads the long parties table with ids resolved into a pandas df with columns
+        case_number, role, ordinal, name, address and attorney.
+
+        Inputs:
+          case_numbers (lst): cases to read, None for all of them
+        """
+        sql = ("SELECT p.case_number, p.role, p.ordinal, n.value AS name, a.value AS address, "
+               "t.value AS attorney FROM case_parties p "
+               "LEFT JOIN party_names n ON n.id = p.name_id "
+               "LEFT JOIN party_addresses a ON a.id = p.address_id "
+               "LEFT JOIN attorneys t ON t.id = p.attorney_id")
+        params = None
+        if case_numbers is not None:
+            sql += " WHERE p.case_number IN (SELECT value FROM json_each(?))"
+            params = (pd.Series(list(case_numbers), dtype=object).to_json(orient='values'),)
+        df = pd.read_sql_query(sql + " ORDER BY p.case_number, p.role DESC, p.ordinal", self.conn, params=params)
+        df['role'] = df['role'].astype('category')
+        return df
+
+
+    def top_parties(self, role = 'P', n = 20):
+        """
+        Returns a df with the n names that appear on most cases in a role (e.g. the
+        landlords filing most evictions), with their id and number of cases.
+        """
+        return pd.read_sql_query(
+            "SELECT n.id AS name_id, n.value AS name, COUNT(DISTINCT p.case_number) AS cases "
+            "FROM case_parties p JOIN party_names n ON n.id = p.name_id WHERE p.role = ? "
+            "GROUP BY p.name_id ORDER BY cases DESC LIMIT ?", self.conn, params=(role, n))
+
+###############################################################################################
+################################ UTILITY METHODS ##############################################
+###############################################################################################
+
+    def __intern(self, kind, values):
+        """
+        Adds values missing from a lookup table. Ids are read back per batch rather
+        than cached, a rolled back transaction cannot leave stale ids behind.
+
+        Returns a dict {value: id}
+        """
+        values = [value for value in values if value is not None]
+        if not values:
+            return dict()
+        table = _LOOKUP_TABLES[kind]
+        self.conn.executemany(f"INSERT OR IGNORE INTO {table} (value) VALUES (?)", [(value,) for value in values])
+        return dict(self.conn.execute(
+            f"SELECT value, id FROM {table} WHERE value IN (SELECT value FROM json_each(?))",
+            (pd.Series(values, dtype=object).to_json(orient='values'),)))
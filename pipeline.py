@@ -0,0 +1,365 @@
+# imports
+import multiprocessing as mp
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import parsers
+
+_QUEUE_SIZE = 64
+# number of finished items the writer stage writes at once
+_WRITE_BATCH = 32
+# how often a stage blocked on a queue checks whether the pipeline is stopping,
+# how long the caller waits for a finished item before feeding more input and
+# how long the writer thread waits for one before writing a partial batch
+_POLL_SECONDS = 0.05
+_STOP = object()
+
+
+def parse_case_pages(summary_html, party_html):
+    """
+    Parse stage of scraped case pages, runs in a worker process.
+    Parties page repeats case summary table, summary page is used only if the
+    parties page lacks it.
+
+    Returns a tuple (summary_case_dict, party_info_dict)
+    """
+    party_doc = parsers.to_document(party_html)
+    summary_case_dict = parsers.extract_summary_case_data(party_doc) or \
+        parsers.extract_summary_case_data(parsers.to_document(summary_html))
+    if not summary_case_dict:
+        raise ValueError('Case summary table not found')
+    return summary_case_dict, parsers.extract_party_info_data(party_doc)
+
+
+def _timed_call(func, args):
+    """
+    Runs func(*args) and measures it where it runs, so time spent waiting for
+    a free parse process is not counted as parsing.
+
+    Returns a tuple (result or exception, seconds)
+    """
+    start = time.perf_counter()
+    try:
+        result = func(*args)
+    except Exception as e:
+        result = e
+    return result, time.perf_counter() - start
+
+
+class _Stage_Stats:
+    """
+    Items, errors and busy time of one stage and depth of the queue in front of it.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.items = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.depth_sum = 0
+        self.depth_samples = 0
+        self.depth_max = 0
+        self.lock = threading.Lock()
+
+
+    def add(self, seconds, failed = False):
+        with self.lock:
+            self.items += 1
+            self.errors += failed
+            self.busy += seconds
+
+
+    def sample_depth(self, depth):
+        with self.lock:
+            self.depth_sum += depth
+            self.depth_samples += 1
+            self.depth_max = max(self.depth_max, depth)
+
+
+    def to_dict(self, wall_time):
+        return {'workers': self.workers, 'items': self.items, 'errors': self.errors,
+                'busy_s': self.busy, 'items_per_s': self.items / wall_time if wall_time else 0,
+                # share of time the stage's workers were busy, near 1 for the bottleneck
+                'utilization': self.busy / (wall_time * self.workers) if wall_time else 0,
+                'queue_mean': self.depth_sum / self.depth_samples if self.depth_samples else 0,
+                'queue_max': self.depth_max}
+
+
+class Case_Pipeline:
+    """
+    Staged producer/consumer pipeline of case pages:
+
+      input -> [fetch queue] -> fetch threads (I/O) -> [parse queue] -> parse
+            process pool (CPU) -> [write queue] -> writer thread (batches) -> caller
+
+    Stages are joined by bounded queues, so a slow stage holds back the ones in
+    front of it and at most ~4 x queue_size items are in memory. The writer thread
+    takes finished items in batches of up to write_batch and hands each batch to
+    `write` at once, e.g. to save them in one transaction, while fetching and parsing
+    go on. Without `write` the caller's thread, the one that iterates run(), is the
+    writer and gets the items one by one.
+
+    Example:
+        with Case_Pipeline(fetch, parse_case_pages, fetch_workers=4, parse_workers=2,
+                           write=write_batch) as pipeline:
+            for item, payload, result in pipeline.run(items):
+                ... use written result ...
+        print(pipeline.summary())
+    """
+
+    def __init__(self, fetch, parse = parse_case_pages, fetch_workers = 4, parse_workers = 2,
+        queue_size = _QUEUE_SIZE, write = None, write_batch = _WRITE_BATCH):
+        """
+        Inputs:
+          fetch (function): item -> tuple of arguments of parse, runs in fetch threads
+          parse (function): module-level function, runs in worker processes
+          fetch_workers (int): number of fetch threads
+          parse_workers (int): number of parse processes, 0 to parse in a thread
+            of this process
+          queue_size (int): capacity of every queue between stages
+          write (function): list of (item, payload, result) -> list of results, one per
+            item, handed to the caller in place of parse results. Runs in the writer thread. None to write in the
+            caller's thread
+          write_batch (int): maximum number of items of one write() call, a smaller
+            batch is written when no item finishes for a moment
+        """
+        self.fetch = fetch
+        self.parse = parse
+        self.fetch_workers = fetch_workers
+        self.parse_workers = parse_workers
+        self.queue_size = queue_size
+        self.write = write
+        self.write_batch = write_batch
+        self.executor = None
+        self.stages = None
+        self.wall_time = 0.0
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def close(self):
+        """
+        Shuts down parse processes, they are kept between run() calls.
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+
+    def run(self, items):
+        """
+        Pushes items through fetch and parse stages. Items are pulled from the
+        iterable only when the fetch queue has room, so it may be a lazy generator
+        (e.g. of listing searches).
+
+        Yields tuples (item, payload from fetch, result of parse or of write) in the caller's
+          thread as items finish, not in input order. Payload or result is an exception if
+          the item failed in that stage
+        """
+        if self.parse_workers and mp.current_process().daemon:
+            # workers of a multiprocessing pool (parallel mode) cannot start processes
+            self.parse_workers = 0
+        if self.parse_workers and self.executor is None:
+            self.executor = ProcessPoolExecutor(self.parse_workers)
+        self.stages = {'fetch': _Stage_Stats(self.fetch_workers),
+                       'parse': _Stage_Stats(max(1, self.parse_workers)), 'write': _Stage_Stats(1)}
+        fetch_queue = queue.Queue(self.queue_size)
+        parse_queue = queue.Queue(self.queue_size)
+        write_queue = queue.Queue(self.queue_size)
+        # items written by the writer thread, the caller takes them from here
+        done_queue = queue.Queue(self.queue_size) if self.write is not None else write_queue
+        stopping = threading.Event()
+
+        threads = [threading.Thread(target=self.__fetch_worker, args=(fetch_queue, parse_queue, stopping),
+                                    daemon=True) for _ in range(self.fetch_workers)]
+        threads.append(threading.Thread(target=self.__parse_dispatcher,
+                                        args=(parse_queue, write_queue, stopping), daemon=True))
+        if self.write is not None:
+            threads.append(threading.Thread(target=self.__writer, args=(write_queue, done_queue, stopping),
+                                            daemon=True))
+        for thread in threads:
+            thread.start()
+
+        start = time.perf_counter()
+        items = iter(items)
+        exhausted = False
+        pending = 0
+        try:
+            while not exhausted or pending:
+                # feed input while the fetch stage has room
+                while not exhausted and not fetch_queue.full():
+                    item = next(items, _STOP)
+                    if item is _STOP:
+                        exhausted = True
+                        break
+                    self.stages['fetch'].sample_depth(fetch_queue.qsize())
+                    fetch_queue.put(item)
+                    pending += 1
+
+                try:
+                    entry = done_queue.get(timeout=_POLL_SECONDS)
+                except queue.Empty:
+                    continue
+                pending -= 1
+
+                if self.write is not None:
+                    yield entry
+                    continue
+                entry = self.__parse_result(entry)
+                write_start = time.perf_counter()
+                yield entry
+                self.stages['write'].add(time.perf_counter() - write_start)
+        finally:
+            # all items are done, or the caller stopped early and the rest is dropped
+            stopping.set()
+            for thread in threads:
+                thread.join()
+            self.wall_time = time.perf_counter() - start
+
+###############################################################################################
+################################ UTILITY METHODS ##############################################
+###############################################################################################
+
+    def __fetch_worker(self, fetch_queue, parse_queue, stopping):
+        while True:
+            item = self.__get(fetch_queue, stopping)
+            if item is _STOP:
+                return
+            fetch_start = time.perf_counter()
+            try:
+                payload = self.fetch(item)
+            except Exception as e:
+                # handed to the writer as a failed item, the pipeline keeps going
+                payload = e
+            self.stages['fetch'].add(time.perf_counter() - fetch_start, isinstance(payload, Exception))
+            self.stages['parse'].sample_depth(parse_queue.qsize())
+            if not self.__put(parse_queue, (item, payload), stopping):
+                return
+
+
+    def __parse_dispatcher(self, parse_queue, write_queue, stopping):
+        """
+        Hands fetched pages to parse processes. Their futures go into the bounded
+        write queue in submission order, which caps the number of pages in flight.
+        """
+        while True:
+            entry = self.__get(parse_queue, stopping)
+            if entry is _STOP:
+                return
+            item, payload = entry
+            result = None
+            if not isinstance(payload, Exception):
+                if self.executor is not None:
+                    try:
+                        result = self.executor.submit(_timed_call, self.parse, payload)
+                    except Exception as e:
+                        # e.g. the pool is broken, the item fails instead of stalling the writer
+                        result = e
+                        self.stages['parse'].add(0.0, True)
+                else:
+                    result, seconds = _timed_call(self.parse, payload)
+                    self.stages['parse'].add(seconds, isinstance(result, Exception))
+            self.stages['write'].sample_depth(write_queue.qsize())
+            if not self.__put(write_queue, (item, payload, result), stopping):
+                return
+
+
+    def __writer(self, write_queue, done_queue, stopping):
+        """
+        Writes finished items in batches and passes them on to the caller.
+        """
+        batch = []
+        while not stopping.is_set():
+            try:
+                batch.append(self.__parse_result(write_queue.get(timeout=_POLL_SECONDS)))
+                if len(batch) < self.write_batch:
+                    continue
+            except queue.Empty:
+                if not batch:
+                    continue
+
+            write_start = time.perf_counter()
+            try:
+                results = self.write(batch)
+                failed = False
+            except Exception as e:
+                # items of a failed write fail, the pipeline keeps going
+                results = [e] * len(batch)
+                failed = True
+            seconds = (time.perf_counter() - write_start) / len(batch)
+            for (item, payload, _), result in zip(batch, results):
+                self.stages['write'].add(seconds, failed)
+                if not self.__put(done_queue, (item, payload, result), stopping):
+                    return
+            batch = []
+
+
+    def __parse_result(self, entry):
+        """
+        Waits for the parse process of a fetched item.
+
+        Returns a tuple (item, payload, result of parse or exception)
+        """
+        item, payload, result = entry
+        if isinstance(result, Future):
+            try:
+                result, seconds = result.result()
+            except Exception as e:
+                # e.g. a parse process died
+                result, seconds = e, 0.0
+            self.stages['parse'].add(seconds, isinstance(result, Exception))
+        return item, payload, result
+
+
+    def __get(self, source_queue, stopping):
+        """
+        Takes from a queue, returns _STOP once the pipeline is stopping.
+        """
+        while not stopping.is_set():
+            try:
+                return source_queue.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                pass
+        return _STOP
+
+
+    def __put(self, target_queue, entry, stopping):
+        """
+        Puts into a bounded queue unless the pipeline is stopping.
+
+        Returns False if the entry was dropped
+        """
+        while not stopping.is_set():
+            try:
+                target_queue.put(entry, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+
+    def stats(self):
+        """
+        Returns a dict {stage: items, errors, busy seconds, throughput (items/s), utilization
+        of its workers and mean / max depth of the queue in front of it} of the last run().
+        """
+        if self.stages is None:
+            return dict()
+        return {name: stage.to_dict(self.wall_time) for name, stage in self.stages.items()}
+
+
+    def summary(self):
+        """
+        Returns a short report of the last run(), the busiest stage is the bottleneck.
+        """
+        return '\n'.join(f"pipeline {name}: {s['items']} items, {s['items_per_s']:.1f}/s, "
+                         f"{s['utilization']:.0%} busy, queue mean {s['queue_mean']:.1f} max {s['queue_max']}"
+                         for name, s in self.stats().items())
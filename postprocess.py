@@ -0,0 +1,135 @@
+# imports
+import numpy as np
+import pandas as pd
+
+from addresses import get_address_normalizer
+from records import COLUMNS, DATE_COLUMNS, NUMERIC_COLUMNS, apply_schema
+
+# scraped text columns that may come back as empty or whitespace-only strings,
+# dates and AMOUNT turn blanks into NaT / NaN when they are converted anyway
+TEXT_COLUMNS = [col for col in COLUMNS if col not in DATE_COLUMNS + NUMERIC_COLUMNS]
+
+# columns derived from scraped ones, rebuilt by normalize_cases()
+DERIVED_COLUMNS = ['DISPOSITION_DATE', 'DISPOSITION_OUTCOME', 'PLAINTIFF_STREET', 'PLAINTIFF_UNIT',
+                   'PLAINTIFF_ZIP', 'DEFENDANT_STREET', 'DEFENDANT_UNIT', 'DEFENDANT_ZIP',
+                   'PLAINTIFF_ADDRESS_KEY', 'DEFENDANT_ADDRESS_KEY']
+
+# disposition looks like '08/01/2022 - JUDGMENT FOR PLAINTIFF'
+_DISPOSITION_PATTERN = r'^\s*(\d{1,2}/\d{1,2}/\d{4})\s*-\s*(.*?)\s*$'
+# parts of a parsed address (see addresses.parse_address) kept as derived columns
+_ADDRESS_PARTS = {'STREET': 0, 'UNIT': 1, 'ZIP': 4, 'ADDRESS_KEY': 5}
+
+
+def _to_object(s):
+    """
+    Converts a pandas string Series to plain object values with NaN for missing ones,
+    same as scraped columns.
+    """
+    return s.astype(object).where(s.notna(), np.nan)
+
+
+def _on_uniques(s, func):
+    """
+    Applies a vectorized string function to unique values of s only and spreads the
+    result back over all rows. Dispositions and addresses repeat a lot, so regexes
+    run over a fraction of the rows.
+
+    Inputs:
+      s (pandas Series)
+      func (function): takes and returns a pandas Series or df of the same length
+
+    Returns a Series or df with the index of s
+    """
+    codes, uniques = pd.factorize(s, use_na_sentinel=False)
+    result = func(pd.Series(uniques, dtype='string'))
+    result = result.iloc[codes]
+    result.index = s.index
+    return result
+
+
+def blank_whitespace(df, columns = TEXT_COLUMNS):
+    """
+    Replaces empty and whitespace-only strings with NaN in the given columns,
+    other columns are not scanned. Changes df in place.
+    """
+    for col in columns:
+        if col not in df.columns:
+            continue
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            blank = [cat for cat in s.cat.categories if isinstance(cat, str) and not cat.strip()]
+            if blank:
+                df[col] = s.cat.remove_categories(blank)
+        elif s.dtype == object or pd.api.types.is_string_dtype(s.dtype):
+            blank = _on_uniques(s, lambda uniques: uniques.str.strip().eq('').fillna(False))
+            df[col] = s.mask(blank.to_numpy(bool))
+    return df
+
+
+def split_disposition(disposition):
+    """
+    Splits DISPOSITION into its date and outcome. A disposition without a date
+    is all outcome.
+
+    Inputs:
+      disposition (pandas Series)
+
+    Returns a tuple (datetime64 Series of dates, categorical Series of outcomes)
+    """
+    def split(disposition):
+        parts = disposition.str.extract(_DISPOSITION_PATTERN)
+        parts[1] = parts[1].fillna(disposition.str.strip()).replace('', pd.NA)
+        parts[0] = pd.to_datetime(parts[0], format='%m/%d/%Y', errors='coerce')
+        return parts
+
+    parts = _on_uniques(disposition, split)
+    return parts[0], _to_object(parts[1]).astype('category')
+
+
+def split_address(address):
+    """
+    Splits party addresses into canonical street (abbreviations expanded), unit,
+    5-digit ZIP code and address key with the normalizer of addresses.py. Each
+    distinct address is parsed once, through its cache unless there are more of them
+    than it holds.
+
+    Inputs:
+      address (pandas Series)
+
+    Returns a df with columns STREET, UNIT, ZIP and ADDRESS_KEY, NaN where not found
+    """
+    normalizer = get_address_normalizer()
+    codes, uniques = pd.factorize(address, use_na_sentinel=False)
+    parsed = normalizer.parse_many(uniques)
+    parts = pd.DataFrame({name: [parts[i] if parts is not None else np.nan for parts in parsed]
+                          for name, i in _ADDRESS_PARTS.items()}, dtype=object)
+    parts = parts.iloc[codes].fillna(np.nan)
+    parts.index = address.index
+    return parts
+
+
+def add_derived_columns(df):
+    """
+    (Re)builds DERIVED_COLUMNS from DISPOSITION and party addresses. Changes df in place.
+    """
+    if 'DISPOSITION' in df.columns:
+        df['DISPOSITION_DATE'], df['DISPOSITION_OUTCOME'] = split_disposition(df['DISPOSITION'])
+    for party in ('PLAINTIFF', 'DEFENDANT'):
+        if f'{party} ADDRESS' in df.columns:
+            parts = split_address(df[f'{party} ADDRESS'])
+            for name in _ADDRESS_PARTS:
+                df[f'{party}_{name}'] = parts[name]
+    return df
+
+
+def normalize_cases(df):
+    """
+    Post-processing stage of scraped cases, vectorized over whole columns:
+    blanks whitespace-only text, adds derived disposition and address columns
+    and converts df to the output schema (numeric AMOUNT, dates, categories).
+
+    Returns the normalized df
+    """
+    df = blank_whitespace(df)
+    df = add_derived_columns(df)
+    return apply_schema(df)
@@ -0,0 +1,132 @@
+# imports
+from dataclasses import dataclass
+from itertools import chain
+
+import pandas as pd
+
+# (column name, CaseRecord attribute) in the column order of the output
+_FIELDS = (
+    ("CASE NUMBER", "case_number"), ("COURT", "court"), ("CASE CAPTION", "case_caption"),
+    ("JUDGE", "judge"), ("FILED DATE", "filed_date"), ("CASE TYPE", "case_type"),
+    ("AMOUNT", "amount"), ("DISPOSITION", "disposition"), ("PLAINTIFF NAME", "plaintiff_name"),
+    ("PLAINTIFF ADDRESS", "plaintiff_address"), ("DEFENDANT_ATTORNEY", "defendant_attorney"),
+    ("DEFENDANT NAME", "defendant_name"), ("DEFENDANT ADDRESS", "defendant_address"),
+    ("PLAINTIFF_ATTORNEY", "plaintiff_attorney"))
+COLUMNS = [column for column, _ in _FIELDS]
+
+# every party of the case as a list of (role, ordinal, name, address, attorney)
+# tuples, kept next to the columns and written into the normalized parties
+# tables of the store (see parties.py)
+PARTIES = 'PARTIES'
+_ATTRIBUTES = dict(_FIELDS + ((PARTIES, 'parties'),))
+
+# output schema: low-cardinality columns repeat on almost every row
+CATEGORICAL_COLUMNS = ['COURT', 'JUDGE', 'CASE TYPE', 'PLAINTIFF_ATTORNEY', 'DEFENDANT_ATTORNEY',
+                       'DISPOSITION_OUTCOME']
+DATE_COLUMNS = ['FILED DATE', 'LAST_UPDATED', 'DISPOSITION_DATE']
+NUMERIC_COLUMNS = ['AMOUNT']
+
+
+@dataclass(slots=True)
+class CaseRecord:
+    """
+    Scraped fields of one eviction case. Uses __slots__, so a record takes a
+    fraction of the memory of an equivalent dict.
+    """
+    case_number: str = None
+    court: str = None
+    case_caption: str = None
+    judge: str = None
+    filed_date: str = None
+    case_type: str = None
+    amount: str = None
+    disposition: str = None
+    plaintiff_name: str = None
+    plaintiff_address: str = None
+    defendant_attorney: str = None
+    defendant_name: str = None
+    defendant_address: str = None
+    plaintiff_attorney: str = None
+    parties: list = None
+
+
+    @classmethod
+    def from_tables(cls, summary_case_dict, party_info_dict):
+        """
+        Builds a record from case summary and party info dicts, fields that are
+        not output columns are ignored.
+        """
+        record = cls()
+        for column, val in chain(summary_case_dict.items(), party_info_dict.items()):
+            attribute = _ATTRIBUTES.get(column)
+            if attribute is not None:
+                setattr(record, attribute, val)
+        return record
+
+
+    @classmethod
+    def from_dict(cls, record_dict):
+        """
+        Builds a record from a dict {column name: value}.
+        """
+        return cls.from_tables(record_dict, {})
+
+
+    def get(self, column, default = None):
+        """
+        Returns value of a column by its name, e.g. record.get('CASE NUMBER').
+        """
+        attribute = _ATTRIBUTES.get(column)
+        return getattr(self, attribute) if attribute is not None else default
+
+
+    def to_dict(self):
+        """
+        Returns a dict {column name: value}, with the party list under "PARTIES".
+        """
+        record_dict = {column: getattr(self, attribute) for column, attribute in _FIELDS}
+        record_dict[PARTIES] = self.parties
+        return record_dict
+
+
+def parse_amount(amounts):
+    """
+    Converts amount strings like '$1,234.50' into numbers, invalid values become NaN.
+
+    Inputs:
+      amounts (pandas Series)
+    """
+    cleaned = amounts.astype('string').str.replace(r'[$,\s]', '', regex=True)
+    return pd.to_numeric(cleaned, errors='coerce').astype('float64')
+
+
+def apply_schema(df):
+    """
+    Converts df columns to the output schema: categorical low-cardinality columns,
+    numeric AMOUNT and datetime64 dates. Columns missing from df are skipped.
+
+    Returns the converted df
+    """
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = parse_amount(df[col])
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    return df
+
+
+def read_csv(csv_path, **kwargs):
+    """
+    Reads an eviction csv file straight into the output schema, low-cardinality
+    columns are never materialized as one string object per row.
+
+    Inputs:
+      csv_path (str): location of the csv file
+      kwargs: extra keyword arguments of pandas.read_csv
+    """
+    dtype = {col: 'category' for col in CATEGORICAL_COLUMNS}
+    return apply_schema(pd.read_csv(csv_path, dtype=dtype, **kwargs))
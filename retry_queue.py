@@ -0,0 +1,176 @@
+# imports
+from datetime import datetime as dt, timedelta as tdelta
+
+import pandas as pd
+
+# a failed case is retried after this many minutes, doubling after every failed attempt
+_BASE_DELAY_MINUTES = 30
+_MAX_DELAY_MINUTES = 24 * 60
+# after this many failed attempts a case is moved to the dead-letter table
+_MAX_ATTEMPTS = 6
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS retry_queue (
+    case_number TEXT PRIMARY KEY,
+    attempts INTEGER NOT NULL,
+    next_attempt_at TEXT NOT NULL,
+    last_error TEXT,
+    first_failed_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS retry_queue_next_attempt_at ON retry_queue (next_attempt_at);
+CREATE TABLE IF NOT EXISTS dead_letters (
+    case_number TEXT PRIMARY KEY,
+    attempts INTEGER NOT NULL,
+    reason TEXT,
+    first_failed_at TEXT NOT NULL,
+    failed_at TEXT NOT NULL
+);
+"""
+
+
+class Retry_Queue:
+    """
+    Durable queue of cases that failed to scrape, kept in the eviction store's
+    database. A failed case is retried after an exponentially growing delay;
+    a case that fails max_attempts times is moved to the dead-letter table
+    together with the reason of its last failure, where it waits for a person.
+    """
+
+    def __init__(self, store, max_attempts = _MAX_ATTEMPTS, base_delay_minutes = _BASE_DELAY_MINUTES,
+        max_delay_minutes = _MAX_DELAY_MINUTES):
+        """
+        Inputs:
+          store (Eviction_Store): store with eviction cases
+          max_attempts (int): number of failures after which a case is dead-lettered
+          base_delay_minutes (float): delay before the first retry
+          max_delay_minutes (float): longest delay between retries
+        """
+        self.conn = store.conn
+        self.max_attempts = max_attempts
+        self.base_delay_minutes = base_delay_minutes
+        self.max_delay_minutes = max_delay_minutes
+        with self.conn:
+            self.conn.executescript(_SCHEMA)
+
+
+    def fail(self, case_number, reason = None, now = None):
+        """
+        Records one failed attempt of a case and schedules its retry,
+        or moves it to the dead-letter table after max_attempts.
+
+        Inputs:
+          case_number (str)
+          reason (str): error of this attempt
+          now (datetime): time of the attempt, now by default
+
+        Returns True if the case was dead-lettered
+        """
+        now = now or dt.now()
+        if self.conn.execute("SELECT 1 FROM dead_letters WHERE case_number = ?", (case_number,)).fetchone():
+            # failed again on a later scrape, it stays dead-lettered with its latest reason
+            with self.conn:
+                self.conn.execute("UPDATE dead_letters SET attempts = attempts + 1, reason = ?, failed_at = ? "
+                                  "WHERE case_number = ?", (reason, now.isoformat(), case_number))
+            return False
+
+        row = self.conn.execute("SELECT attempts, first_failed_at FROM retry_queue WHERE case_number = ?",
+                                (case_number,)).fetchone()
+        attempts, first_failed_at = (row[0] + 1, row[1]) if row else (1, now.isoformat())
+
+        with self.conn:
+            if attempts >= self.max_attempts:
+                self.conn.execute("DELETE FROM retry_queue WHERE case_number = ?", (case_number,))
+                self.conn.execute("INSERT OR REPLACE INTO dead_letters VALUES (?, ?, ?, ?, ?)",
+                                  (case_number, attempts, reason, first_failed_at, now.isoformat()))
+                return True
+
+            delay = min(self.max_delay_minutes, self.base_delay_minutes * 2 ** (attempts - 1))
+            self.conn.execute("INSERT OR REPLACE INTO retry_queue VALUES (?, ?, ?, ?, ?)",
+                              (case_number, attempts, (now + tdelta(minutes=delay)).isoformat(),
+                               reason, first_failed_at))
+        return False
+
+
+    def add_issues(self, df_cases_issues):
+        """
+        Records failures of a scrape run.
+
+        Inputs:
+          df_cases_issues (pandas df): columns case_id and (optionally) reason, as returned by scrapers
+
+        Returns number of cases dead-lettered
+        """
+        reasons = df_cases_issues['reason'] if 'reason' in df_cases_issues.columns else \
+            pd.Series(None, index=df_cases_issues.index, dtype=object)
+        dead = 0
+        for case_number, reason in zip(df_cases_issues['case_id'], reasons):
+            if isinstance(case_number, str) and case_number.strip():
+                dead += self.fail(case_number.strip(), reason if isinstance(reason, str) else None)
+        return dead
+
+
+    def succeed(self, case_numbers):
+        """
+        Removes cases that were scraped successfully from the queue and the dead-letter table.
+        """
+        params = [(case_number,) for case_number in case_numbers]
+        with self.conn:
+            self.conn.executemany("DELETE FROM retry_queue WHERE case_number = ?", params)
+            self.conn.executemany("DELETE FROM dead_letters WHERE case_number = ?", params)
+
+
+    def due(self, limit = None, now = None):
+        """
+        Returns a list of case numbers due for a retry, longest waiting first.
+
+        Inputs:
+          limit (int): maximum number of cases, None for all
+          now (datetime): now by default
+        """
+        rows = self.conn.execute(
+            "SELECT case_number FROM retry_queue WHERE next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?",
+            ((now or dt.now()).isoformat(), -1 if limit is None else limit))
+        return [case_number for case_number, in rows]
+
+
+    def dead_letters(self):
+        """
+        Returns a df with dead-lettered cases, their number of attempts and last failure reason.
+        """
+        return pd.read_sql_query("SELECT * FROM dead_letters ORDER BY failed_at", self.conn)
+
+
+    def requeue_dead_letters(self, case_numbers = None):
+        """
+        Puts dead-lettered cases back in the queue (e.g. after a parser fix) with
+        their attempts reset. Returns number of requeued cases.
+
+        Inputs:
+          case_numbers (lst): cases to requeue, None for all of them
+        """
+        sql = "SELECT case_number, reason, first_failed_at FROM dead_letters"
+        params = ()
+        if case_numbers is not None:
+            sql += " WHERE case_number IN (SELECT value FROM json_each(?))"
+            params = (pd.Series(list(case_numbers), dtype=object).to_json(orient='values'),)
+        rows = self.conn.execute(sql, params).fetchall()
+
+        now = dt.now().isoformat()
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO retry_queue VALUES (?, 0, ?, ?, ?)",
+                                  [(case_number, now, reason, first_failed_at)
+                                   for case_number, reason, first_failed_at in rows])
+            self.conn.executemany("DELETE FROM dead_letters WHERE case_number = ?",
+                                  [(case_number,) for case_number, _, _ in rows])
+        return len(rows)
+
+
+    def stats(self):
+        """
+        Returns a dict with number of queued cases, cases due now and dead-lettered cases.
+        """
+        queued, due = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(next_attempt_at <= ?), 0) FROM retry_queue",
+            (dt.now().isoformat(),)).fetchone()
+        dead, = self.conn.execute("SELECT COUNT(*) FROM dead_letters").fetchone()
+        return {'queued': queued, 'due': due, 'dead_letters': dead}
@@ -0,0 +1,125 @@
+# imports
+from datetime import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+# most eviction cases get a disposition within a few months of filing,
+# after that the chance that an open case changes decays with this time scale (days)
+_ACTIVE_AGE_DAYS = 90
+_OLD_CASE_DECAY_DAYS = 180
+# time scale (days) of the chance that a case changed since it was last checked
+_CHANGE_TIME_DAYS = 14
+# each check without a change halves case's priority, up to this many times
+_MAX_BACKOFF_STEPS = 10
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS recheck_history (
+    case_number TEXT PRIMARY KEY,
+    checks INTEGER NOT NULL DEFAULT 0,
+    unchanged_checks INTEGER NOT NULL DEFAULT 0,
+    last_checked TEXT
+);
+"""
+
+
+class Recheck_Scheduler:
+    """
+    Ranks open cases (no DISPOSITION) by how likely they are to have changed since
+    the last check and picks the best ones for a per-run request budget.
+    Check history is kept in the eviction store's database.
+    """
+
+    def __init__(self, store):
+        """
+        Inputs:
+          store (Eviction_Store): store with eviction cases
+        """
+        self.conn = store.conn
+        with self.conn:
+            self.conn.executescript(_SCHEMA)
+
+
+    def open_cases(self):
+        """
+        Returns a df with open cases, their filed date, last update or check and
+        number of checks in a row without a change.
+        """
+        # unchanged cases are not rewritten by the store, their last check is in the history
+        df = pd.read_sql_query(
+            'SELECT c."CASE NUMBER", c."FILED DATE", '
+            'COALESCE(MAX(c."LAST_UPDATED", h.last_checked), c."LAST_UPDATED", h.last_checked) AS "LAST_UPDATED", '
+            'COALESCE(h.unchanged_checks, 0) AS unchanged_checks '
+            'FROM eviction_cases c LEFT JOIN recheck_history h ON h.case_number = c."CASE NUMBER" '
+            'WHERE c."DISPOSITION" IS NULL', self.conn)
+        df['FILED DATE'] = pd.to_datetime(df['FILED DATE'])
+        df['LAST_UPDATED'] = pd.to_datetime(df['LAST_UPDATED'], format='ISO8601').dt.normalize()
+        return df
+
+
+    def priorities(self, today = None):
+        """
+        Scores every open case, a higher score means a case is more likely to have a
+        disposition by now.
+
+          score = age weight * (1 - exp(-days since last check / 14)) / 2 ^ checks without change
+
+        Inputs:
+          today (date): date to score cases for, today by default
+
+        Returns a df of open cases sorted by descending score
+        """
+        today = pd.Timestamp(today or dt.today().date())
+        df = self.open_cases()
+
+        age = (today - df['FILED DATE']).dt.days.fillna(0).clip(lower=0).to_numpy()
+        # never checked cases are as stale as their age
+        staleness = (today - df['LAST_UPDATED'].fillna(df['FILED DATE'])).dt.days
+        staleness = staleness.fillna(pd.Series(age)).clip(lower=0).to_numpy()
+
+        age_weight = np.where(age <= _ACTIVE_AGE_DAYS, 1.0,
+                              np.exp(-(age - _ACTIVE_AGE_DAYS) / _OLD_CASE_DECAY_DAYS))
+        change_chance = 1 - np.exp(-staleness / _CHANGE_TIME_DAYS)
+        backoff = 2.0 ** -np.minimum(df['unchanged_checks'].to_numpy(), _MAX_BACKOFF_STEPS)
+
+        df['score'] = age_weight * change_chance * backoff
+
+        return df.sort_values('score', ascending=False, kind='stable', ignore_index=True)
+
+
+    def select(self, budget = None, today = None):
+        """
+        Picks cases to re-check in this run.
+
+        Inputs:
+          budget (int): maximum number of cases to check, None to check all open cases
+          today (date): date to score cases for, today by default
+
+        Returns a list of case numbers, most promising first
+        """
+        df = self.priorities(today)
+        df = df[df['score'] > 0]
+        if budget is not None:
+            df = df.head(budget)
+        return df['CASE NUMBER'].to_list()
+
+
+    def record_checks(self, changed_cases, unchanged_cases):
+        """
+        Saves results of a re-check run: unchanged cases back off further,
+        changed cases start over.
+
+        Inputs:
+          changed_cases (lst): case numbers with a new disposition
+          unchanged_cases (lst): case numbers checked without a change
+        """
+        now = dt.now().isoformat(timespec='seconds')
+        with self.conn:
+            self.conn.executemany(
+                'INSERT INTO recheck_history VALUES (?, 1, 1, ?) ON CONFLICT(case_number) DO UPDATE SET '
+                'checks = checks + 1, unchanged_checks = unchanged_checks + 1, last_checked = excluded.last_checked',
+                [(case_number, now) for case_number in unchanged_cases])
+            self.conn.executemany(
+                'INSERT INTO recheck_history VALUES (?, 1, 0, ?) ON CONFLICT(case_number) DO UPDATE SET '
+                'checks = checks + 1, unchanged_checks = 0, last_checked = excluded.last_checked',
+                [(case_number, now) for case_number in changed_cases])
@@ -0,0 +1,155 @@
+# imports
+import csv
+import json
+import os
+
+from records import COLUMNS
+from store import Eviction_Store
+from util1 import _KEYS_LIST, add_record, records_to_df
+
+
+def consume(records, *sinks):
+    """
+    Feeds records one by one into every sink and closes the sinks at the end.
+    Memory use does not depend on the number of records.
+
+    Inputs:
+      records (iterable): CaseRecord objects, e.g. Eviction_Scraper.iter_cases()
+      sinks: Sink objects
+
+    Returns number of consumed records
+    """
+    count = 0
+    try:
+        for record in records:
+            for sink in sinks:
+                sink.write(record)
+            count += 1
+    finally:
+        for sink in sinks:
+            sink.close()
+    return count
+
+
+class Sink:
+    """
+    Base class of record sinks. Subclasses implement write() and may buffer
+    records until flush().
+    """
+
+    def write(self, record):
+        raise NotImplementedError
+
+
+    def flush(self):
+        pass
+
+
+    def close(self):
+        self.flush()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Csv_Sink(Sink):
+    """
+    Appends records to a csv file, writing the header only if the file is new.
+    """
+
+    def __init__(self, csv_path, columns = COLUMNS):
+        new_file = not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0
+        self.file = open(csv_path, 'a', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=columns, extrasaction='ignore')
+        if new_file:
+            self.writer.writeheader()
+
+
+    def write(self, record):
+        self.writer.writerow(record.to_dict())
+
+
+    def flush(self):
+        self.file.flush()
+
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+class Jsonl_Sink(Sink):
+    """
+    Appends records to a JSON lines file, one record per line.
+    """
+
+    def __init__(self, jsonl_path):
+        self.file = open(jsonl_path, 'a', encoding='utf-8')
+
+
+    def write(self, record):
+        self.file.write(json.dumps(record.to_dict(), default=str) + '\n')
+
+
+    def flush(self):
+        self.file.flush()
+
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+class Sqlite_Sink(Sink):
+    """
+    Merges records into the SQLite eviction store in batches of batch_size records,
+    only new and changed cases are written.
+    """
+
+    def __init__(self, store_path, batch_size = 500):
+        self.store = Eviction_Store(store_path)
+        self.batch_size = batch_size
+        self.batch = {key: [] for key in _KEYS_LIST}
+        self.num_buffered = 0
+
+
+    def write(self, record):
+        add_record(self.batch, record)
+        self.num_buffered += 1
+        if self.num_buffered >= self.batch_size:
+            self.flush()
+
+
+    def flush(self):
+        if self.num_buffered:
+            self.store.merge(records_to_df(self.batch))
+            self.batch = {key: [] for key in _KEYS_LIST}
+            self.num_buffered = 0
+
+
+    def close(self):
+        self.flush()
+        self.store.close()
+
+
+class DataFrame_Collector(Sink):
+    """
+    Collects records in memory and turns them into a pandas df, same as run_scraper().
+    """
+
+    def __init__(self):
+        self.eviction_cases = {key: [] for key in _KEYS_LIST}
+
+
+    def write(self, record):
+        add_record(self.eviction_cases, record)
+
+
+    @property
+    def df(self):
+        return records_to_df(self.eviction_cases)
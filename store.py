@@ -0,0 +1,437 @@
+# imports
+import os
+import sqlite3
+from datetime import date, datetime as dt
+
+import numpy as np
+import pandas as pd
+
+import aggregates
+from aggregates import Case_Aggregates
+from parties import Party_Index
+from postprocess import normalize_cases
+from records import COLUMNS, NUMERIC_COLUMNS, PARTIES, apply_schema
+
+_TABLE = 'eviction_cases'
+_KEY = 'CASE NUMBER'
+# content hash of scraped columns, LAST_UPDATED and derived columns are left out
+_HASH = 'ROW_HASH'
+_COLUMNS = COLUMNS + ['LAST_UPDATED', _HASH]
+_CSV_CHUNK_SIZE = 50000
+
+
+def _quote(column):
+    """
+    Quotes a column name for SQL, column names contain spaces.
+    """
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _to_sql_value(val):
+    """
+    Converts a pandas value into a value SQLite can store: missing values
+    become NULL, dates become ISO strings so that they sort and compare correctly.
+    """
+    if val is None or (not isinstance(val, str) and pd.isna(val)):
+        return None
+    if isinstance(val, (dt, pd.Timestamp)):
+        return val.date().isoformat()
+    if isinstance(val, date):
+        return val.isoformat()
+    if hasattr(val, 'item'):
+        # numpy scalar
+        return val.item()
+    return val
+
+
+def _to_stored_text(val):
+    """
+    Converts a pandas value into the text it is stored as in a TEXT column, None if missing.
+    """
+    val = _to_sql_value(val)
+    return None if val is None else str(val)
+
+
+def _canonical(s, numeric = False):
+    """
+    Converts a column to values that hash the same whether the column was just
+    scraped, read from a csv file or read back from the store: numbers become
+    floats, dates ISO strings and all other columns plain objects, whatever their
+    dtype (an all-empty text column is float NaN in a csv file and None in the store).
+    """
+    if numeric:
+        return pd.to_numeric(s, errors='coerce').astype('float64')
+    if pd.api.types.is_datetime64_any_dtype(s):
+        s = s.dt.strftime('%Y-%m-%d')
+    s = s.astype(object)
+    return s.where(s.notna(), None)
+
+
+def row_hashes(df):
+    """
+    Hashes scraped columns of every row, vectorized over the whole df.
+
+    Returns a Series of 16-digit hex strings, or None if df lacks some scraped columns
+    """
+    if not set(COLUMNS).issubset(df.columns):
+        return None
+    frame = pd.DataFrame({col: _canonical(df[col], numeric=col in NUMERIC_COLUMNS) for col in COLUMNS})
+    hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy(np.uint64)
+    return pd.Series([f'{h:016x}' for h in hashes.tolist()], index=df.index, dtype=object)
+
+
+class Eviction_Store:
+    """
+    SQLite storage of eviction cases keyed on CASE NUMBER. Writes only new and
+    changed rows instead of rewriting the whole archive, and keeps indexes for
+    open cases (no DISPOSITION) and filed dates. Every party of a case is kept
+    in normalized parties tables next to the cases table, see self.parties, and
+    weekly counts of cases are kept up to date with every write, see self.aggregates.
+    With a change log (see changelog.py) every insert and field change made by
+    merge() is appended to it.
+    """
+
+    def __init__(self, db_path):
+        """
+        Inputs:
+          db_path (str): location of the SQLite database file
+        """
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+
+        columns = ', '.join(f'{_quote(col)} TEXT' for col in _COLUMNS if col != _KEY)
+        with self.conn:
+            self.conn.execute(f'CREATE TABLE IF NOT EXISTS {_TABLE} ({_quote(_KEY)} TEXT PRIMARY KEY, {columns})')
+            self.conn.execute(f'CREATE INDEX IF NOT EXISTS idx_open_cases ON {_TABLE} ({_quote(_KEY)}) '
+                              f'WHERE "DISPOSITION" IS NULL')
+            self.conn.execute(f'CREATE INDEX IF NOT EXISTS idx_filed_date ON {_TABLE} ("FILED DATE")')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT)')
+        self.parties = Party_Index(self.conn)
+        self.aggregates = Case_Aggregates(self.conn)
+        # Change_Log set by the caller, None to keep no log
+        self.change_log = None
+
+
+    def close(self):
+        self.conn.close()
+
+
+    def columns(self):
+        """
+        Returns a list of column names in the cases table.
+        """
+        return [row[1] for row in self.conn.execute(f'PRAGMA table_info({_TABLE})')]
+
+
+    def count(self):
+        return self.conn.execute(f'SELECT COUNT(*) FROM {_TABLE}').fetchone()[0]
+
+
+    def upsert(self, df):
+        """
+        Inserts new cases and overwrites existing ones with the same CASE NUMBER
+        in one transaction. Rows without a case number are skipped. Columns
+        that are not in the table yet are added.
+
+        Inputs:
+          df (pandas df): eviction cases
+
+        Returns number of rows written
+        """
+        with self.conn:
+            return self.__write(df)
+
+
+    def merge(self, df):
+        """
+        Change-detecting upsert: rows are compared with the stored ones through a
+        content hash, so only new cases are inserted and only cases whose scraped
+        fields changed are rewritten. Identical rows are skipped. When df holds
+        a case more than once, its last row wins. Scraped party lists (PARTIES
+        column) are written for all rows, skipped ones included.
+
+        Inputs:
+          df (pandas df): eviction cases
+
+        Returns a dict with number of inserted, updated and skipped rows
+        """
+        df = df[df[_KEY].notna()].drop_duplicates(_KEY, keep='last')
+        if df.empty:
+            return {'inserted': 0, 'updated': 0, 'skipped': 0}
+
+        hashes = row_hashes(df)
+        if hashes is None:
+            # without all scraped columns rows cannot be compared
+            changes = self.__changes(df)
+            with self.conn:
+                counts = {'inserted': 0, 'updated': self.__write(df), 'skipped': 0}
+            self.__log(changes)
+            return counts
+
+        stored = dict(self.conn.execute(
+            f'SELECT {_quote(_KEY)}, {_quote(_HASH)} FROM {_TABLE} '
+            f'WHERE {_quote(_KEY)} IN (SELECT value FROM json_each(?))',
+            (pd.Series(df[_KEY], dtype=object).to_json(orient='values'),)))
+        stored_hashes = df[_KEY].map(stored)
+
+        is_new = ~df[_KEY].isin(stored.keys())
+        is_changed = ~is_new & (stored_hashes != hashes)
+
+        changes = self.__changes(df[is_new | is_changed])
+        with self.conn:
+            self.__write(df[is_new | is_changed], hashes[is_new | is_changed])
+            if PARTIES in df.columns:
+                # a case first indexed from its wide columns gets its full party list
+                self.__write_parties(df[~(is_new | is_changed)])
+        self.__log(changes)
+
+        counts = {'inserted': int(is_new.sum()), 'updated': int(is_changed.sum())}
+        counts['skipped'] = len(df) - counts['inserted'] - counts['updated']
+        return counts
+
+
+    def open_cases(self):
+        """
+        Returns a list of case numbers with missing DISPOSITION.
+        """
+        rows = self.conn.execute(f'SELECT {_quote(_KEY)} FROM {_TABLE} WHERE "DISPOSITION" IS NULL')
+        return [case_number for case_number, in rows]
+
+
+    def latest_filed_date(self):
+        """
+        Returns the most recent FILED DATE in the store (datetime.date) or None if it is empty.
+        """
+        value = self.conn.execute(f'SELECT MAX("FILED DATE") FROM {_TABLE}').fetchone()[0]
+        return date.fromisoformat(value) if value else None
+
+
+    def filed_cases(self, start_date):
+        """
+        Returns a set of case numbers filed on or after start_date (datetime.date).
+        """
+        rows = self.conn.execute(f'SELECT {_quote(_KEY)} FROM {_TABLE} WHERE "FILED DATE" >= ?',
+                                 (start_date.isoformat(),))
+        return {case_number for case_number, in rows}
+
+
+    def read_df(self, case_numbers = None):
+        """
+        Reads cases into a pandas df.
+
+        Inputs:
+          case_numbers (lst): case numbers to read, None to read all cases
+        """
+        sql = f'SELECT * FROM {_TABLE}'
+        params = None
+        if case_numbers is not None:
+            case_numbers = list(case_numbers)
+            sql += f' WHERE {_quote(_KEY)} IN (SELECT value FROM json_each(?))'
+            params = (pd.Series(case_numbers, dtype=object).to_json(orient='values'),)
+
+        df = pd.read_sql_query(sql, self.conn, params=params)
+        return apply_schema(df.drop(columns=_HASH, errors='ignore'))
+
+
+    def index_parties(self):
+        """
+        One-time indexing of parties of cases stored before the parties tables existed,
+        from their wide columns. Does nothing once it was done.
+
+        Returns number of cases indexed
+        """
+        if self.get_metadata('parties_indexed'):
+            return 0
+        total = 0
+        with self.conn:
+            for chunk in pd.read_sql_query(f'SELECT * FROM {_TABLE}', self.conn, chunksize=_CSV_CHUNK_SIZE):
+                total += self.parties.write_missing(chunk)
+            self.set_metadata('parties_indexed', dt.now().isoformat(timespec='seconds'))
+        return total
+
+
+    def build_aggregates(self, rebuild = False):
+        """
+        One-time computation of the aggregates of cases stored before the aggregate
+        tables existed. Later writes keep them up to date incrementally.
+
+        Inputs:
+          rebuild (bool): recompute them from all cases even if they were built before
+
+        Returns number of cases counted
+        """
+        if self.get_metadata('aggregates_built') and not rebuild:
+            return 0
+        existing = set(self.columns())
+        columns = ', '.join(_quote(col) for col in aggregates.COLUMNS if col in existing)
+        total = 0
+        with self.conn:
+            self.aggregates.clear()
+            for chunk in pd.read_sql_query(f'SELECT {columns} FROM {_TABLE}', self.conn, chunksize=_CSV_CHUNK_SIZE):
+                self.aggregates.update(chunk.iloc[:0], chunk)
+                total += len(chunk)
+            self.set_metadata('aggregates_built', dt.now().isoformat(timespec='seconds'))
+        return total
+
+
+    def export_csv(self, csv_path):
+        """
+        Writes all cases into a csv file.
+        """
+        self.read_df().to_csv(csv_path, index=False)
+
+
+    def migrate_csv(self, csv_path):
+        """
+        One-time import of an existing eviction csv file into the store. Does
+        nothing if this csv file was already imported. Only cases missing from the
+        store are imported, a stale csv never overwrites newer stored rows.
+
+        Inputs:
+          csv_path (str): location of the csv file
+
+        Returns number of rows imported
+        """
+        # the same file may be passed as a relative or absolute path, or through a link
+        csv_path = os.path.realpath(csv_path)
+        if self.get_metadata('migrated_from') == csv_path:
+            return 0
+
+        # the whole file is imported in one transaction
+        total = 0
+        with self.conn:
+            for chunk in pd.read_csv(csv_path, chunksize=_CSV_CHUNK_SIZE):
+                chunk = chunk[chunk[_KEY].notna()]
+                stored = self.__stored_keys(chunk[_KEY])
+                total += self.__write(normalize_cases(chunk[~chunk[_KEY].isin(stored)].copy()))
+            self.set_metadata('migrated_from', csv_path)
+        return total
+
+
+    def get_metadata(self, key, default = None):
+        row = self.conn.execute('SELECT value FROM metadata WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+
+    def set_metadata(self, key, value):
+        self.conn.execute('INSERT OR REPLACE INTO metadata VALUES (?, ?)', (key, value))
+
+###############################################################################################
+################################ UTILITY METHODS ##############################################
+###############################################################################################
+
+    def __write(self, df, hashes = None):
+        """
+        Upserts df rows within the current transaction, together with their content hashes.
+        """
+        df = df[df[_KEY].notna()]
+        if df.empty:
+            return 0
+
+        if hashes is None:
+            hashes = row_hashes(df)
+        if hashes is not None:
+            df = df.assign(**{_HASH: hashes})
+        self.__write_parties(df)
+        df = df.drop(columns=PARTIES, errors='ignore')
+
+        columns = list(df.columns)
+        rows = [tuple(_to_sql_value(val) for val in row)
+                for row in df.itertuples(index=False, name=None)]
+
+        quoted = [_quote(col) for col in columns]
+        updates = ', '.join(f'{col} = excluded.{col}' for col in quoted if col != _quote(_KEY))
+        sql = (f'INSERT INTO {_TABLE} ({", ".join(quoted)}) VALUES ({", ".join("?" * len(columns))}) '
+               f'ON CONFLICT({_quote(_KEY)}) DO UPDATE SET {updates}')
+
+        self.__add_columns(columns)
+        old_df = self.__read_stored(df[_KEY], aggregates.COLUMNS)
+        self.conn.executemany(sql, rows)
+        # counts of the old rows are taken away, those of the written ones added
+        self.aggregates.update(old_df, df)
+        self.set_metadata('last_write', dt.now().isoformat(timespec='seconds'))
+
+        return len(rows)
+
+
+    def __stored_keys(self, case_numbers):
+        """
+        Returns a set of the given case numbers that are in the store.
+        """
+        rows = self.conn.execute(f'SELECT {_quote(_KEY)} FROM {_TABLE} '
+                                 f'WHERE {_quote(_KEY)} IN (SELECT value FROM json_each(?))',
+                                 (pd.Series(list(case_numbers), dtype=object).to_json(orient='values'),))
+        return {case_number for case_number, in rows}
+
+
+    def __write_parties(self, df):
+        """
+        Writes scraped party lists of df rows into the parties tables within the current
+        transaction. Rows without one (e.g. read from a csv file or the store) are
+        indexed from their wide columns, unless their case is indexed already.
+        """
+        if df.empty:
+            return
+        party_lists = df[PARTIES] if PARTIES in df.columns else pd.Series(None, index=df.index, dtype=object)
+        scraped = party_lists.map(lambda parties: isinstance(parties, (list, tuple)))
+        self.parties.write(df.loc[scraped, _KEY], party_lists[scraped])
+        self.parties.write_missing(df[~scraped])
+
+
+    def __changes(self, df):
+        """
+        Compares scraped columns of df rows with the stored rows of their cases.
+
+        Returns a list of change log entries (new cases and changed fields), or None
+          without a change log
+        """
+        if self.change_log is None or df.empty:
+            return None
+        columns = [col for col in COLUMNS if col in df.columns and col != _KEY]
+        stored = {row[0]: row[1:] for row in self.__read_stored(df[_KEY], columns).itertuples(index=False, name=None)}
+
+        changes = []
+        for case_number, *values in df[[_KEY] + columns].itertuples(index=False, name=None):
+            # both sides are compared and logged as the text the store keeps
+            values = [_to_stored_text(val) for val in values]
+            old_values = stored.get(case_number)
+            if old_values is None:
+                changes.append({'case_number': case_number, 'op': 'insert', 'field': None, 'old': None,
+                                'new': dict(zip(columns, values))})
+                continue
+            for col, old, new in zip(columns, old_values, values):
+                old = _to_stored_text(old)
+                if old != new:
+                    changes.append({'case_number': case_number, 'op': 'update', 'field': col,
+                                    'old': old, 'new': new})
+        return changes
+
+
+    def __log(self, changes):
+        """
+        Appends changes to the change log once their write is committed.
+        """
+        if changes:
+            self.change_log.append(changes)
+
+
+    def __read_stored(self, case_numbers, columns):
+        """
+        Returns a df with the given columns (those in the table) of stored rows of cases.
+        """
+        existing = set(self.columns())
+        selected = ', '.join(_quote(col) for col in [_KEY] + [col for col in columns if col in existing])
+        return pd.read_sql_query(f'SELECT {selected} FROM {_TABLE} '
+                                 f'WHERE {_quote(_KEY)} IN (SELECT value FROM json_each(?))', self.conn,
+                                 params=(pd.Series(list(case_numbers), dtype=object).to_json(orient='values'),))
+
+
+    def __add_columns(self, columns):
+        """
+        Adds columns missing from the cases table.
+        """
+        existing = set(self.columns())
+        for col in columns:
+            if col not in existing:
+                self.conn.execute(f'ALTER TABLE {_TABLE} ADD COLUMN {_quote(col)} TEXT')
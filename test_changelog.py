@@ -0,0 +1,81 @@
+# imports
+import os
+
+from changelog import Change_Log, Change_Log_Reader
+
+
+def _changes(case_numbers):
+    return [{'case_number': case_number, 'op': 'insert', 'field': None, 'old': None, 'new': {}}
+            for case_number in case_numbers]
+
+
+def _segment_count(log_dir):
+    return sum(name.startswith('changes-') for name in os.listdir(log_dir))
+
+
+def test_offsets_continue_across_segments_and_writers(tmp_path):
+    log_dir = str(tmp_path)
+    log = Change_Log(log_dir, max_segment_bytes=1)
+    assert log.append(_changes(['A', 'B'])) == 2
+    # another writer of the same log, with larger segments it appends to the current one
+    assert Change_Log(log_dir).append(_changes(['C'])) == 3
+    assert log.append(_changes(['D'])) == 4
+    assert log.append([]) == 4
+    assert _segment_count(log_dir) == 2
+
+    entries = Change_Log_Reader(log_dir, offset=0).read(0)
+    assert [(entry['offset'], entry['case_number']) for entry in entries] == \
+        [(1, 'A'), (2, 'B'), (3, 'C'), (4, 'D')]
+    assert [entry['case_number'] for entry in Change_Log_Reader(log_dir).read(2, limit=1)] == ['C']
+
+
+def test_half_written_entry_is_cut_off(tmp_path):
+    log_dir = str(tmp_path)
+    Change_Log(log_dir).append(_changes(['A']))
+    segment = os.path.join(log_dir, sorted(os.listdir(log_dir))[-1])
+    with open(segment, 'a', encoding='utf-8') as f:
+        f.write('{"offset": 2, "case_')
+
+    assert Change_Log_Reader(log_dir).read(0)[-1]['offset'] == 1
+    assert Change_Log(log_dir).append(_changes(['B'])) == 2
+    assert [entry['case_number'] for entry in Change_Log_Reader(log_dir).read(0)] == ['A', 'B']
+
+
+def test_reader_cursor_is_kept_between_runs(tmp_path):
+    log_dir = str(tmp_path)
+    log = Change_Log(log_dir)
+    log.append(_changes(['A', 'B', 'C']))
+
+    reader = Change_Log_Reader(log_dir, consumer='dashboard')
+    assert [entry['offset'] for entry in reader.poll(limit=2)] == [1, 2]
+    assert [entry['offset'] for entry in reader.poll()] == [3]
+    # nothing committed, a new reader starts over
+    assert [entry['offset'] for entry in Change_Log_Reader(log_dir, consumer='dashboard').poll()] == [1, 2, 3]
+
+    reader.commit(2)
+    log.append(_changes(['D']))
+    assert [entry['offset'] for entry in Change_Log_Reader(log_dir, consumer='dashboard').poll()] == [3, 4]
+    assert log.committed_offsets() == {'dashboard': 2}
+
+
+def test_prune_keeps_entries_consumers_have_not_committed(tmp_path):
+    log_dir = str(tmp_path)
+    log = Change_Log(log_dir, max_segment_bytes=1)
+    for case_number in 'ABCD':
+        log.append(_changes([case_number]))
+    # nobody has read the log yet
+    assert log.prune() == 0
+
+    Change_Log_Reader(log_dir, consumer='fast', offset=3).commit()
+    slow = Change_Log_Reader(log_dir, consumer='slow', offset=1)
+    slow.commit()
+    assert log.prune() == 1
+    assert _segment_count(log_dir) == 3
+
+    slow.commit(4)
+    assert log.prune(offset=2) == 1
+    # the current segment is kept
+    assert log.prune() == 1
+    assert _segment_count(log_dir) == 1
+    assert [entry['offset'] for entry in Change_Log_Reader(log_dir, offset=0).poll()] == [4]
+    assert log.append(_changes(['E'])) == 5
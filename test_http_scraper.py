@@ -0,0 +1,90 @@
+# imports
+import pandas as pd
+import pytest
+
+import parsers
+from court_stub import Court_Stub
+from http_scraper import Http_Eviction_Scraper
+
+# scraped columns and the fields of a stub case they come from
+_FIELDS = {'CASE NUMBER': 'case_number', 'COURT': 'court', 'CASE CAPTION': 'caption', 'JUDGE': 'judge',
+           'CASE TYPE': 'case_type', 'PLAINTIFF NAME': 'plaintiff', 'DEFENDANT NAME': 'defendant',
+           'PLAINTIFF_ATTORNEY': 'plaintiff_attorney', 'DEFENDANT_ATTORNEY': 'defendant_attorney'}
+
+
+@pytest.fixture(scope='module')
+def stub():
+    with Court_Stub(cases_per_day=4) as stub:
+        yield stub
+
+
+def _value(val):
+    return None if pd.isna(val) else val
+
+
+def test_parsers_read_case_and_parties_tables(stub):
+    case = stub.case(stub.case_numbers('01/02/2023', '01/02/2023')[0])
+    doc = parsers.to_document(stub.render_case(case, parties=True))
+
+    summary_case_dict = parsers.extract_summary_case_data(doc)
+    assert summary_case_dict['CASE NUMBER'] == case['case_number']
+    assert summary_case_dict['FILED DATE'] == case['filed_date']
+    assert summary_case_dict['AMOUNT'] == case['amount']
+    assert summary_case_dict.get('DISPOSITION') == case['disposition']
+
+    party_info_dict = parsers.extract_party_info_data(doc)
+    assert party_info_dict['PLAINTIFF NAME'] == case['plaintiff']
+    # party table cells lose their line breaks
+    assert party_info_dict['DEFENDANT ADDRESS'] == case['defendant_address'].replace('\n', '')
+    assert [party[0] for party in party_info_dict['PARTIES']] == ['P', 'D']
+
+
+@pytest.mark.parametrize('options', [{'concurrency': 1}, {'concurrency': 4, 'rate': 1000}],
+                         ids=['sequential', 'async'])
+def test_http_scraper_parses_every_case(stub, options):
+    scraper = Http_Eviction_Scraper('01022023', '01042023', listing_url=stub.listing_url, delay=0, **options)
+    df, df_cases_w_issues = scraper.run_scraper()
+
+    assert df_cases_w_issues.empty
+    assert sorted(df['CASE NUMBER']) == stub.case_numbers('01/02/2023', '01/04/2023')
+    for row in df.to_dict('records'):
+        case = stub.case(row['CASE NUMBER'])
+        for col, field in _FIELDS.items():
+            assert _value(row[col]) == case[field], col
+        assert row['FILED DATE'] == pd.Timestamp(case['filed_date'])
+        assert row['AMOUNT'] == float(case['amount'].strip('$').replace(',', ''))
+        assert _value(row['DISPOSITION']) == case['disposition']
+        assert row['DEFENDANT ADDRESS'] == case['defendant_address'].replace('\n', '')
+        assert row['DEFENDANT_ZIP'] == case['defendant_address'][-5:]
+        # street, unit and ZIP code columns come from the same parse as the address key
+        assert row['DEFENDANT_ADDRESS_KEY'] == f"{row['DEFENDANT_STREET']}||{row['DEFENDANT_ZIP']}"
+
+
+def test_http_scraper_does_not_fetch_skipped_cases(stub):
+    case_numbers = stub.case_numbers('01/02/2023', '01/03/2023')
+    scraper = Http_Eviction_Scraper('01022023', '01032023', listing_url=stub.listing_url, delay=0,
+                                    skip_cases=case_numbers[:3])
+    df, df_cases_w_issues = scraper.run_scraper()
+
+    assert df_cases_w_issues.empty
+    assert sorted(df['CASE NUMBER']) == case_numbers[3:]
+    assert scraper.metrics.to_dict()['stages']['case_fetch']['count'] == len(case_numbers) - 3
+
+
+@pytest.mark.parametrize('options', [{'concurrency': 1}, {'concurrency': 4, 'rate': 1000}],
+                         ids=['sequential', 'async'])
+def test_http_scraper_reports_cases_without_summary_table(stub, options, monkeypatch):
+    case_numbers = stub.case_numbers('01/02/2023', '01/02/2023')
+    extract_summary_case_data = parsers.extract_summary_case_data
+
+    def without_first_case(doc):
+        summary_case_dict = extract_summary_case_data(doc)
+        return {} if summary_case_dict.get('CASE NUMBER') == case_numbers[0] else summary_case_dict
+
+    monkeypatch.setattr(parsers, 'extract_summary_case_data', without_first_case)
+    scraper = Http_Eviction_Scraper('01022023', '01022023', listing_url=stub.listing_url, delay=0, **options)
+    df, df_cases_w_issues = scraper.run_scraper()
+
+    assert sorted(df['CASE NUMBER']) == case_numbers[1:]
+    assert df_cases_w_issues['case_id'].tolist() == case_numbers[:1]
+    assert 'Case summary table not found' in df_cases_w_issues['reason'].iloc[0]
@@ -0,0 +1,87 @@
+# imports
+import pytest
+
+from court_stub import Court_Stub
+from pipeline import Case_Pipeline, parse_case_pages
+
+
+@pytest.fixture(scope='module')
+def stub():
+    with Court_Stub(cases_per_day=4) as stub:
+        yield stub
+
+
+@pytest.mark.parametrize('parse_workers', [0, 2], ids=['thread', 'processes'])
+def test_pipeline_parses_every_case_and_passes_failures_on(stub, parse_workers):
+    case_numbers = stub.case_numbers('01/02/2023', '01/06/2023')
+
+    def fetch(case_number):
+        if case_number == 'NO CASE':
+            raise ConnectionError('connection reset')
+        if case_number == 'NO TABLE':
+            return '<html></html>', '<html></html>'
+        case = stub.case(case_number)
+        return stub.render_case(case), stub.render_case(case, parties=True)
+
+    items = case_numbers + ['NO CASE', 'NO TABLE']
+    with Case_Pipeline(fetch, parse_case_pages, fetch_workers=3, parse_workers=parse_workers,
+                       queue_size=4) as pipeline:
+        results = {item: (payload, result) for item, payload, result in pipeline.run(iter(items))}
+
+    assert sorted(results) == sorted(items)
+    for case_number in case_numbers:
+        summary_case_dict, party_info_dict = results[case_number][1]
+        assert summary_case_dict['CASE NUMBER'] == case_number
+        assert party_info_dict['DEFENDANT NAME'] == stub.case(case_number)['defendant']
+
+    payload, result = results['NO CASE']
+    assert isinstance(payload, ConnectionError) and result is None
+    assert isinstance(results['NO TABLE'][1], ValueError)
+
+    stats = pipeline.stats()
+    assert (stats['fetch']['items'], stats['fetch']['errors']) == (len(items), 1)
+    assert (stats['parse']['items'], stats['parse']['errors']) == (len(items) - 1, 1)
+    assert stats['write']['items'] == len(items)
+
+
+def test_pipeline_stops_when_the_caller_stops_early(stub):
+    def fetch(case_number):
+        case = stub.case(case_number)
+        return stub.render_case(case), stub.render_case(case, parties=True)
+
+    case_numbers = stub.case_numbers('01/02/2023', '01/31/2023')
+    with Case_Pipeline(fetch, parse_case_pages, fetch_workers=2, parse_workers=0, queue_size=2) as pipeline:
+        for count, _ in enumerate(pipeline.run(case_numbers), start=1):
+            if count == 3:
+                break
+
+    # items in flight are dropped
+    assert pipeline.stats()['fetch']['items'] < len(case_numbers)
+
+
+def test_pipeline_writes_in_batches_in_the_writer_thread(stub):
+    def fetch(case_number):
+        case = stub.case(case_number)
+        return stub.render_case(case), stub.render_case(case, parties=True)
+
+    batches = []
+    def write(batch):
+        batches.append(len(batch))
+        if len(batches) == 1:
+            raise OSError('disk full')
+        return [result[0]['CASE NUMBER'] for _, _, result in batch]
+
+    case_numbers = stub.case_numbers('01/02/2023', '01/13/2023')
+    with Case_Pipeline(fetch, parse_case_pages, fetch_workers=3, parse_workers=0, queue_size=4,
+                       write=write, write_batch=5) as pipeline:
+        results = {item: result for item, _, result in pipeline.run(case_numbers)}
+
+    assert sorted(results) == sorted(case_numbers)
+    assert max(batches) <= 5 and sum(batches) == len(case_numbers)
+    # items of the failed batch get its exception, the other ones the written results
+    failed = [item for item, result in results.items() if isinstance(result, OSError)]
+    assert len(failed) == batches[0]
+    assert all(results[item] == item for item in results if item not in failed)
+
+    stats = pipeline.stats()
+    assert (stats['write']['items'], stats['write']['errors']) == (len(case_numbers), batches[0])
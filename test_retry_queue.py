@@ -0,0 +1,62 @@
+# imports
+from datetime import datetime as dt, timedelta as tdelta
+
+import pandas as pd
+import pytest
+
+from retry_queue import Retry_Queue
+from store import Eviction_Store
+
+_NOW = dt(2023, 1, 2, 6, 0)
+
+
+@pytest.fixture
+def queue():
+    store = Eviction_Store(':memory:')
+    yield Retry_Queue(store, max_attempts=3, base_delay_minutes=30, max_delay_minutes=45)
+    store.close()
+
+
+def test_failed_cases_wait_exponentially_longer(queue):
+    assert not queue.fail('23CV000001', 'timeout', now=_NOW)
+    assert queue.due(now=_NOW) == []
+    assert queue.due(now=_NOW + tdelta(minutes=30)) == ['23CV000001']
+
+    later = _NOW + tdelta(minutes=30)
+    assert not queue.fail('23CV000001', 'timeout', now=later)
+    # 60 minutes, capped by max_delay_minutes
+    assert queue.due(now=later + tdelta(minutes=44)) == []
+    assert queue.due(now=later + tdelta(minutes=45)) == ['23CV000001']
+
+    queue.fail('23CV000002', now=_NOW)
+    assert queue.due(limit=1, now=later + tdelta(minutes=45)) == ['23CV000002']
+    queue.succeed(['23CV000001', '23CV000002'])
+    assert queue.stats() == {'queued': 0, 'due': 0, 'dead_letters': 0}
+
+
+def test_cases_are_dead_lettered_after_max_attempts(queue):
+    assert [queue.fail('23CV000001', f'error {attempt}', now=_NOW) for attempt in range(3)] == \
+        [False, False, True]
+    assert queue.due(now=_NOW + tdelta(days=1)) == []
+
+    dead = queue.dead_letters()
+    assert dead[['case_number', 'attempts', 'reason']].to_dict('records') == \
+        [{'case_number': '23CV000001', 'attempts': 3, 'reason': 'error 2'}]
+
+    # failing again keeps it dead-lettered with the latest reason
+    assert not queue.fail('23CV000001', 'parser error')
+    assert queue.dead_letters()['reason'].tolist() == ['parser error']
+    assert queue.stats() == {'queued': 0, 'due': 0, 'dead_letters': 1}
+
+    assert queue.requeue_dead_letters() == 1
+    assert queue.stats() == {'queued': 1, 'due': 1, 'dead_letters': 0}
+    assert not queue.fail('23CV000001', now=_NOW)
+
+
+def test_issues_of_a_scrape_run_are_queued(queue):
+    issues = pd.DataFrame({'case_id': [' 23CV000001 ', '23CV000002', None, ''],
+                           'reason': ['timeout', None, 'no case number', 'blank']})
+    assert queue.add_issues(issues) == 0
+    assert queue.stats()['queued'] == 2
+    assert queue.conn.execute("SELECT last_error FROM retry_queue ORDER BY case_number").fetchall() == \
+        [('timeout',), (None,)]
@@ -0,0 +1,54 @@
+# imports
+import math
+from datetime import date, timedelta as tdelta
+
+import pandas as pd
+import pytest
+
+from court_stub import Court_Stub
+from scheduler import Recheck_Scheduler
+from store import Eviction_Store
+
+_TODAY = date.today()
+
+
+@pytest.fixture
+def store():
+    store = Eviction_Store(':memory:')
+    with Court_Stub(cases_per_day=1) as stub:
+        cases = [stub.case(case_number) for case_number in stub.case_numbers('01/02/2023', '01/05/2023')]
+    # filed 10, 30 and 400 days ago and never checked since, the last one is disposed
+    filed = [pd.Timestamp(_TODAY - tdelta(days=days)) for days in (10, 30, 400, 30)]
+    store.upsert(pd.DataFrame({'CASE NUMBER': [case['case_number'] for case in cases], 'FILED DATE': filed,
+                               'DISPOSITION': [None, None, None, '01/20/2023 DISMISSED'],
+                               'LAST_UPDATED': filed}))
+    yield store
+    store.close()
+
+
+def test_open_cases_are_ranked_by_chance_of_a_change(store):
+    case_numbers = store.read_df()['CASE NUMBER'].tolist()
+    df = Recheck_Scheduler(store).priorities(_TODAY)
+
+    assert df['CASE NUMBER'].tolist() == [case_numbers[1], case_numbers[0], case_numbers[2]]
+    assert df['score'].tolist() == pytest.approx([1 - math.exp(-30 / 14), 1 - math.exp(-10 / 14),
+                                                  math.exp(-310 / 180) * (1 - math.exp(-400 / 14))])
+
+
+def test_unchanged_checks_back_off_and_changed_ones_start_over(store):
+    scheduler = Recheck_Scheduler(store)
+    first, second, third = scheduler.select(today=_TODAY)
+    assert scheduler.select(budget=2, today=_TODAY) == [first, second]
+
+    scheduler.record_checks(changed_cases=[second], unchanged_cases=[first])
+    # both were just checked
+    assert scheduler.select(today=_TODAY) == [third]
+
+    later = _TODAY + tdelta(days=14)
+    scores = scheduler.priorities(later).set_index('CASE NUMBER')['score']
+    assert scores[first] == pytest.approx((1 - math.exp(-1)) / 2)
+    assert scores[second] == pytest.approx(1 - math.exp(-1))
+
+    scheduler.record_checks(changed_cases=[], unchanged_cases=[first])
+    assert scheduler.priorities(later).set_index('CASE NUMBER')['score'][first] == \
+        pytest.approx((1 - math.exp(-1)) / 4)
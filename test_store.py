@@ -0,0 +1,126 @@
+# imports
+import pandas as pd
+import pytest
+
+from changelog import Change_Log, Change_Log_Reader
+from court_stub import Court_Stub
+from http_scraper import Http_Eviction_Scraper
+from store import Eviction_Store
+
+
+@pytest.fixture(scope='module')
+def cases():
+    with Court_Stub(cases_per_day=4) as stub:
+        df, _ = Http_Eviction_Scraper('01022023', '01112023', listing_url=stub.listing_url, delay=0).run_scraper()
+    return df.sort_values('CASE NUMBER', ignore_index=True)
+
+
+@pytest.fixture
+def store():
+    store = Eviction_Store(':memory:')
+    yield store
+    store.close()
+
+
+def _dispose(df, case_numbers, disposition = '01/20/2023 DISMISSED'):
+    df = df.copy()
+    df.loc[df['CASE NUMBER'].isin(case_numbers), 'DISPOSITION'] = disposition
+    return df
+
+
+def test_merge_inserts_updates_and_skips_by_row_hash(store, cases):
+    assert store.merge(cases) == {'inserted': len(cases), 'updated': 0, 'skipped': 0}
+    assert store.count() == len(cases)
+
+    assert store.merge(cases) == {'inserted': 0, 'updated': 0, 'skipped': len(cases)}
+    # rows read back from the store hash the same as scraped ones
+    assert store.merge(store.read_df()) == {'inserted': 0, 'updated': 0, 'skipped': len(cases)}
+
+    open_case = cases.loc[cases['DISPOSITION'].isna(), 'CASE NUMBER'].iloc[0]
+    assert store.merge(_dispose(cases, [open_case])) == {'inserted': 0, 'updated': 1,
+                                                         'skipped': len(cases) - 1}
+    assert open_case not in store.open_cases()
+
+
+def test_merge_keeps_last_row_of_a_repeated_case(store, cases):
+    case_number = cases['CASE NUMBER'].iloc[0]
+    df = pd.concat([cases, _dispose(cases.head(1), [case_number], '01/25/2023 DEFAULT JUDGMENT')],
+                   ignore_index=True)
+
+    assert store.merge(df) == {'inserted': len(cases), 'updated': 0, 'skipped': 0}
+    assert store.read_df([case_number])['DISPOSITION'].iloc[0] == '01/25/2023 DEFAULT JUDGMENT'
+
+
+def test_party_index_finds_cases_by_party_and_attorney(store, cases):
+    store.merge(cases)
+
+    plaintiff = cases['PLAINTIFF NAME'].iloc[0]
+    expected = sorted(cases.loc[cases['PLAINTIFF NAME'] == plaintiff, 'CASE NUMBER'])
+    assert store.parties.cases_by_party(plaintiff, role='P') == expected
+    assert store.parties.cases_by_party(plaintiff, role='D') == []
+    assert store.parties.cases_by_party('NOBODY') == []
+
+    attorney = cases['PLAINTIFF_ATTORNEY'].dropna().iloc[0]
+    expected = sorted(cases.loc[(cases['PLAINTIFF_ATTORNEY'] == attorney) |
+                                (cases['DEFENDANT_ATTORNEY'] == attorney), 'CASE NUMBER'])
+    assert store.parties.cases_by_attorney(attorney) == expected
+
+    parties = store.parties.read_df()
+    assert len(parties) == sum(len(party_list) for party_list in cases['PARTIES'])
+    top = store.parties.top_parties('P', n=1)
+    assert top['cases'].iloc[0] == cases['PLAINTIFF NAME'].value_counts().iloc[0]
+
+
+def test_party_index_keeps_full_party_list_of_rows_without_one(store, cases):
+    case_number = cases['CASE NUMBER'].iloc[0]
+    extra = ('D', 2, 'ROE JANE', None, None)
+    df = cases.head(1).copy()
+    df['PARTIES'] = [df['PARTIES'].iloc[0] + [extra]]
+    store.merge(df)
+
+    # e.g. the same case imported from a csv file, with wide columns only
+    store.merge(_dispose(cases.head(1).drop(columns='PARTIES'), [case_number]))
+    assert store.parties.cases_by_party('ROE JANE', role='D') == [case_number]
+
+    # cases stored without a party list are indexed from their wide columns
+    other = cases.iloc[[1]].drop(columns='PARTIES')
+    store.merge(other)
+    assert store.parties.read_df([other['CASE NUMBER'].iloc[0]])['name'].tolist() == \
+        [other['PLAINTIFF NAME'].iloc[0], other['DEFENDANT NAME'].iloc[0]]
+
+
+def test_aggregates_updated_incrementally_match_a_rebuild(store, cases):
+    half = len(cases) // 2
+    store.merge(cases.iloc[:half])
+    store.merge(cases.iloc[half:])
+    store.merge(_dispose(cases, cases['CASE NUMBER'].iloc[::3]))
+
+    dimensions = ('all', 'court', 'judge', 'plaintiff', 'zip')
+    incremental = {dimension: store.aggregates.totals(dimension) for dimension in dimensions}
+    weekly = store.aggregates.weekly('zip')
+    store.build_aggregates(rebuild=True)
+
+    for dimension, df in incremental.items():
+        pd.testing.assert_frame_equal(df, store.aggregates.totals(dimension), check_like=True)
+    pd.testing.assert_frame_equal(weekly, store.aggregates.weekly('zip'))
+
+    totals = store.aggregates.totals('all')
+    assert totals['filings'].iloc[0] == len(cases)
+    assert totals['open'].iloc[0] == store.conn.execute(
+        'SELECT COUNT(*) FROM eviction_cases WHERE "DISPOSITION" IS NULL').fetchone()[0]
+
+
+def test_merge_appends_inserts_and_field_changes_to_change_log(store, cases, tmp_path):
+    store.change_log = Change_Log(str(tmp_path / 'changes'), run_id='test')
+    store.merge(cases)
+    store.merge(cases)
+    open_case = cases.loc[cases['DISPOSITION'].isna(), 'CASE NUMBER'].iloc[0]
+    store.merge(_dispose(cases, [open_case]))
+
+    entries = Change_Log_Reader(str(tmp_path / 'changes'), offset=0).poll()
+    assert [entry['offset'] for entry in entries] == list(range(1, len(cases) + 2))
+    assert [entry['op'] for entry in entries] == ['insert'] * len(cases) + ['update']
+    assert {entry['run_id'] for entry in entries} == {'test'}
+    update = entries[-1]
+    assert (update['case_number'], update['field'], update['old'], update['new']) == \
+        (open_case, 'DISPOSITION', None, '01/20/2023 DISMISSED')
@@ -0,0 +1,43 @@
+# imports
+from datetime import date
+
+import pytest
+
+from window_planner import Window_Planner
+
+
+def test_windows_shrink_as_cases_per_day_are_observed(tmp_path):
+    planner = Window_Planner(str(tmp_path / 'windows.sqlite'), target_rows=20)
+    windows = []
+    for start, end in planner.iter_windows('01022023', '01212023'):
+        windows.append([start, end])
+        # 10 cases a day
+        days = int(end[3:5]) - int(start[3:5]) + 1
+        planner.record(start, end, rows=10 * days)
+
+    # the longest window until the first one is observed, then two days of cases each
+    assert windows == [['01/02/2023', '01/09/2023'], ['01/10/2023', '01/11/2023'],
+                       ['01/12/2023', '01/13/2023'], ['01/14/2023', '01/15/2023'],
+                       ['01/16/2023', '01/17/2023'], ['01/18/2023', '01/19/2023'],
+                       ['01/20/2023', '01/21/2023']]
+    assert planner.stats()['windows'] == len(windows)
+    assert planner.stats()['cases_per_day'] == 10
+    planner.close()
+
+
+def test_later_runs_start_from_recorded_windows(tmp_path):
+    stats_path = str(tmp_path / 'windows.sqlite')
+    planner = Window_Planner(stats_path, target_rows=20)
+    planner.record('01/02/2023', '01/09/2023', rows=8)
+    planner.record('01/10/2023', '01/10/2023', rows=40)
+    planner.close()
+
+    planner = Window_Planner(stats_path, target_rows=20)
+    # days scraped before are sized from their own window
+    assert planner.window_days(date(2023, 1, 3)) == 8
+    assert planner.window_days(date(2023, 1, 10)) == 1
+    # others from the latest windows, 0.3 * 40 + 0.7 * 1 cases a day
+    assert planner.stats()['cases_per_day'] == pytest.approx(12.7)
+    assert planner.plan('01162023', '01212023') == [['01/16/2023', '01/17/2023'], ['01/18/2023', '01/19/2023'],
+                                                    ['01/20/2023', '01/21/2023']]
+    planner.close()
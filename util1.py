@@ -1,26 +1,40 @@
 # imports
+import logging
+import os
 import sys
 
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options 
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import Select    # for drop-down menu
 from selenium.webdriver.support.ui import WebDriverWait       
 from selenium.webdriver.common.by import By       
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
 
 import time
 from datetime import datetime as dt, timedelta as tdelta
 import pandas as pd
-import numpy as np
 import math
 
+import parsers
+from addresses import get_address_normalizer, use_address_cache
+from browser_pool import get_browser_pool
+from changelog import Change_Log
+from checkpoint import Progress_Journal
+from metrics import Metrics
+from page_cache import Page_Cache, iter_cached_cases
+from postprocess import add_derived_columns, normalize_cases
+from records import CaseRecord
+from retry_queue import Retry_Queue
+from scheduler import Recheck_Scheduler
+from store import Eviction_Store
+from window_planner import Window_Planner
+
 _EVICTION_CASES = {
                 "CASE NUMBER": [], "COURT": [], "CASE CAPTION": [], "JUDGE": [], 
                 "FILED DATE": [], "CASE TYPE": [], "AMOUNT": [], "DISPOSITION": [], 
                 "PLAINTIFF NAME": [], "PLAINTIFF ADDRESS": [], "DEFENDANT_ATTORNEY": [],
-                "DEFENDANT NAME": [], "DEFENDANT ADDRESS": [], "PLAINTIFF_ATTORNEY": []}
+                "DEFENDANT NAME": [], "DEFENDANT ADDRESS": [], "PLAINTIFF_ATTORNEY": [],
+                # every party of a case, written into the store's parties tables only
+                "PARTIES": []}
 
 _KEYS_LIST = [key for key in _EVICTION_CASES.keys()]
 
@@ -29,46 +43,350 @@ _KEYS_LIST = [key for key in _EVICTION_CASES.keys()]
 # MAC location
 _WEBDRIVER_LOCATION = r"/Users/oleksandrafilippova/Downloads/chromedriver"
 
+_LISTING_URL = "https://www.courtclerk.org/records-search/municipal-civil-listing-by-classification/"
+_CASE_SEARCH_URL = "https://www.courtclerk.org/records-search/search-by-case-number/"
+
+# progress messages, shown when the caller configures logging (the command line does by default)
+logger = logging.getLogger(__name__)
+
 
 def run_eviction_scraper(evictions_csv_path, start_date = None, end_date = None,
-                         webdriver_location = _WEBDRIVER_LOCATION):
+                         webdriver_location = _WEBDRIVER_LOCATION, engine = 'selenium',
+                         workers = 1, cases_per_second = None, journal_path = None, resume = False,
+                         store_path = None, update_open_cases = True, recheck_budget = None,
+                         metrics_path = None, address_cache_path = None, change_log_dir = None,
+                         case_search_url = _CASE_SEARCH_URL, **scraper_options):
     """
-    Scrapes new eviction cases from the website. Updates cases with missing disposition.
+    Scrapes new eviction cases from the website and saves them into the SQLite store.
+    Updates cases with missing disposition.
     
     Inputs:
-      evictions_csv_path (str)
+      evictions_csv_path (str): existing eviction csv file, imported into the store
+        the first time the store is used
       start_date (str): format mmddyyyy
       end_date (str): format mmddyyyy
       webdriver_location (str): location of Chrome webdriver on the local machine.
+      engine (str): 'selenium' to scrape with headless Chrome or 'http' to submit
+        the forms directly without a browser
+      workers (int): number of worker processes scraping time periods in parallel
+      cases_per_second (float): rate limit of case pages shared by all workers
+      journal_path (str): location of SQLite progress journal, None to run without one
+      resume (bool): skip time periods and cases finished by a previous run in the journal
+      scraper_options: extra keyword arguments of the engine's scraper class,
+        e.g. concurrency and rate for 'http' engine
+      store_path (str): location of SQLite store, by default next to the csv file
+      update_open_cases (bool): re-check disposition of cases that had none
+      recheck_budget (int): maximum number of open cases to re-check in this run, the cases
+        most likely to have a disposition by now are checked first. None checks all of them
+      metrics_path (str): stage timings and counters of the run are written to
+        <metrics_path>.json and <metrics_path>.prom, None to skip
+      address_cache_path (str): location of SQLite file where parsed addresses are
+        kept between runs, None to parse them again every run
+      change_log_dir (str): directory of the change log, every new case and changed
+        field written to the store is appended to it (see changelog.py). None to skip
+      case_search_url (str): search-by-case-number page that failed cases are retried
+        and open cases re-checked on
     """
-    cases_to_check = None
-
     if end_date is None:
         end_date = dt.today().date().strftime("%m%d%Y")
 
-    try:
-        old_df = pd.read_csv(evictions_csv_path, parse_dates=['FILED DATE', 'LAST_UPDATED'])
-        cases_to_check = old_df[old_df.DISPOSITION.isnull()]['CASE NUMBER'].to_list()
-        most_recent_filing_date = old_df['FILED DATE'].max().date()
-        if start_date is None:
-            start_date = (most_recent_filing_date + tdelta(days = 1)).strftime("%m%d%Y") 
-    except FileNotFoundError:
-            return 'Unable to open file from provided csv_path. Please try again'  
+    if store_path is None:
+        store_path = os.path.splitext(evictions_csv_path)[0] + '.sqlite'
+    store = Eviction_Store(store_path)
+    if change_log_dir is not None:
+        store.change_log = Change_Log(change_log_dir)
+
+    # one-time migration of the csv archive into the store
+    if os.path.exists(evictions_csv_path):
+        store.migrate_csv(evictions_csv_path)
+    store.index_parties()
+    store.build_aggregates()
+
+    scheduler = Recheck_Scheduler(store)
+    retry_queue = Retry_Queue(store)
+    most_recent_filing_date = store.latest_filed_date()
+    if start_date is None and most_recent_filing_date is not None:
+        start_date = (most_recent_filing_date + tdelta(days = 1)).strftime("%m%d%Y") 
 
     if start_date is None:
+        store.close()
         return 'Creating a brand new file. Please provide at least Start Date' 
 
+    metrics = Metrics()
+    if address_cache_path is not None:
+        use_address_cache(address_cache_path)
+
     # initiate class
-    new_df = Eviction_Scraper(start_date, end_date, _WEBDRIVER_LOCATION).run_scraper()
+    new_df, df_cases_issues = scrape_period(start_date, end_date, webdriver_location, engine,
+                                            workers, cases_per_second, journal_path, resume,
+                                            metrics=metrics, **scraper_options)
+
+    # merge datasets: only new and changed cases are written, aggregates are updated from them
+    with metrics.timer('storage_write'):
+        counts = store.merge(new_df)
+    logger.info(f'Merged scraped cases: {counts}')
+    for key, value in counts.items():
+        metrics.inc(f'rows_{key}', value)
+
+    # failed cases wait in the retry queue, cases due from this and earlier runs are retried
+    retry_queue.succeed(new_df['CASE NUMBER'])
+    retry_queue.add_issues(df_cases_issues)
+    retry_failed_cases(store, retry_queue, webdriver_location, engine, scraper_options.get('concurrency', 4),
+                       scraper_options.get('rate', 2), metrics=metrics, session=scraper_options.get('session'),
+                       case_search_url=case_search_url)
+
+    # re-check cases with missing disposition and write back only them
+    cases_to_check = scheduler.select(recheck_budget) if update_open_cases else []
+    if cases_to_check:
+        open_df = store.read_df(cases_to_check)
+        updater = Update_Eviction_Cases(cases_to_check, open_df, webdriver_location, engine,
+                                        scraper_options.get('concurrency', 4), scraper_options.get('rate', 2),
+                                        case_search_url, scraper_options.get('session'))
+        updated_df = updater.update_cases()
+        with metrics.timer('storage_write'):
+            counts = store.merge(updated_df)
+        logger.info(f'Merged updated cases: {counts}')
+        for key, value in counts.items():
+            metrics.inc(f'rows_{key}', value)
+        scheduler.record_checks(updater.changed_cases, updater.unchanged_cases)
+        metrics.merge(updater.metrics)
+        
+    store.close()
 
-    # merge datasets
-    master_df = old_df.append(new_df, ignore_index = True)
+    address_normalizer = get_address_normalizer()
+    address_stats = address_normalizer.stats()
+    metrics.inc('address_cache_hits', address_stats['hits'])
+    metrics.inc('address_cache_misses', address_stats['misses'])
+    logger.info(f'Address cache: {address_stats}')
+    address_normalizer.save()
 
-    #if cases_to_check is not None:
-        #old_df = Update_Eviction_Cases(cases_to_check, old_df, _WEBDRIVER_LOCATION).update_cases()
-        
-    master_df.to_csv(evictions_csv_path, index=False)
-    #return old_df, new_df, master_df, cases_to_check
+    logger.info(metrics.summary())
+    if metrics_path is not None:
+        metrics.write(metrics_path)
+
+
+def retry_failed_cases(store, retry_queue, webdriver_location = _WEBDRIVER_LOCATION, engine = 'selenium',
+                       concurrency = 4, rate = 2, limit = None, metrics = None, session = None,
+                       case_search_url = _CASE_SEARCH_URL):
+    """
+    Scrapes cases due in the retry queue again by their case numbers and merges
+    recovered ones into the store. Cases that fail again are rescheduled with a
+    longer delay or dead-lettered.
+
+    Inputs:
+      store (Eviction_Store): store with eviction cases
+      retry_queue (Retry_Queue): queue of failed cases
+      webdriver_location (str): location of Chrome webdriver on the local machine.
+      engine (str): 'selenium' or 'http'
+      concurrency (int), rate (float): parallel lookups and requests per second of 'http' engine
+      limit (int): maximum number of cases to retry, None for all due cases
+      metrics (Metrics): collects stage timings and counters, optional
+      session (requests.Session): http session of the caller (e.g. the daemon) for 'http'
+        engine, None to open one for this retry
+      case_search_url (str): search-by-case-number page the cases are looked up on
+
+    Returns a dict with number of recovered, failed and dead-lettered cases
+    """
+    due_cases = retry_queue.due(limit)
+    if not due_cases:
+        return {'recovered': 0, 'failed': 0, 'dead_lettered': 0}
+
+    retrier = Retry_Eviction_Cases(due_cases, webdriver_location, engine, concurrency, rate, case_search_url,
+                                   session)
+    df, failures = retrier.retry_cases()
+
+    with retrier.metrics.timer('storage_write'):
+        store.merge(df)
+    retry_queue.succeed(df['CASE NUMBER'])
+    dead = sum(retry_queue.fail(case_number, reason) for case_number, reason in failures.items())
+
+    report = {'recovered': len(df), 'failed': len(failures) - dead, 'dead_lettered': dead}
+    retrier.metrics.inc('cases_recovered', report['recovered'])
+    retrier.metrics.inc('cases_dead_lettered', dead)
+    logger.info(f'Retried failed cases: {report}')
+    if metrics is not None:
+        metrics.merge(retrier.metrics)
+    return report
+
+
+def make_scraper(start_date, end_date, webdriver_location = _WEBDRIVER_LOCATION, engine = 'selenium',
+                 **scraper_options):
+    """
+    Initiates scraper class for the given engine.
+
+    Inputs:
+      start_date (str): format mmddyyyy
+      end_date (str): format mmddyyyy
+      webdriver_location (str): location of Chrome webdriver, used by 'selenium' engine only
+      engine (str): 'selenium' or 'http'
+      scraper_options: extra keyword arguments of the engine's scraper class
+    """
+    if engine == 'selenium':
+        # http-only options such as concurrency and rate do not apply to the browser
+        return Eviction_Scraper(start_date, end_date, webdriver_location,
+                                listing_url=scraper_options.get('listing_url', _LISTING_URL),
+                                page_cache_path=scraper_options.get('page_cache_path'),
+                                page_cache_max_mb=scraper_options.get('page_cache_max_mb'),
+                                page_cache_max_age_days=scraper_options.get('page_cache_max_age_days'),
+                                window_stats_path=scraper_options.get('window_stats_path'),
+                                target_window_rows=scraper_options.get('target_window_rows'),
+                                skip_cases=scraper_options.get('skip_cases'))
+    if engine == 'http':
+        # imported here since http_scraper module depends on this one
+        from http_scraper import Http_Eviction_Scraper
+        return Http_Eviction_Scraper(start_date, end_date, **scraper_options)
+    raise ValueError(f'Unknown scraper engine: {engine}')
+
+
+def scrape_period(start_date, end_date, webdriver_location = _WEBDRIVER_LOCATION, engine = 'selenium',
+                  workers = 1, cases_per_second = None, journal_path = None, resume = False,
+                  metrics = None, **scraper_options):
+    """
+    Scrapes all eviction cases filed between start and end dates, either with one
+    scraper or with a pool of worker processes.
+
+    Inputs: see run_eviction_scraper, and
+      metrics (Metrics): collects stage timings and counters of the scrapers, optional
+
+    Returns a tuple (df with eviction cases, df with case numbers that failed)
+    """
+    if workers > 1:
+        # imported here since parallel module depends on this one
+        from parallel import run_parallel_scraper
+        return run_parallel_scraper(start_date, end_date, webdriver_location, engine,
+                                    workers, cases_per_second, journal_path, resume,
+                                    metrics=metrics, **scraper_options)
+
+    scraper = make_scraper(start_date, end_date, webdriver_location, engine, **scraper_options)
+    if journal_path is not None:
+        scraper.journal = Progress_Journal(journal_path, resume)
+
+    try:
+        result = scraper.run_scraper()
+    finally:
+        if scraper.journal is not None:
+            scraper.journal.close()
+    if metrics is not None:
+        metrics.merge(scraper.metrics)
+    return result
+
+
+def date_converter(start_date, end_date, max_period = 7):
+    """
+    The court website limits search of records to up to 7 days. This function
+    breaks a given time period into several, smaller time periods containing up to max_period days.
+
+    Inputs:
+      start_date (str): format should be mmddyyyy
+      end_date (str): format should be mmddyyyy
+      max_period (int): maximum number of days in one period
+
+    Returns a list of lists where each inner list represents a [start, end] period
+      with dates in format mm/dd/yyyy
+    """
+    # convert dates
+    start_date = dt.strptime(start_date,"%m%d%Y").date()
+    end_date = dt.strptime(end_date, "%m%d%Y").date()
+
+    # check that start date is not before end date
+    assert start_date <= end_date, 'Start Date is greater than End Date. Try again'
+    assert end_date <= dt.today().date(), "End Date is greater than today's date. Try again"
+
+    number_batches = math.ceil((end_date  - start_date).days / max_period)
+    # a period shorter than max_period is one window that ends on end date
+    end = min(start_date + tdelta(days = max_period), end_date)
+
+    # add to the list the first period
+    lst_periods = [[start_date.strftime("%m/%d/%Y"), end.strftime("%m/%d/%Y")]]
+
+    # add more periods to the list
+    for _ in range(number_batches - 1):
+        start = end + tdelta(days = 1)
+        end = start + tdelta(days = max_period)
+        if end >= end_date:
+            lst_periods.append([start.strftime("%m/%d/%Y"), end_date.strftime("%m/%d/%Y")])
+            break
+        lst_periods.append([start.strftime("%m/%d/%Y"), end.strftime("%m/%d/%Y")])
+
+    return lst_periods
+
+
+def make_record(summary_case_dict, party_info_dict):
+    """
+    Combines case summary and party info of one case into a record with all columns.
+
+    Returns a CaseRecord, missing fields are None
+    """
+    return CaseRecord.from_tables(summary_case_dict, party_info_dict)
+
+
+def add_record(eviction_cases, record):
+    """
+    Appends one record (CaseRecord or dict) to a dict of lists with eviction cases.
+    """
+    for key in eviction_cases:
+        eviction_cases[key].append(record.get(key))
+
+
+def records_to_df(eviction_cases):
+    """
+    Converts scraped records (dict of lists) into a pandas df with the output
+    schema (see records.py) and runs the post-processing stage (see postprocess.py).
+
+    Inputs:
+      eviction_cases (dict): {column name: list of values}
+    """
+    df = pd.DataFrame(eviction_cases)
+    # windows overlap at their edges, a case scraped twice is kept once
+    df = df.drop_duplicates('CASE NUMBER', keep='last', ignore_index=True)
+    df['LAST_UPDATED'] = pd.Timestamp(dt.today().date())
+
+    return normalize_cases(df)
+
+
+def issues_to_df(cases_with_issues, issue_reasons = None):
+    """
+    Converts case numbers that failed into a df with case_id and reason columns.
+
+    Inputs:
+      cases_with_issues (lst): case numbers
+      issue_reasons (dict): {case number: error of its last attempt}, optional
+    """
+    issue_reasons = issue_reasons or dict()
+    return pd.DataFrame({'case_id': cases_with_issues,
+                         'reason': [issue_reasons.get(case_number) for case_number in cases_with_issues]},
+                        dtype=object)
+
+
+def reparse_cache(page_cache_path):
+    """
+    Re-derives eviction cases from the raw pages in a page cache with the current
+    parsers, without a browser or network calls.
+
+    Inputs:
+      page_cache_path (str): location of the SQLite page cache, see page_cache.py
+
+    Returns a tuple (df with eviction cases, df with case numbers that failed to parse)
+    """
+    eviction_cases = {key: [] for key in _KEYS_LIST}
+    cases_with_issues = []
+    issue_reasons = dict()
+
+    page_cache = Page_Cache(page_cache_path)
+    for case_number, record in iter_cached_cases(page_cache):
+        if isinstance(record, Exception):
+            logger.warning(f'Unable to parse cached case {case_number}: {record!r}')
+            cases_with_issues.append(case_number)
+            issue_reasons[case_number] = repr(record)
+        else:
+            add_record(eviction_cases, record)
+    page_cache.close()
+
+    df = records_to_df(eviction_cases)
+    df = df.sort_values('FILED DATE', kind='stable', ignore_index=True)
+    df_cases_issues = issues_to_df(cases_with_issues, issue_reasons)
+
+    return df, df_cases_issues
 
 
 ################ EVICTION SCRAPER CLASS ##############################
@@ -76,24 +394,42 @@ def run_eviction_scraper(evictions_csv_path, start_date = None, end_date = None,
 class Eviction_Scraper:
     
     def __init__(self, start_date = None, end_date = None, 
-        webdriver_location = _WEBDRIVER_LOCATION):
+        webdriver_location = _WEBDRIVER_LOCATION, listing_url = _LISTING_URL, page_cache_path = None,
+        window_stats_path = None, target_window_rows = None, page_cache_max_mb = None,
+        page_cache_max_age_days = None, skip_cases = None):
 
         self.start_date = start_date
         self.end_date = end_date
         self.lst_time_periods = self.__date_converter()
-        self.eviction_cases = _EVICTION_CASES.copy()
+        # fresh lists for every instance, a shallow copy of _EVICTION_CASES would share them
+        self.eviction_cases = {key: [] for key in _KEYS_LIST}
         self.cases_with_issues = []
-
-        # Initialize a Chrome webdriver and navigate to the starting webpage 
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-
-        s = Service(webdriver_location)
-
-        self.driver = webdriver.Chrome(service= s, options=chrome_options)
+        # {case number: error} of cases with issues, see retry_queue.py
+        self.issue_reasons = dict()
+        # optional limiter shared between parallel workers, see parallel.py
+        self.rate_limiter = None
+        # optional progress journal to resume crashed runs, see checkpoint.py
+        self.journal = None
+        # case numbers listed but not opened, e.g. cases the daemon has stored already
+        self.skip_cases = set(skip_cases or ())
+        # optional cache of raw listing and case pages, see page_cache.py
+        self.page_cache = Page_Cache(page_cache_path, page_cache_max_mb, page_cache_max_age_days) \
+            if page_cache_path is not None else None
+        # optional planner sizing windows by their result counts, see window_planner.py
+        self.planner = None
+        if window_stats_path is not None:
+            self.planner = Window_Planner(window_stats_path, target_window_rows)
+        # number of rows on the last listing page
+        self.listing_size = 0
+        # stage timings and counters of this scraper, see metrics.py
+        self.metrics = Metrics()
+
+        # Take a warm Chrome from the browser pool and navigate to the starting webpage 
+        self.listing_url = listing_url
+        self.browser_pool = get_browser_pool(webdriver_location)
+        self.driver = self.browser_pool.acquire()
         self.wait = WebDriverWait(self.driver, 20)
-        self.driver.maximize_window()
-        self.driver.get("https://www.courtclerk.org/records-search/municipal-civil-listing-by-classification/")
+        self.driver.get(listing_url)
 
 
     def run_scraper(self):
@@ -103,141 +439,204 @@ class Eviction_Scraper:
         https://www.courtclerk.org/records-search/municipal-civil-listing-by-classification/.
         The result is either saved as a csv file or pandas df.
         """
-        for start, end in self.lst_time_periods:
-            self.__process_search_webpage(start, end)
-            # Show all records on one page 
-            self.driver.find_element("xpath", "/html/body/div[1]/div[3]/button").click() 
-            #self.wait.until(EC.element_to_be_clickable((By.XPATH, "/html/body/div[1]/div[3]/button"))).click()
-            self.scrape_one_period()
-            print(f'Finished scraping period between {start}-{end}')
-            self.driver.back()
-        
-        self.driver.quit()
+        for record in self.iter_cases():
+            add_record(self.eviction_cases, record)
 
-        df  = pd.DataFrame(self.eviction_cases)     
-        df['FILED DATE'] = pd.to_datetime(df["FILED DATE"]).dt.date
-        df['LAST_UPDATED'] = dt.today().date()
-        df = df.replace(r'^\s*$', np.nan, regex=True)
-        #df[['DISPOSITION_DATE','DISPOSITION']]=df.DISPOSITION.str.split(' - ', 2, expand=True)
-        print('Cases with issues: ', self.cases_with_issues)
-        df_cases_issues = pd.DataFrame({'case_id': self.cases_with_issues})
+        if self.journal is not None:
+            # journal also holds cases finished by previous (crashed) runs
+            self.eviction_cases = self.journal.records(_KEYS_LIST)
+            self.cases_with_issues = self.journal.issues()
+
+        df = records_to_df(self.eviction_cases)
+        logger.info(f'Cases with issues: {self.cases_with_issues}')
+        df_cases_issues = issues_to_df(self.cases_with_issues, self.issue_reasons)
 
         return df,df_cases_issues
 
-###############################################################################################
-################################ UTILITY METHODS ##############################################
-###############################################################################################
 
-    def __date_converter(self, max_period = 7):
+    def iter_cases(self):
         """
-        The court website limits search of records to up to 7 days. This function
-        breaks a given time period into several, smaller time periods containing up to max_period days.
+        Scrapes all time periods and yields one record (dict {column name: value})
+        per scraped case as soon as it is scraped, without keeping them in memory.
+        Gives the driver back to the browser pool when all periods are scraped. Use with sinks.py to save
+        records incrementally. With a window planner, each period is sized after
+        the previous one is scraped.
+        """
+        windows = self.lst_time_periods
+        if self.planner is not None:
+            windows = self.planner.iter_windows(self.start_date, self.end_date)
+        for start, end in windows:
+            yield from self.iter_window(start, end)
+        
+        self.browser_pool.release(self.driver)
+        if self.page_cache is not None:
+            self.page_cache.close()
+        if self.planner is not None:
+            self.planner.close()
+
+
+    def scrape_window(self, start, end):
+        """
+        Searches and scrapes all records filed within one time period
+        and adds them to self.eviction_cases.
 
         Inputs:
-          start_date (str): format should be mmddyyyy
-          end_date (str): format should be mmddyyyy
+          start (str): start date following format 'mm/dd/yyyy'
+          end (str): end date following format 'mm/dd/yyyy'
+        """
+        for record in self.iter_window(start, end):
+            add_record(self.eviction_cases, record)
 
-        Returns a list of lists where each inner list represents a 
+
+    def iter_window(self, start, end):
         """
-        # convert dates
-        start_date = dt.strptime(self.start_date,"%m%d%Y").date()
-        end_date = dt.strptime(self.end_date, "%m%d%Y").date()
+        Searches all records filed within one time period and yields them one by one.
 
-        # check that start date is not before end date
-        assert start_date <= end_date, 'Start Date is greater than End Date. Try again'
-        assert end_date <= dt.today().date(), "End Date is greater than today's date. Try again"
+        Inputs:
+          start (str): start date following format 'mm/dd/yyyy'
+          end (str): end date following format 'mm/dd/yyyy'
+        """
+        if self.journal is not None and self.journal.is_window_done(start, end):
+            logger.info(f'Skipping period between {start}-{end}, already scraped')
+            return
+
+        window_start = time.perf_counter()
+        # a browser worn out by the previous windows is swapped for a fresh one
+        driver = self.browser_pool.refresh(self.driver)
+        if driver is not self.driver:
+            self.metrics.inc('browser_restarts')
+            self.driver, self.wait = driver, WebDriverWait(driver, 20)
+            self.driver.get(self.listing_url)
+
+        with self.metrics.timer('search_submit'):
+            self.__process_search_webpage(start, end)
+        # Show all records on one page 
+        with self.metrics.timer('show_all'):
+            self.driver.find_element("xpath", "/html/body/div[1]/div[3]/button").click() 
+        if self.page_cache is not None:
+            with self.metrics.timer('storage_write'):
+                self.page_cache.put('listing', f'{start}-{end}', self.driver.page_source)
+        #self.wait.until(EC.element_to_be_clickable((By.XPATH, "/html/body/div[1]/div[3]/button"))).click()
+        yield from self.iter_one_period()
+        logger.info(f'Finished scraping period between {start}-{end} ({self.listing_size} cases)')
+        self.driver.back()
 
-        number_batches = math.ceil((end_date  - start_date).days / max_period)
-        end = start_date + tdelta(days = max_period)
+        if self.planner is not None:
+            self.planner.record(start, end, self.listing_size, time.perf_counter() - window_start)
 
-        # add to the list the first period
-        lst_periods = [[start_date.strftime("%m/%d/%Y"), end.strftime("%m/%d/%Y")]]
+        if self.journal is not None:
+            self.journal.finish_window(start, end)
 
-        # add more periods to the list
-        for _ in range(number_batches - 1):
-            start = end + tdelta(days = 1)
-            end = start + tdelta(days = max_period)
-            if end >= end_date:
-                lst_periods.append([start.strftime("%m/%d/%Y"), end_date.strftime("%m/%d/%Y")])
-                break
-            lst_periods.append([start.strftime("%m/%d/%Y"), end.strftime("%m/%d/%Y")])
+###############################################################################################
+################################ UTILITY METHODS ##############################################
+###############################################################################################
 
-        return lst_periods    
+    def __date_converter(self, max_period = 7):
+        """
+        The court website limits search of records to up to 7 days. This function
+        breaks scraper's time period into several, smaller time periods containing up to max_period days.
+        """
+        return date_converter(self.start_date, self.end_date, max_period)
 
 
     def scrape_one_period(self):
+        """
+        Scrapes all records on the listing page and adds them to self.eviction_cases.
+        """
+        for record in self.iter_one_period():
+            add_record(self.eviction_cases, record)
 
+
+    def iter_one_period(self):
+        """
+        Opens case summary of every record on the listing page and yields
+        scraped records one by one. Cases that fail are added to self.cases_with_issues.
+        """
         search_tab_handle = self.driver.current_window_handle
 
         # Create a list of links to case summary of all court records. 
         # td[5] specifies to use case summary, not case documents link
         records_xpath_list = self.driver.find_elements('xpath', "//td[5]/form")
-
-        self.local_records = None
-        self.local_records = {key: [None] * len(records_xpath_list) for key in _KEYS_LIST}
+        self.listing_size = len(records_xpath_list)
+
+        # case numbers are read from the listing only when needed by the journal, page cache
+        # or cases to skip
+        case_numbers = []
+        if self.journal is not None or self.page_cache is not None or self.skip_cases:
+            # one round trip for the whole listing instead of one per row
+            listing_doc = parsers.to_document(self.driver.page_source)
+            case_numbers = [tag.text_content().strip() for tag in listing_doc.xpath("//td[5]/form/../../td[1]")]
+
+        # with a journal, skip cases finished by a previous run of this job
+        skipped_cases = self.skip_cases
+        if self.journal is not None:
+            skipped_cases = skipped_cases | self.journal.finished_cases()
+        skipped = {i for i, case_number in enumerate(case_numbers) if case_number in skipped_cases}
 
         for i, record in enumerate(records_xpath_list): 
-            #record.click()
-            self.wait.until(EC.element_to_be_clickable(record)).click()
-            
-            # switch focus to the newly open tab to scrape data
-            self.driver.switch_to.window(self.driver.window_handles[1])
-            start_time = time.time()
+            if i in skipped:
+                continue
+            if self.rate_limiter is not None:
+                self.rate_limiter.wait()
+            case_start = time.perf_counter()
+
+            with self.metrics.timer('tab_open'):
+                #record.click()
+                self.wait.until(EC.element_to_be_clickable(record)).click()
+                # switch focus to the newly open tab to scrape data
+                self.driver.switch_to.window(self.driver.window_handles[1])
+                # blocked urls do not carry over to a new tab, the parties page loads in this one
+                self.browser_pool.block_tab_resources(self.driver)
+            self.browser_pool.count_page(self.driver)
             time.sleep(5) 
-            
+
+            local_record = None
             try:
                 # open parties table with plaintiff and defendant info
-                #self.driver.find_element('xpath', '/html/body/div[1]/table/tbody/tr[1]/td[2]/form[4]').click()
-                self.wait.until(EC.element_to_be_clickable((By.XPATH, '/html/body/div[1]/table/tbody/tr[1]/td[2]/form[4]'))).click()
-                print('successfuly clicked on party table')
-            
-                # get a list of all rows containing data to be scraped 
-                case_summary_table_rows = self.driver.find_elements('xpath', '//*[@id="case_summary_table"]/tbody/tr')
-                #print('found case summary elements')
-                party_info_table_rows = self.driver.find_elements('xpath', '//*[@id="party_info_table"]/tbody/tr')
-                #print('found party elements')
-            
-                # process case summary table & party contact info table rows 
-                summary_case_dict = self.__extract_summary_case_data(case_summary_table_rows)
-                #print('finished processing summary case info')
-                party_info_dict = self.__extract_party_info_data(party_info_table_rows)
-                #print('finished processing party info')
-
-                for key, val in summary_case_dict.items():
-                    if key in self.local_records:
-                        self.local_records[key][i] = val 
-                #for key in self.local_records.keys():
-                    #self.local_records[key][i] = summary_case_dict[key]                     
-                for key, val in party_info_dict.items():
-                    self.local_records[key][i] = val 
-                #for key in self.local_records.keys():
-                    #self.local_records[key][i] = party_info_dict[key] 
-                print('finished entire try statement-scraped all info successfully')
-
-            except TimeoutException:
-                print('something went wrong- entering TimeoutException except statement')
+                with self.metrics.timer('party_click'):
+                    self.wait.until(EC.element_to_be_clickable((By.XPATH, '/html/body/div[1]/table/tbody/tr[1]/td[2]/form[4]'))).click()
+                logger.debug('successfuly clicked on party table')
+
+                with self.metrics.timer('extraction'):
+                    # read the whole page in one round trip instead of one per table row and cell,
+                    # parties page holds both case summary and party contact info tables
+                    page_source = self.driver.page_source
+                    case_doc = parsers.to_document(page_source)
+
+                    # process case summary table & party contact info table rows 
+                    summary_case_dict = parsers.extract_summary_case_data(case_doc)
+                    party_info_dict = parsers.extract_party_info_data(case_doc)
+                    local_record = make_record(summary_case_dict, party_info_dict)
+
+                with self.metrics.timer('storage_write'):
+                    if self.page_cache is not None:
+                        self.page_cache.put('parties', case_numbers[i], page_source)
+                    if self.journal is not None:
+                        self.journal.finish_case(local_record.case_number, local_record)
+                self.metrics.inc('cases_scraped')
+
+            except (TimeoutException, ValueError) as e:
+                logger.warning(f'Unable to scrape case: {e!r}')
                 case = self.wait.until(EC.visibility_of_element_located((By.XPATH, '/html/body/div[1]/table/tbody/tr[1]/td[1]/div[3]/table/tbody/tr[1]/td[2]')))
-                #case = self.driver.find_element('xpath', '/html/body/div[1]/table/tbody/tr[1]/td[1]/div[3]/table/tbody/tr[1]/td[2]')
-                print('scrapped case number successfuly')
                 self.cases_with_issues.append(case.text)
-            except ValueError:
-                print('something went wrong- entering ValueError except statement')
-                case = self.wait.until(EC.visibility_of_element_located((By.XPATH, '/html/body/div[1]/table/tbody/tr[1]/td[1]/div[3]/table/tbody/tr[1]/td[2]')))
-                #case = self.driver.find_element('xpath', '/html/body/div[1]/table/tbody/tr[1]/td[1]/div[3]/table/tbody/tr[1]/td[2]')
-                print('scrapped case number successfuly')
-                self.cases_with_issues.append(case.text)               
+                self.issue_reasons[case.text] = repr(e)
+                self.metrics.inc('issue_cases')
+                if self.journal is not None:
+                    self.journal.add_issue(case.text)
 
             # close this tab to return to the main tab with all records. 
             # shift driver focus on the main page with all records
-            print(f"It took to scrape this page {time.time() - start_time} to run. Closing page...")
-            self.driver.close()
-            self.driver.switch_to.window(search_tab_handle)
+            with self.metrics.timer('tab_close'):
+                self.driver.close()
+                self.driver.switch_to.window(search_tab_handle)
+            case_time = time.perf_counter() - case_start
+            self.metrics.observe('case_fetch', case_time)
+            logger.debug(f'Scraped case page in {case_time:.2f} s')
 
             time.sleep(1) 
 
-        #add records to the main eviction file
-        for key, value in self.local_records.items():
-                self.eviction_cases[key] += value 
+            if local_record is not None:
+                yield local_record
 
 
     def __process_search_webpage(self, start, end):
@@ -267,132 +666,283 @@ class Eviction_Scraper:
         self.driver.find_element("xpath", "/html/body/div[1]/div/div[2]/form/input[4]").click()
         # Version for Windows
         #self.driver.find_element("xpath", "/html/body/div[1]/div/div[2]/form/input[3]").click()
+
+
+class Update_Eviction_Cases:
+    """
+    Re-checks cases with missing disposition on the search-by-case-number page and
+    writes new dispositions into the df. Cases are looked up one by one in Chrome
+    ('selenium' engine) or concurrently over http ('http' engine).
+    """
+
+    def __init__(self, cases_to_update_lst, df_to_update_in, 
+        webdriver_location = _WEBDRIVER_LOCATION, engine = 'selenium', concurrency = 4, rate = 2,
+        case_search_url = _CASE_SEARCH_URL, session = None):
+
+        self.cases = list(cases_to_update_lst)
+        self.case_search_url = case_search_url
+        # a session passed in (e.g. by the daemon) is kept open for its owner,
+        # browsers of the selenium engine always come from the process-wide browser pool
+        self.session = session
+        self.df = df_to_update_in
+        self.engine = engine
+        self.concurrency = concurrency
+        self.rate = rate
+        # number of cases with changed disposition, unchanged and failed after update_cases()
+        self.report = {'changed': 0, 'unchanged': 0, 'failed': 0}
+        self.changed_cases = []
+        self.unchanged_cases = []
+        self.failed_cases = []
+        # stage timings and counters of the update, see metrics.py
+        self.metrics = Metrics()
+
+        if engine == 'selenium':
+            # Take a warm Chrome from the browser pool and navigate to the starting webpage 
+            self.browser_pool = get_browser_pool(webdriver_location)
+            self.driver = self.browser_pool.acquire()
+            self.driver.get(case_search_url)
+        elif engine != 'http':
+            raise ValueError(f'Unknown scraper engine: {engine}')
     
-    def __extract_summary_case_data(self, case_summary_table_rows):
+    def update_cases(self):
         """
-        Takes in a list of case summary tags, unpacks them and adds case summary info
-        into dictionary containing court records.  
+        Fetches current disposition of every case and applies all changes to the df
+        in one vectorized write per column. LAST_UPDATED is set on every case that was
+        checked successfully.
 
-        Inputs:
-        case_summary_table_rows (lst): list of case_summary_table tags 
-          where each tag represents one row
+        Returns updated df
         """
-        case_summary_dict = dict()
+        if self.engine == 'http':
+            dispositions = self.__fetch_dispositions_http()
+        else:
+            dispositions = self.__fetch_dispositions_selenium()
+
+        checked = pd.Series(dispositions, dtype=object)
+
+        # look checked cases up through case number index instead of a scan per case
+        was_checked = self.df['CASE NUMBER'].isin(checked.index)
+        new_values = self.df['CASE NUMBER'].map(checked)
+        old_values = self.df['DISPOSITION']
+        changed = was_checked & ~(old_values.isna() & new_values.isna()) & (old_values != new_values)
+
+        self.df.loc[changed, 'DISPOSITION'] = new_values[changed]
+        self.df.loc[was_checked, 'LAST_UPDATED'] = pd.Timestamp(dt.today().date())
+        # disposition date and outcome follow the new dispositions
+        add_derived_columns(self.df)
+
+        self.changed_cases = self.df.loc[changed, 'CASE NUMBER'].unique().tolist()
+        self.unchanged_cases = checked.index.difference(self.changed_cases).tolist()
+        self.report = {'changed': len(self.changed_cases), 'unchanged': len(self.unchanged_cases),
+                       'failed': len(self.failed_cases)}
+        self.metrics.inc('cases_rechecked', len(checked))
+        self.metrics.inc('cases_changed', len(self.changed_cases))
+        self.metrics.inc('issue_cases', len(self.failed_cases))
+        logger.info(f'Updated cases: {self.report}')
+        
+        return self.df
 
-        for row in case_summary_table_rows: 
-            # convert tag into string, apply upper case, and split string by ":"
-            # example of row variable below: 'CASE NUMBER', 'A1111111'
-            field_name, field_value = row.text.upper().split(":")
+###############################################################################################
+################################ UTILITY METHODS ##############################################
+###############################################################################################
 
-            # add field_name and field_value to dict. method strip() removes blank spaces
-            # in the beginning and in the end of a string
-            case_summary_dict[field_name.strip()] = field_value.strip()
-        
-        return case_summary_dict
+    def __fetch_dispositions_selenium(self):
+        """
+        Looks up cases one at a time in Chrome.
+
+        Returns a dict {case number: disposition or None}
+        """
+        dispositions = dict()
+
+        for case_id in self.cases:
+            # a browser worn out by the previous lookups is swapped for a fresh one
+            driver = self.browser_pool.refresh(self.driver)
+            if driver is not self.driver:
+                self.metrics.inc('browser_restarts')
+                self.driver = driver
+                self.driver.get(self.case_search_url)
+
+            try:
+                with self.metrics.timer('search_submit'):
+                    # enter case_id on the search page
+                    el = self.driver.find_element('name', 'casenumber')
+                    el.clear()
+                    el.send_keys(case_id)
+                    # find search button and click on it
+                    self.driver.find_element('xpath', '/html/body/div[1]/div/div[2]/form/p/input[4]').click()
+                self.browser_pool.count_page(self.driver)
+
+                # disposition row is found by its field name, its position depends on the case
+                with self.metrics.timer('extraction'):
+                    summary_case_dict = parsers.extract_summary_case_data(parsers.to_document(self.driver.page_source))
+                if not summary_case_dict:
+                    raise ValueError('Case summary table not found')
+                dispositions[case_id] = summary_case_dict.get('DISPOSITION') or None
+
+                # return on the search page
+                self.driver.back()
+            except (TimeoutException, NoSuchElementException, ValueError) as e:
+                logger.warning(f'Unable to update case {case_id}: {e!r}')
+                self.failed_cases.append(case_id)
+                self.driver.get(self.case_search_url)
+
+            time.sleep(1)
         
+        self.browser_pool.release(self.driver)
+
+        return dispositions
+
 
-    def __extract_party_info_data(self, party_info_table_rows):
+    def __fetch_dispositions_http(self):
         """
-        Takes in a list of party contact info table tags, unpacks them 
-        and adds them into dictionary containing court records.  
+        Looks up up to `concurrency` cases at once under `rate` requests per second budget.
 
-        Inputs:
-        party_info_table_rows (lst): list of party_info_table tags 
-          where each tag represents one column
+        Returns a dict {case number: disposition or None}
         """
-        num_parties = 0
-        party_info_dict = dict()
-
-        for row in party_info_table_rows:
-            # put row fields in a list row_fields
-            row_fields = [val.text.replace('\n', '') for val in \
-                row.find_elements('xpath', '*')]
-            party = row_fields[2]
-            
-            if party == 'P 1':
-                party_info_dict["PLAINTIFF NAME"] = row_fields[0]
-                party_info_dict["PLAINTIFF ADDRESS"] = row_fields[1]
-                
-                # check whether plaintiff has attorney
-                if 3 in range(len(row_fields)):
-                    party_info_dict["PLAINTIFF_ATTORNEY"] = row_fields[3]
-
-            elif party == 'D 1' or ('D' in party and num_parties < 1):
-                num_parties += 1
-                party_info_dict["DEFENDANT NAME"] = row_fields[0]
-                party_info_dict["DEFENDANT ADDRESS"] = row_fields[1]
-
-                # check whether defendant has an attorney
-                if 3 in range(len(row_fields)):
-                    party_info_dict["DEFENDANT_ATTORNEY"] = row_fields[3]
-        
-        return party_info_dict
-                
+        # imported here since http_scraper module depends on this one
+        from async_fetch import Async_Case_Fetcher
+        from http_scraper import make_session
+
+        session = self.session if self.session is not None else make_session()
+        response = session.get(self.case_search_url, timeout=30)
+        response.raise_for_status()
+        search_form = parsers.find_case_search_form(parsers.to_document(response.content, base_url=response.url))
+
+        fetcher = Async_Case_Fetcher(concurrency=self.concurrency, rate=self.rate,
+                                     cookies=session.cookies.get_dict(), headers=dict(session.headers))
+        fetcher.metrics = self.metrics
+        results = fetcher.fetch_case_summaries(search_form, self.cases)
+        if self.session is None:
+            session.close()
+
+        dispositions = dict()
+        for case_id, result in zip(self.cases, results):
+            if isinstance(result, Exception):
+                logger.warning(f'Unable to update case {case_id}: {result!r}')
+                self.failed_cases.append(case_id)
+            else:
+                dispositions[case_id] = result.get('DISPOSITION') or None
+
+        return dispositions
+
+
+class Retry_Eviction_Cases:
+    """
+    Scrapes cases that failed on the listing page again, looking them up by case
+    number on the search-by-case-number page and opening their parties table.
+    Cases are looked up one by one in Chrome ('selenium' engine) or concurrently
+    over http ('http' engine) under the same rate budget as re-checks.
+    """
 
-class Update_Eviction_Cases:
+    def __init__(self, case_numbers, webdriver_location = _WEBDRIVER_LOCATION, engine = 'selenium',
+        concurrency = 4, rate = 2, case_search_url = _CASE_SEARCH_URL, session = None):
 
-    def __init__(self, cases_to_update_lst, df_to_update_in, 
-        webdriver_location):
+        self.cases = list(case_numbers)
+        # a session passed in (e.g. by the daemon) is kept open for its owner
+        self.session = session
+        self.webdriver_location = webdriver_location
+        self.engine = engine
+        self.concurrency = concurrency
+        self.rate = rate
+        self.case_search_url = case_search_url
+        # stage timings and counters of the retries, see metrics.py
+        self.metrics = Metrics()
 
-        # Initialize a Chrome webdriver and navigate to the starting webpage 
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
+        if engine not in ('selenium', 'http'):
+            raise ValueError(f'Unknown scraper engine: {engine}')
 
-        #self.driver = webdriver.Chrome(webdriver_location, options=chrome_options)
-        s = Service(webdriver_location)
-        self.driver = webdriver.Chrome(service=s, options=chrome_options)
 
-        self.driver.get("https://www.courtclerk.org/records-search/search-by-case-number/")
+    def retry_cases(self):
+        """
+        Returns a tuple (df with recovered cases, dict {case number: error} of cases that failed again)
+        """
+        if self.engine == 'http':
+            results = self.__fetch_cases_http()
+        else:
+            results = self.__fetch_cases_selenium()
+
+        eviction_cases = {key: [] for key in _KEYS_LIST}
+        failures = dict()
+        for case_number, result in zip(self.cases, results):
+            if isinstance(result, Exception):
+                logger.warning(f'Unable to retry case {case_number}: {result!r}')
+                failures[case_number] = repr(result)
+            else:
+                add_record(eviction_cases, make_record(*result))
+        self.metrics.inc('cases_retried', len(self.cases))
+
+        return records_to_df(eviction_cases), failures
 
-        self.cases = cases_to_update_lst
-        self.df = df_to_update_in
-    
-    def update_cases(self):
+###############################################################################################
+################################ UTILITY METHODS ##############################################
+###############################################################################################
 
+    def __fetch_cases_selenium(self):
+        """
+        Looks up cases one at a time in a pooled Chrome.
+
+        Returns a list of tuples (summary_case_dict, party_info_dict) or exceptions
+        """
+        browser_pool = get_browser_pool(self.webdriver_location)
+        driver = browser_pool.acquire()
+
+        results = []
         for case_id in self.cases:
-            # enter case_id on the search page
-            el = self.driver.find_element('name', 'casenumber')
-            el.clear()
-            el.send_keys(case_id)
-            # find search button and click on it
-            self.driver.find_element('xpath', '/html/body/div[1]/div/div[2]/form/p/input[4]').click()
-
-            try: 
-                disposition_tag = self.driver.find_element('xpath', '//*[@id="case_summary_table"]/tbody/tr[8]')
-                disposition_string = disposition_tag.text.upper()
-            
-                if 'DISPOSITION' in disposition_string:
-                    _, field_value = disposition_string.split(":")
-                    #disposition_date, disposition = field_value.split('-')
-                    self.df[self.df['CASE NUMBER'] == case_id]['DISPOSITION'] = field_value.strip()            
-            except:
-                pass
-            
-            self.df[self.df['CASE NUMBER'] == case_id]['LAST_UPDATED'] = dt.today().date()
-
-            # return on the search page
-            self.driver.back()
+            driver = browser_pool.refresh(driver)
+            wait = WebDriverWait(driver, 20)
+            try:
+                driver.get(self.case_search_url)
+                with self.metrics.timer('search_submit'):
+                    el = driver.find_element('name', 'casenumber')
+                    el.clear()
+                    el.send_keys(case_id)
+                    driver.find_element('xpath', '/html/body/div[1]/div/div[2]/form/p/input[4]').click()
+                # open parties table with plaintiff and defendant info
+                with self.metrics.timer('party_click'):
+                    wait.until(EC.element_to_be_clickable((By.XPATH, '/html/body/div[1]/table/tbody/tr[1]/td[2]/form[4]'))).click()
+                browser_pool.count_page(driver)
+
+                with self.metrics.timer('extraction'):
+                    case_doc = parsers.to_document(driver.page_source)
+                    summary_case_dict = parsers.extract_summary_case_data(case_doc)
+                    if not summary_case_dict:
+                        raise ValueError(f'Case summary table not found for case {case_id}')
+                    results.append((summary_case_dict, parsers.extract_party_info_data(case_doc)))
+            except (TimeoutException, NoSuchElementException, ValueError) as e:
+                results.append(e)
+
             time.sleep(1)
-        
-        self.driver.quit()
-        
-        return self.df
+
+        browser_pool.release(driver)
+        return results
+
+
+    def __fetch_cases_http(self):
+        """
+        Looks up up to `concurrency` cases at once under `rate` requests per second budget.
+
+        Returns a list of tuples (summary_case_dict, party_info_dict) or exceptions
+        """
+        # imported here since http_scraper module depends on this one
+        from async_fetch import Async_Case_Fetcher
+        from http_scraper import make_session
+
+        session = self.session if self.session is not None else make_session()
+        response = session.get(self.case_search_url, timeout=30)
+        response.raise_for_status()
+        search_form = parsers.find_case_search_form(parsers.to_document(response.content, base_url=response.url))
+
+        fetcher = Async_Case_Fetcher(concurrency=self.concurrency, rate=self.rate,
+                                     cookies=session.cookies.get_dict(), headers=dict(session.headers))
+        fetcher.metrics = self.metrics
+        results = fetcher.fetch_cases_by_number(search_form, self.cases)
+        if self.session is None:
+            session.close()
+
+        return results
 
 
 if __name__ == '__main__':
-    if len(sys.argv) == 2:          # update existing csv file with new records up to date (today's date)
-        new_csv_file_path = sys.argv[1]
-        run_eviction_scraper(new_csv_file_path)
-
-    elif len(sys.argv) == 3:        # update existing csv file with new records up to end date
-        new_csv_file_path = sys.argv[1]
-        end_date = sys.argv[2]
-        run_eviction_scraper(new_csv_file_path, end_date = end_date)
-
-    elif len(sys.argv) == 4:        # create brand new csv file with scraped records between start-end dates
-        new_csv_file_path = sys.argv[1]
-        start_date = sys.argv[2]
-        end_date = sys.argv[3]
-        new_df, df_cases_w_issues = Eviction_Scraper(start_date, end_date).run_scraper()
-        new_df.to_csv(new_csv_file_path, index=False)
-        df_cases_w_issues.to_csv(f"/Users/oleksandrafilippova/hamilton_evictions_scraper/eviction_cases/cases_w_issues_{start_date}-{end_date}.csv")
\ No newline at end of file
+    # kept for existing scripts, same as `python cli.py update <csv path> [flags]`;
+    # cli.py also has scrape, reparse, daemon, status and export commands
+    import cli
+    sys.exit(cli.main(['update', *sys.argv[1:]]))
@@ -0,0 +1,167 @@
+# imports
+import sqlite3
+from datetime import datetime as dt, timedelta as tdelta
+
+# the court website limits search of records to 7 days, same as date_converter()
+_MAX_PERIOD = 7
+# number of listing rows a window should return, a busy 7-day window
+# returns several hundred rows and its "show all" page gets slow
+_TARGET_ROWS = 100
+# weight of the latest window in the running estimate of cases per day
+_SMOOTHING = 0.3
+# number of latest windows of previous runs the first estimate is built from
+_HISTORY = 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS window_stats (
+    start TEXT NOT NULL,
+    end TEXT NOT NULL,
+    days INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    observed_at TEXT NOT NULL,
+    PRIMARY KEY (start, end)
+);
+CREATE INDEX IF NOT EXISTS window_stats_observed_at ON window_stats (observed_at);
+"""
+
+
+def _to_date(date):
+    """
+    Parses a mmddyyyy or mm/dd/yyyy date.
+    """
+    return dt.strptime(date.replace('/', ''), '%m%d%Y').date()
+
+
+class Window_Planner:
+    """
+    Adaptive replacement of date_converter(). Sizes every search window from the
+    number of cases per day seen in the latest windows, so that it returns about
+    target_rows listing rows: busy weeks are split into shorter windows, quiet
+    periods get the longest window the website allows.
+
+    Result count of every scraped window is kept in a SQLite file, so a later run
+    starts from the densities of the same days (if they were scraped before) or
+    of the latest windows instead of from scratch.
+
+    Example:
+        for start, end in planner.iter_windows(start_date, end_date):
+            ... scrape the window ...
+            planner.record(start, end, rows, seconds)
+    """
+
+    def __init__(self, stats_path, target_rows = None, max_period = _MAX_PERIOD):
+        """
+        Inputs:
+          stats_path (str): location of the SQLite file with window stats
+          target_rows (int): number of listing rows a window should return, None for default
+          max_period (int): maximum number of days between start and end of a window
+        """
+        self.stats_path = stats_path
+        self.target_rows = target_rows or _TARGET_ROWS
+        self.max_period = max_period
+
+        self.conn = sqlite3.connect(stats_path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+        # running estimate of cases per day, None until some window is observed
+        self.density = None
+        rows = self.conn.execute(
+            "SELECT rows, days FROM window_stats ORDER BY observed_at DESC LIMIT ?", (_HISTORY,)).fetchall()
+        for rows_count, days in reversed(rows):
+            self.__update_density(rows_count / days)
+
+
+    def close(self):
+        self.conn.close()
+
+
+    def window_days(self, start):
+        """
+        Returns number of days (1 to max_period + 1) of the window starting on start (date).
+        """
+        density = self.__observed_density(start)
+        if density is None:
+            density = self.density
+        if not density:
+            return self.max_period + 1
+        return max(1, min(self.max_period + 1, round(self.target_rows / density)))
+
+
+    def iter_windows(self, start_date, end_date):
+        """
+        Yields [start, end] windows (format mm/dd/yyyy) covering the time period.
+        Each window is sized when it is requested, so stats recorded for the
+        previous window already apply to the next one.
+
+        Inputs:
+          start_date (str), end_date (str): format mmddyyyy
+        """
+        start, end_date = _to_date(start_date), _to_date(end_date)
+        assert start <= end_date, 'Start Date is greater than End Date. Try again'
+
+        while start <= end_date:
+            end = min(start + tdelta(days=self.window_days(start) - 1), end_date)
+            yield [start.strftime('%m/%d/%Y'), end.strftime('%m/%d/%Y')]
+            start = end + tdelta(days=1)
+
+
+    def plan(self, start_date, end_date):
+        """
+        Returns a list of [start, end] windows covering the time period, sized up front
+        from stats of previous runs. Used where all windows are handed out at once,
+        e.g. to parallel workers.
+        """
+        return list(self.iter_windows(start_date, end_date))
+
+
+    def record(self, start, end, rows, seconds = 0):
+        """
+        Saves the result count of a scraped window and updates the estimate of cases per day.
+
+        Inputs:
+          start (str), end (str): format mm/dd/yyyy
+          rows (int): number of rows on the listing page
+          seconds (float): time it took to scrape the window
+        """
+        start, end = _to_date(start), _to_date(end)
+        days = (end - start).days + 1
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO window_stats VALUES (?, ?, ?, ?, ?, ?)",
+                              (start.isoformat(), end.isoformat(), days, rows, seconds,
+                               dt.now().isoformat()))
+        self.__update_density(rows / days)
+
+
+    def stats(self):
+        """
+        Returns a dict with number of recorded windows, their mean days, rows and
+        seconds, and the current estimate of cases per day.
+        """
+        num_windows, days, rows, seconds = self.conn.execute(
+            "SELECT COUNT(*), AVG(days), AVG(rows), AVG(seconds) FROM window_stats").fetchone()
+        return {'windows': num_windows, 'mean_days': days, 'mean_rows': rows,
+                'mean_seconds': seconds, 'cases_per_day': self.density}
+
+###############################################################################################
+################################ UTILITY METHODS ##############################################
+###############################################################################################
+
+    def __update_density(self, density):
+        if self.density is None:
+            self.density = density
+        else:
+            self.density = _SMOOTHING * density + (1 - _SMOOTHING) * self.density
+
+
+    def __observed_density(self, day):
+        """
+        Returns cases per day of the latest recorded window that covers this day
+        (e.g. when recent days are scraped again), or None.
+        """
+        row = self.conn.execute(
+            "SELECT rows, days FROM window_stats WHERE start <= ? AND end >= ? "
+            "ORDER BY observed_at DESC LIMIT 1", (day.isoformat(), day.isoformat())).fetchone()
+        return row[0] / row[1] if row is not None else None